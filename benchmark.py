@@ -0,0 +1,1075 @@
+"""Performance benchmarks for SamplePi (runs headless on any machine)
+
+Usage:
+    python3 benchmark.py framebuffer [--frames N]
+    python3 benchmark.py idle [--seconds S]
+    python3 benchmark.py screens [--frames N] [--json PATH]
+    python3 benchmark.py sessions [--cycles N]
+    python3 benchmark.py gaps [--gaps-ms 0,10,250] [--tolerance-ms T]
+    python3 benchmark.py rotary [--detents N] [--speeds 2,8,20,60]
+    python3 benchmark.py stream [--minutes M] [--seconds S]
+    python3 benchmark.py index [--files N]
+    python3 benchmark.py resample [--files N] [--seconds S]
+    python3 benchmark.py loudness [--minutes M]
+    python3 benchmark.py trigger [--runs N] [--engine mixer|mmap] [--offset-ms MS] [--track-seconds S]
+    python3 benchmark.py pulse [--pulses N] [--widths-ms 100,5] [--start-tolerance-ms T] [--width-tolerance-ms T]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+# Headless SDL so the benchmarks run over SSH and on CI machines
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from samplepi.config import settings
+
+
+def make_test_surface(width, height):
+    """Build a surface with gradients and text, similar to a real frame"""
+    surface = pygame.Surface((width, height), depth=32)
+    surface.fill(settings.COLOR_BACKGROUND)
+    for x in range(0, width, 4):
+        pygame.draw.line(surface, (x % 256, (x * 3) % 256, 128), (x, 0), (x, height // 2))
+    font = pygame.font.Font(None, settings.FONT_SIZE_MEDIUM)
+    for i, y in enumerate(range(height // 2, height, 20)):
+        text = font.render(f"sample_{i:04d}.wav", True, settings.COLOR_TEXT)
+        surface.blit(text, (10, y))
+    return surface
+
+
+def make_fake_framebuffer(path, width, height, bpp):
+    """Create a zero-filled file the size of a framebuffer"""
+    with open(path, 'wb') as f:
+        f.write(b'\x00' * (width * height * bpp // 8))
+
+
+def legacy_blit_rgb565(fb, surface):
+    """Per-pixel converter the framebuffer used before vectorization"""
+    if surface.get_size() != (fb.width, fb.height):
+        surface = pygame.transform.scale(surface, (fb.width, fb.height))
+    pixels = pygame.surfarray.array3d(surface)
+    for y in range(fb.height):
+        for x in range(fb.width):
+            r, g, b = (int(c) for c in pixels[x, y])
+            rgb565 = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | ((b & 0xF8) >> 3)
+            offset = y * fb.stride + x * 2
+            fb.fbmmap[offset:offset+2] = struct.pack('H', rgb565)
+
+
+def time_frames(blit, surface, frames):
+    """Return frames/sec for calling blit(surface) frames times"""
+    start = time.perf_counter()
+    for _ in range(frames):
+        blit(surface)
+    elapsed = time.perf_counter() - start
+    return frames / elapsed if elapsed > 0 else float('inf')
+
+
+def bench_framebuffer(args):
+    """Compare the legacy and vectorized RGB565 framebuffer paths"""
+    from samplepi.framebuffer import Framebuffer
+
+    width, height = settings.DISPLAY_WIDTH, settings.DISPLAY_HEIGHT
+    native = make_test_surface(width, height)
+    scaled = make_test_surface(width // 2, height // 2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        device = os.path.join(tmp, "fb0")
+        make_fake_framebuffer(device, width, height, 16)
+        fb = Framebuffer(device, width=width, height=height, bpp=16)
+        if not fb.is_available():
+            print("Could not open fake framebuffer")
+            return 1
+
+        print(f"Framebuffer benchmark: {width}x{height} RGB565 -> {device}")
+        legacy_fps = time_frames(lambda s: legacy_blit_rgb565(fb, s), native, args.legacy_frames)
+        print(f"  legacy per-pixel:      {legacy_fps:10.2f} frames/sec")
+        fast_fps = time_frames(fb.blit, native, args.frames)
+        print(f"  vectorized:            {fast_fps:10.2f} frames/sec")
+        scaled_fps = time_frames(fb.blit, scaled, args.frames)
+        print(f"  vectorized + scaling:  {scaled_fps:10.2f} frames/sec")
+        print(f"  speedup:               {fast_fps / legacy_fps:10.1f}x")
+
+        # Partial flush of a progress-bar sized damage rect
+        bar_rect = pygame.Rect(0, 125, width, 110)
+        full_bytes = fb.get_stats()['last_frame_bytes']
+        partial_fps = time_frames(lambda s: fb.blit(s, [bar_rect]), native, args.frames)
+        partial_bytes = fb.get_stats()['last_frame_bytes']
+        print(f"  partial flush:         {partial_fps:10.2f} frames/sec")
+        print(f"  bytes/frame full:      {full_bytes:10d}")
+        print(f"  bytes/frame partial:   {partial_bytes:10d}")
+        fb.close()
+    return 0
+
+
+def make_headless_app():
+    """MediaPlayerApp drawing into an offscreen surface"""
+    settings.DISPLAY_BACKEND = "headless"
+    os.environ.setdefault('GPIOZERO_PIN_FACTORY', 'mock')
+    from samplepi.audio.metadata import wav_index
+    # Keep the temporary media out of the user's on-disk indexes and resample cache
+    wav_index.path = None
+    settings.RESAMPLE_ENABLED = False
+    settings.LOUDNESS_TARGET_LUFS = None
+    from samplepi.main import MediaPlayerApp
+    return MediaPlayerApp()
+
+
+def legacy_loop_step(app, clock):
+    """Fixed-rate loop the app used before event-driven rendering"""
+    app.handle_events()
+    app.update()
+    app.state.current_screen.render()
+    app.display.present(None)
+    clock.tick(settings.FPS)
+
+
+def cpu_percent(step, seconds):
+    """Process CPU usage (% of one core) while calling step() for seconds"""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    while time.perf_counter() - wall_start < seconds:
+        step()
+    wall = time.perf_counter() - wall_start
+    return 100.0 * (time.process_time() - cpu_start) / wall
+
+
+def bench_idle(args):
+    """Idle CPU of the fixed-rate loop vs the event-driven loop"""
+    from samplepi.ui.screens import CompleteScreen
+
+    app = make_headless_app()
+    clock = pygame.time.Clock()
+    print(f"Idle CPU benchmark: {args.seconds:.0f}s per case, FPS={settings.FPS}, headless backend")
+    # Background threads (GPIO, SDL) cost this much with the loop asleep
+    baseline = cpu_percent(lambda: time.sleep(0.05), args.seconds)
+    print(f"  process baseline: {baseline:6.2f}% CPU")
+    for label, make_screen in (("StartScreen", None), ("CompleteScreen", CompleteScreen)):
+        if make_screen:
+            app.state.goto_screen(make_screen(app))
+        before = cpu_percent(lambda: legacy_loop_step(app, clock), args.seconds)
+        after = cpu_percent(app.step, args.seconds)
+        print(f"  {label:16s} fixed-rate: {before:6.2f}% CPU   event-driven: {after:6.2f}% CPU")
+    return 0
+
+
+def make_media_dirs(root, file_count, long_name_count):
+    """Test WAV directory with file_count names, samples with very long names
+
+    The list screens only read names, so the files are empty except for
+    one short real WAV in each directory used for playback.
+    """
+    test_wavs = os.path.join(root, "test_wavs")
+    samples = os.path.join(root, "samples")
+    os.makedirs(test_wavs)
+    os.makedirs(samples)
+    for i in range(file_count):
+        open(os.path.join(test_wavs, f"{chr(ord('a') + i % 26)}_take_{i:05d}.wav"), 'wb').close()
+    for i in range(long_name_count):
+        name = f"field_recording_{i:03d}_" + "very_long_descriptive_name_" * 6 + ".wav"
+        open(os.path.join(samples, name), 'wb').close()
+
+    for directory in (test_wavs, samples):
+        with wave.open(os.path.join(directory, "a_playback.wav"), 'wb') as wav:
+            wav.setnchannels(2)
+            wav.setsampwidth(2)
+            wav.setframerate(settings.AUDIO_SAMPLE_RATE)
+            wav.writeframes(b'\x00' * 4 * settings.AUDIO_SAMPLE_RATE)
+    return test_wavs, samples
+
+
+def screen_cases(app, test_wavs):
+    """(name, make_screen, per-frame action) for every screen with realistic state"""
+    from samplepi.ui.screens import (StartScreen, FileSelectionScreen, RecordingToggleScreen,
+                                     ConfirmScreen, PlaybackScreen, CompleteScreen)
+
+    def select_files(screen, count):
+        for i in range(0, count * 7, 7):
+            screen.selected_files.add(screen.menu.items[i % len(screen.menu.items)])
+
+    def file_list(file_type, title):
+        def make():
+            screen = FileSelectionScreen(app, file_type, title)
+            select_files(screen, 50)
+            return screen
+        return make
+
+    def paused_playback():
+        app.state.selected_test_wavs = ["a_playback.wav"]
+        app.state.selected_samples = []
+        screen = PlaybackScreen(app)
+        screen.toggle_pause()
+        return screen
+
+    def confirm():
+        app.state.selected_test_wavs = sorted(os.listdir(test_wavs))
+        app.state.record_video = True
+        return ConfirmScreen(app)
+
+    def scroll(screen):
+        screen.handle_scroll(1)
+
+    return [
+        ("StartScreen", lambda: StartScreen(app), None),
+        ("FileSelectionScreen/10k-files", file_list("test_wavs", "Select Test WAV Files"), scroll),
+        ("FileSelectionScreen/long-names", file_list("samples", "Select Sample Files"), scroll),
+        ("RecordingToggleScreen", lambda: RecordingToggleScreen(app), scroll),
+        ("ConfirmScreen", confirm, None),
+        ("PlaybackScreen/paused", paused_playback, None),
+        ("CompleteScreen", lambda: CompleteScreen(app), scroll),
+    ]
+
+
+def percentiles(samples_ms):
+    """p50/p95/p99/max/mean of a list of milliseconds"""
+    ordered = sorted(samples_ms)
+
+    def pick(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+    return {
+        'mean_ms': sum(ordered) / len(ordered),
+        'p50_ms': pick(50),
+        'p95_ms': pick(95),
+        'p99_ms': pick(99),
+        'max_ms': ordered[-1],
+    }
+
+
+def measure_screen(app, make_screen, action, frames):
+    """Render one screen frames times: timings, then allocations in a second pass
+
+    Allocation figures come from a separate traced pass because tracemalloc
+    slows rendering down: peak bytes allocated within a frame, net memory
+    blocks left behind per frame, and gen-0 garbage collections.
+    """
+    start = time.perf_counter()
+    screen = make_screen()
+    construct_ms = (time.perf_counter() - start) * 1000
+    app.state.goto_screen(screen)
+
+    start = time.perf_counter()
+    screen.render()
+    first_frame_ms = (time.perf_counter() - start) * 1000
+
+    samples = []
+    for _ in range(frames):
+        if action:
+            action(screen)
+        start = time.perf_counter()
+        screen.render()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    collections = gc.get_stats()[0]['collections']
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    peak_bytes = 0
+    for _ in range(frames):
+        if action:
+            action(screen)
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        screen.render()
+        _, peak = tracemalloc.get_traced_memory()
+        peak_bytes = max(peak_bytes, peak - before)
+    net_blocks = sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+
+    result = {
+        'construct_ms': construct_ms,
+        'first_frame_ms': first_frame_ms,
+        'frames': frames,
+    }
+    result.update(percentiles(samples))
+    result.update({
+        'alloc_peak_bytes': peak_bytes,
+        'alloc_net_blocks_per_frame': net_blocks / frames,
+        'gc_gen0_collections': gc.get_stats()[0]['collections'] - collections,
+    })
+    return result
+
+
+def machine_info():
+    """Where and on what a run happened, so result files can be compared"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    model = platform.machine()
+    try:
+        with open("/proc/device-tree/model") as f:
+            model = f.read().strip('\x00\n')
+    except OSError:
+        pass
+    return {
+        'commit': commit or None,
+        'model': model,
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'display': [settings.DISPLAY_WIDTH, settings.DISPLAY_HEIGHT],
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def bench_screens(args):
+    """Per-screen render cost with realistic state, optionally saved as JSON"""
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.TEST_WAVS_DIR, settings.SAMPLES_DIR = make_media_dirs(tmp, args.files, args.long_names)
+        app = make_headless_app()
+
+        print(f"Screen render benchmark: {args.frames} frames per screen, "
+              f"{args.files} files, headless backend")
+        print(f"  {'screen':32s} {'build':>8s} {'first':>8s} {'p50':>7s} {'p95':>7s} "
+              f"{'p99':>7s} {'max':>7s} {'peak KiB':>9s} {'blocks':>7s}")
+        results = {}
+        for name, make_screen, action in screen_cases(app, settings.TEST_WAVS_DIR):
+            result = measure_screen(app, make_screen, action, args.frames)
+            results[name] = result
+            print(f"  {name:32s} {result['construct_ms']:8.2f} {result['first_frame_ms']:8.2f} "
+                  f"{result['p50_ms']:7.3f} {result['p95_ms']:7.3f} {result['p99_ms']:7.3f} "
+                  f"{result['max_ms']:7.3f} {result['alloc_peak_bytes'] / 1024:9.1f} "
+                  f"{result['alloc_net_blocks_per_frame']:7.2f}")
+        print("  (times in ms; peak KiB allocated within one frame, net blocks kept per frame)")
+        app.audio_player.stop()
+        app.display.close()
+
+    if args.json:
+        report = {
+            'benchmark': 'screens',
+            'machine': machine_info(),
+            'config': {'frames': args.frames, 'files': args.files, 'long_names': args.long_names},
+            'screens': results,
+        }
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Results written to {args.json}")
+    return 0
+
+
+def run_session(app):
+    """Drive one full session the way a user would, rendering after each input
+
+    Select a test WAV and a sample, start playback, stop, "Play Again",
+    stop again and return home.
+    """
+    inputs = [
+        app.handle_select,                       # Start New Session
+        app.handle_select,                       # pick first test WAV
+        lambda: app.handle_button("right"),      # Next -> samples
+        app.handle_select,                       # pick first sample
+        lambda: app.handle_button("right"),      # Next -> recording toggle
+        lambda: app.handle_button("right"),      # Next -> confirm
+        lambda: app.handle_button("right"),      # START -> playback
+        lambda: app.handle_button("right"),      # Stop -> complete
+        app.handle_select,                       # Play Again
+        lambda: app.handle_button("right"),      # Stop -> complete
+        lambda: app.handle_scroll(1),
+        app.handle_select,                       # Return to Home
+    ]
+    for handle in inputs:
+        handle()
+        app.render()
+
+
+def memory_snapshot(app):
+    """Memory figures that grow if anything is retained per session"""
+    gc.collect()
+    return {
+        'allocated_blocks': sys.getallocatedblocks(),
+        'gc_objects': len(gc.get_objects()),
+        'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'history': len(app.state.screen_history),
+    }
+
+
+def bench_sessions(args):
+    """Memory use across many session cycles (should hold flat)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.TEST_WAVS_DIR, settings.SAMPLES_DIR = make_media_dirs(tmp, args.files, 20)
+        app = make_headless_app()
+        app.render()
+
+        print(f"Session memory report: {args.cycles} cycles, headless backend")
+        print(f"  {'cycles':>7s} {'blocks':>9s} {'objects':>9s} {'max RSS KiB':>11s} {'history':>7s}")
+        checkpoints = sorted({0, 1, 10} | set(range(0, args.cycles + 1, max(1, args.cycles // 8))))
+        start = time.perf_counter()
+        for cycle in range(args.cycles + 1):
+            if cycle in checkpoints:
+                snap = memory_snapshot(app)
+                print(f"  {cycle:7d} {snap['allocated_blocks']:9d} {snap['gc_objects']:9d} "
+                      f"{snap['max_rss_kib']:11d} {snap['history']:7d}")
+            if cycle < args.cycles:
+                run_session(app)
+        elapsed = time.perf_counter() - start
+        print(f"  {app.screens.get_stats()}, {elapsed / max(1, args.cycles) * 1000:.1f} ms/cycle")
+        app.audio_player.stop()
+        app.display.close()
+    return 0
+
+
+class OfflineChannel:
+    """Stand-in for pygame.mixer.Channel that renders into a buffer
+
+    Mimics SDL's mixing: render() pulls whole callback blocks, switching
+    to the queued sound at the exact sample the current one ends and
+    outputting silence when nothing is playing.
+    """
+
+    def __init__(self, frame_bytes):
+        self.frame_bytes = frame_bytes
+        self._sound = None
+        self._raw = b''
+        self._pos = 0
+        self._queue = None
+        self._paused = False
+
+    def play(self, sound):
+        self._sound, self._raw, self._pos = sound, sound.get_raw(), 0
+        self._queue = None
+
+    def queue(self, sound):
+        if self._sound is None:
+            self.play(sound)
+        else:
+            self._queue = sound
+
+    def stop(self):
+        self._sound, self._raw, self._queue = None, b'', None
+
+    def pause(self):
+        self._paused = True
+
+    def unpause(self):
+        self._paused = False
+
+    def get_busy(self):
+        return self._sound is not None
+
+    def get_queue(self):
+        return self._queue
+
+    def render(self, frames):
+        """Mix the next frames frames of output"""
+        out = bytearray()
+        wanted = frames * self.frame_bytes
+        while len(out) < wanted:
+            if self._sound is None or self._paused:
+                out += bytes(wanted - len(out))
+                break
+            chunk = self._raw[self._pos:self._pos + wanted - len(out)]
+            out += chunk
+            self._pos += len(chunk)
+            if self._pos >= len(self._raw):
+                self._sound, self._raw = None, b''
+                if self._queue is not None:
+                    self.play(self._queue)
+        return bytes(out)
+
+
+def make_tone_wavs(directory, count, seconds):
+    """WAVs holding a constant non-zero signal, so any silence is a gap"""
+    paths = []
+    frames = int(settings.AUDIO_SAMPLE_RATE * seconds)
+    for i in range(count):
+        path = os.path.join(directory, f"tone_{i}.wav")
+        with wave.open(path, 'wb') as wav:
+            wav.setnchannels(2)
+            wav.setsampwidth(2)
+            wav.setframerate(settings.AUDIO_SAMPLE_RATE)
+            wav.writeframes(struct.pack('<hh', 8000, 8000) * frames)
+        paths.append(path)
+    return paths
+
+
+def silent_runs_ms(pcm, frequency):
+    """Lengths (ms) of the silent stretches between non-silent audio"""
+    import numpy as np
+    frames = np.frombuffer(pcm, dtype=np.int16).reshape(-1, 2)
+    loud = np.flatnonzero(np.abs(frames).max(axis=1) > 0)
+    if len(loud) == 0:
+        return []
+    steps = np.diff(loud)
+    return [(step - 1) * 1000.0 / frequency for step in steps if step > 1]
+
+
+def render_player_offline(player, channel, block_frames):
+    """Play the whole playlist through the offline channel, servicing per block"""
+    out = bytearray()
+    # Decode the first track up front, play() would stream it otherwise
+    player.prepare()
+    player.play()
+    while not player.is_finished():
+        player.service()
+        out += channel.render(block_frames)
+    return bytes(out)
+
+
+def render_polled_offline(paths, channel, frequency, block_frames):
+    """The old transition: the UI polls is_busy() once per frame, then loads and plays"""
+    out = bytearray()
+    poll_frames = int(frequency / settings.FPS)
+    since_poll = 0
+    channel.play(pygame.mixer.Sound(paths[0]))
+    index = 0
+    while True:
+        out += channel.render(block_frames)
+        since_poll += block_frames
+        if since_poll < poll_frames:
+            continue
+        since_poll = 0
+        if channel.get_busy():
+            continue
+        index += 1
+        if index >= len(paths):
+            break
+        # Output keeps running (silent) while the next file is decoded
+        start = time.perf_counter()
+        sound = pygame.mixer.Sound(paths[index])
+        decode_frames = int((time.perf_counter() - start) * frequency)
+        out += channel.render(decode_frames)
+        channel.play(sound)
+    return bytes(out)
+
+
+def bench_gaps(args):
+    """Measure inter-track gaps in offline-rendered playlist output
+
+    Fails if a transition of the preloaded player is missing, extra, or off
+    its target gap by more than --tolerance-ms; the old UI-polled
+    transition is only reported for comparison.
+    """
+    from samplepi.audio import AudioPlayer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_tone_wavs(tmp, args.tracks, args.seconds)
+        block = settings.AUDIO_BUFFER_SIZE
+        print(f"Gap benchmark: {args.tracks} x {args.seconds:.2f}s tracks, "
+              f"{block}-frame blocks, offline render, tolerance {args.tolerance_ms:g} ms")
+
+        def report(label, pcm, frequency, expected_ms, checked=True):
+            gaps = silent_runs_ms(pcm, frequency)
+            worst = max((abs(gap - expected_ms) for gap in gaps), default=0.0)
+            measured = ", ".join(f"{gap:.2f}" for gap in gaps) or "none (gapless)"
+            # A gap under one frame leaves no silent run to measure
+            transitions = args.tracks - 1 if int(frequency * expected_ms / 1000.0) else 0
+            ok = len(gaps) == transitions and worst <= args.tolerance_ms
+            verdict = ('ok' if ok else 'FAIL') if checked else 'reference'
+            print(f"  {label:24s} expected {expected_ms:7.2f} ms  measured {measured}  "
+                  f"max error {worst:.3f} ms  {verdict}")
+            return ok or not checked
+
+        failed = False
+        for gap_ms in args.gaps_ms:
+            settings.AUDIO_TRACK_GAP_MS = gap_ms
+            player = AudioPlayer(channel=OfflineChannel(0))
+            frequency, size, channels = pygame.mixer.get_init()
+            player.channel.frame_bytes = abs(size) // 8 * channels
+            player.load_playlist(list(paths))
+            pcm = render_player_offline(player, player.channel, block)
+            failed |= not report(f"preloaded, gap {gap_ms:g} ms", pcm, frequency, gap_ms)
+
+        channel = OfflineChannel(abs(size) // 8 * channels)
+        report("UI-polled (old)", render_polled_offline(paths, channel, frequency, block), frequency, 0,
+               checked=False)
+    return 1 if failed else 0
+
+
+def bench_rotary(args):
+    """Rotary decoder on gpiozero mock pins: synthetic edge trains at several speeds
+
+    Each detent is one quadrature cycle driven on the CLK/DT mock pins; the
+    encoder runs on a virtual clock advanced by 1/speed per detent, so the
+    reported velocity can be checked exactly. Fails if any step is lost or
+    the velocity is off by more than 5%
+    (0 expected when detents are further apart than the velocity window).
+    """
+    os.environ['GPIOZERO_PIN_FACTORY'] = 'mock'
+    from gpiozero import Device
+    from samplepi.gpio.rotary import RotaryEncoder
+    from samplepi.ui.menu_list import MenuList, acceleration_gain
+
+    now = [0.0]
+    encoder = RotaryEncoder(clock=lambda: now[0])
+    if encoder.encoder is None:
+        print("Rotary benchmark: gpiozero mock pins not available")
+        return 1
+    clk = Device.pin_factory.pin(settings.ROTARY_CLK_PIN)
+    dt = Device.pin_factory.pin(settings.ROTARY_DT_PIN)
+    reports = []
+    encoder.on_rotate(lambda delta, velocity: reports.append((delta, velocity)))
+
+    def detent(direction):
+        # Both lines idle high (pull-ups); CLK leads DT clockwise
+        first, second = (clk, dt) if direction > 0 else (dt, clk)
+        first.drive_low()
+        second.drive_low()
+        first.drive_high()
+        second.drive_high()
+
+    print(f"Rotary benchmark: {args.detents} detents per train, mock pins, "
+          f"velocity window {settings.ROTARY_VELOCITY_WINDOW:g}s")
+    failed = False
+    for speed in args.speeds:
+        for direction in (1, -1):
+            menu = MenuList([f"item {i}" for i in range(100000)])
+            menu.selected_index = 50000
+            reports.clear()
+            # Let the previous train fall out of the velocity window
+            now[0] += 1.0
+            for _ in range(args.detents):
+                now[0] += 1.0 / speed
+                detent(direction)
+            for delta, velocity in reports:
+                menu.scroll(delta, velocity)
+            steps = sum(delta for delta, _ in reports)
+            velocities = [velocity for _, velocity in reports[1:]]
+            measured = sorted(velocities)[len(velocities) // 2] if velocities else 0.0
+            # Detents further apart than the window count as isolated (velocity 0)
+            expected = speed if 1.0 / speed <= settings.ROTARY_VELOCITY_WINDOW else 0.0
+            ok = steps == direction * args.detents and abs(measured - expected) <= 0.05 * expected
+            failed |= not ok
+            print(f"  {speed:6g} detents/s {'cw ' if direction > 0 else 'ccw'}: steps {steps:+5d}, "
+                  f"velocity {measured:7.2f}/s, gain {acceleration_gain(measured):2d}, "
+                  f"rows moved {menu.selected_index - 50000:+6d}  {'ok' if ok else 'FAIL'}")
+    encoder.cleanup()
+    return 1 if failed else 0
+
+
+def make_long_wav(path, minutes):
+    """A CD-format WAV of the given length, written sparse so it's instant to create"""
+    data_size = int(minutes * 60 * settings.AUDIO_SAMPLE_RATE) * 4
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + data_size, b'WAVE',
+                            b'fmt ', 16, 1, 2, settings.AUDIO_SAMPLE_RATE,
+                            settings.AUDIO_SAMPLE_RATE * 4, 4, 16, b'data', data_size))
+        f.truncate(44 + data_size)
+    return data_size
+
+
+def process_memory():
+    """Resident memory split into anonymous and file-backed pages (KiB)"""
+    memory = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmHWM", "VmRSS", "RssAnon", "RssFile"):
+                    memory[key] = int(value.split()[0])
+    except OSError:
+        memory["VmHWM"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return memory
+
+
+def bench_stream_worker(args):
+    """Child process of bench_stream: play one file with one engine, print JSON"""
+    from samplepi.audio import create_audio_player
+
+    # main() opened the mixer; each engine opens its own audio device
+    pygame.mixer.quit()
+    player = create_audio_player(args.engine)
+    before = process_memory()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    player.load_playlist([args.file])
+    if not player.play():
+        print(json.dumps({'error': 'playback failed'}))
+        return 1
+    time.sleep(args.seconds)
+    result = {
+        'engine': type(player).__name__,
+        'cpu_percent': 100.0 * (time.process_time() - cpu_start) / (time.perf_counter() - wall_start),
+        'before': before,
+        'after': process_memory(),
+    }
+    player.cleanup()
+    print(json.dumps(result))
+    return 0
+
+
+def bench_stream(args):
+    """RSS and CPU of the mixer and mmap engines playing a long WAV"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "long.wav")
+        data_size = make_long_wav(path, args.minutes)
+        print(f"Streaming benchmark: {args.minutes:g} min WAV ({data_size / 2**20:.0f} MiB), "
+              f"{args.seconds:g}s of playback per engine, each in its own process")
+        print(f"  {'engine':14s} {'CPU %':>6s} {'RSS MiB':>8s} {'anon MiB':>9s} "
+              f"{'file MiB':>9s} {'peak MiB':>9s}")
+        for engine in ("mixer", "mmap"):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "stream-worker", "--engine", engine,
+                 "--file", path, "--seconds", str(args.seconds)],
+                capture_output=True, text=True).stdout
+            try:
+                result = json.loads(output.strip().splitlines()[-1])
+            except (ValueError, IndexError):
+                print(f"  {engine:14s} failed")
+                continue
+            if 'error' in result:
+                print(f"  {engine:14s} {result['error']}")
+                continue
+            after = result['after']
+            print(f"  {result['engine']:14s} {result['cpu_percent']:6.2f} "
+                  f"{after.get('VmRSS', 0) / 1024:8.1f} {after.get('RssAnon', 0) / 1024:9.1f} "
+                  f"{after.get('RssFile', 0) / 1024:9.1f} {after.get('VmHWM', 0) / 1024:9.1f}")
+    return 0
+
+
+def bench_index(args):
+    """WAV metadata index: full build, unchanged rescan, one added file, reload"""
+    from samplepi.audio.metadata import WavIndex
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "wavs")
+        os.makedirs(directory)
+        names = []
+        for i in range(args.files):
+            name = f"take_{i:05d}.wav"
+            with wave.open(os.path.join(directory, name), 'wb') as wav:
+                wav.setnchannels(2)
+                wav.setsampwidth(2)
+                wav.setframerate(settings.AUDIO_SAMPLE_RATE)
+                wav.writeframes(b'\x00' * 4 * (i + 1))
+            names.append(name)
+        index_path = os.path.join(tmp, "index.json")
+
+        def timed(label, index, names):
+            before = index.get_stats()
+            start = time.perf_counter()
+            index.refresh(directory, names)
+            elapsed = (time.perf_counter() - start) * 1000
+            after = index.get_stats()
+            print(f"  {label:22s} {elapsed:9.1f} ms  parsed {after['parsed'] - before['parsed']:6d}  "
+                  f"reused {after['reused'] - before['reused']:6d}")
+
+        print(f"WAV index benchmark: {args.files} files")
+        index = WavIndex(index_path)
+        timed("full build", index, names)
+        timed("unchanged rescan", index, names)
+        with wave.open(os.path.join(directory, "new.wav"), 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(22050)
+            wav.writeframes(b'\x00' * 2 * 22050)
+        timed("one file added", index, names + ["new.wav"])
+        timed("reload from disk", WavIndex(index_path), names + ["new.wav"])
+
+        start = time.perf_counter()
+        paths = [os.path.join(directory, name) for name in names]
+        for path in paths:
+            index.lookup(path)
+        per_lookup = (time.perf_counter() - start) * 1e6 / max(1, len(paths))
+        print(f"  lookup                 {per_lookup:9.2f} us/file, index file "
+              f"{os.path.getsize(index_path) / 1024:.0f} KiB")
+
+        # Entering a file list only lists the directory on the UI thread;
+        # the index refresh runs on the resample scanner
+        settings.TEST_WAVS_DIR = directory
+        app = make_headless_app()
+        from samplepi.ui.screens.file_selection_screen import FileSelectionScreen
+        screen = FileSelectionScreen(app, "test_wavs", "Select Test WAV Files")
+        for label in ("screen entry", "screen re-entry"):
+            start = time.perf_counter()
+            screen.on_enter()
+            entry_ms = (time.perf_counter() - start) * 1000
+            screen.wait_for_index(60)
+            print(f"  {label:22s} {entry_ms:9.1f} ms on the UI thread, index current after "
+                  f"{(time.perf_counter() - start) * 1000:.0f} ms")
+    return 0
+
+
+def bench_resample(args):
+    """Background conversion throughput, and main thread wakeup latency meanwhile"""
+    import numpy as np
+    from samplepi.audio.metadata import wav_index
+    from samplepi.audio.resample import ResamplePipeline
+
+    wav_index.path = None
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "captures")
+        os.makedirs(directory)
+        rates = (48000, 96000)
+        for i in range(args.files):
+            rate = rates[i % len(rates)]
+            t = np.arange(int(rate * args.seconds)) / rate
+            tone = (0.5 * np.sin(2 * np.pi * 440.0 * t) * 32767).astype('<i2')
+            with wave.open(os.path.join(directory, f"capture_{i:03d}_{rate}.wav"), 'wb') as wav:
+                wav.setnchannels(2)
+                wav.setsampwidth(2)
+                wav.setframerate(rate)
+                wav.writeframes(np.repeat(tone, 2).tobytes())
+
+        print(f"Resample benchmark: {args.files} files of {args.seconds:g}s at 48/96 kHz "
+              f"-> {settings.AUDIO_SAMPLE_RATE} Hz")
+
+        def sleep_late_ms():
+            start = time.perf_counter()
+            time.sleep(0.01)
+            return (time.perf_counter() - start - 0.01) * 1000
+
+        idle = percentiles([sleep_late_ms() for _ in range(200)])
+        print(f"  no conversion: main thread late by p50 {idle['p50_ms']:.2f} / "
+              f"p99 {idle['p99_ms']:.2f} / max {idle['max_ms']:.2f} ms")
+        for workers in sorted({1, os.cpu_count() or 1}):
+            pipeline = ResamplePipeline(os.path.join(tmp, f"cache_{workers}"), workers)
+            pipeline.scan_async([directory])
+            # A 10 ms timer on the main thread stands in for the UI loop
+            late_ms = []
+            time.sleep(0.2)
+            while pipeline.get_stats()['pending']:
+                late_ms.append(sleep_late_ms())
+            pipeline.wait()
+            stats = pipeline.get_stats()
+            late = percentiles(late_ms or [0.0])
+            print(f"  {workers:2d} workers: {stats['completed']}/{stats['submitted']} done in "
+                  f"{stats['wall_seconds']:.2f}s, {stats['realtime_factor']:.1f}x realtime, "
+                  f"{stats['mb_in_per_s']:.1f} MB/s in; main thread late by "
+                  f"p50 {late['p50_ms']:.2f} / p99 {late['p99_ms']:.2f} / max {late['max_ms']:.2f} ms")
+            pipeline.shutdown()
+    return 0
+
+
+def bench_loudness(args):
+    """Loudness analysis throughput and memory on a long file, and per-block gain cost"""
+    import numpy as np
+    from samplepi.audio.loudness import analyze_wav, apply_gain
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "long.wav")
+        rate = settings.AUDIO_SAMPLE_RATE
+        rng = np.random.default_rng(0)
+        with wave.open(path, 'wb') as wav:
+            wav.setnchannels(2)
+            wav.setsampwidth(2)
+            wav.setframerate(rate)
+            for _ in range(int(args.minutes * 60)):
+                noise = rng.normal(0.0, 0.1, rate * 2).clip(-1.0, 1.0)
+                wav.writeframes((noise * 32767).astype('<i2').tobytes())
+        size_mib = os.path.getsize(path) / 2**20
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        info = analyze_wav(path)
+        elapsed = time.perf_counter() - start
+        peak_mib = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        print(f"Loudness benchmark: {args.minutes:g} min stereo WAV ({size_mib:.0f} MiB)")
+        print(f"  analysis: {elapsed:.2f}s ({args.minutes * 60 / elapsed:.0f}x realtime), "
+              f"peak allocations {peak_mib:.1f} MiB")
+        print(f"  peak {info.peak_db:.2f} dBFS, RMS {info.rms_db:.2f} dBFS, {info.lufs:.2f} LUFS")
+
+        block = bytearray(rng.integers(-3000, 3000, settings.AUDIO_BUFFER_SIZE * 2, dtype=np.int16).tobytes())
+        runs = 2000
+        start = time.perf_counter()
+        for _ in range(runs):
+            apply_gain(memoryview(block), '<i2', 0.5)
+        per_block_us = (time.perf_counter() - start) / runs * 1e6
+        block_ms = settings.AUDIO_BUFFER_SIZE / rate * 1000
+        print(f"  gain on a {settings.AUDIO_BUFFER_SIZE}-frame block: {per_block_us:.1f} us "
+              f"({per_block_us / 10 / block_ms:.2f}% of the {block_ms:.1f} ms it plays for)")
+    return 0
+
+
+def bench_trigger(args):
+    """Synchronized start: achieved vs target trigger-to-audio offset over recorded playbacks (mock GPIO)"""
+    if args.engine:
+        settings.AUDIO_ENGINE = args.engine
+    settings.CAMERA_START_OFFSET_MS = args.offset_ms
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.TEST_WAVS_DIR = tmp
+        make_tone_wavs(tmp, 1, args.track_seconds)
+        # main() opened the mixer, the mmap engine needs the device to itself
+        pygame.mixer.quit()
+        app = make_headless_app()
+        from samplepi.ui.screens.playback_screen import PlaybackScreen
+        # Don't time the first pulse against GPIO setup
+        app.camera_trigger
+        app.state.selected_test_wavs = ["tone_0.wav"]
+        app.state.record_video = True
+        print(f"Trigger benchmark: {args.runs} recorded playbacks of a {args.track_seconds:g}s track, "
+              f"{settings.AUDIO_ENGINE} engine, {settings.AUDIO_BUFFER_SIZE}-frame buffer, "
+              f"target offset {args.offset_ms:+g} ms")
+        enter_ms = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            app.state.goto_screen(app.screens.get(PlaybackScreen))
+            enter_ms.append((time.perf_counter() - start) * 1000)
+            deadline = time.monotonic() + 0.5 + abs(args.offset_ms) / 1000.0
+            while app.trigger_latency.last is None or time.monotonic() < deadline:
+                app.update()
+                time.sleep(0.01)
+                if time.monotonic() > deadline + 2.0:
+                    break
+            app.state.current_screen.stop_playback()
+        stats = app.trigger_latency.get_stats()
+        app.audio_player.cleanup()
+    # The first visit decodes the track, later ones find it in the cache
+    print(f"  screen entry blocked the UI {enter_ms[0]:.1f} ms on the first run, "
+          f"p50 {percentiles(enter_ms[1:] or enter_ms)['p50_ms']:.1f} ms after")
+    if not stats['count'] and stats['estimates']:
+        print(f"  no measurements: the {settings.AUDIO_ENGINE} engine doesn't observe its start "
+              f"({stats['estimates']} scheduled starts); use --engine mmap")
+        return 0
+    if not stats['count']:
+        print("  no measurements (audio never started)")
+        return 1
+    print(f"  |error| p50 {stats['p50_ms']:.1f} p95 {stats['p95_ms']:.1f} p99 {stats['p99_ms']:.1f} "
+          f"max {stats['max_ms']:.1f} ms over {stats['count']} pulses")
+    print(f"  achieved offset {stats['min_offset_ms']:+.1f} to {stats['max_offset_ms']:+.1f} ms "
+          f"(positive: audio after the pulse)")
+    return 0
+
+
+def bench_pulse(args):
+    """Pulse width and start accuracy of the camera trigger against a mock pin
+
+    Fails if any rising edge is off its scheduled time by more than
+    --start-tolerance-ms or any pulse width (edges or pin) is off by more
+    than --width-tolerance-ms.
+    """
+    os.environ['GPIOZERO_PIN_FACTORY'] = 'mock'
+    from samplepi.gpio.camera import CameraTrigger
+    trigger = CameraTrigger()
+    if trigger.trigger is None:
+        print("Pulse benchmark: gpiozero mock pins not available")
+        return 1
+    pin = trigger.trigger.pin
+    print(f"Pulse benchmark: {args.pulses} pulses per width, mock pin, "
+          f"spin {settings.CAMERA_TRIGGER_SPIN_MS:g} ms, priority {settings.CAMERA_TRIGGER_PRIORITY}, "
+          f"tolerance start {args.start_tolerance_ms:g} ms, width {args.width_tolerance_ms:g} ms")
+    failed = False
+    try:
+        for width_ms in args.widths_ms:
+            call_ms, start_ms, width_error_ms, pin_error_ms = [], [], [], []
+            for _ in range(args.pulses):
+                pin.clear_states()
+                start = time.monotonic() + 0.005
+                before = time.perf_counter()
+                pulse = trigger.send_pulse(start, width_ms / 1000.0)
+                call_ms.append((time.perf_counter() - before) * 1000)
+                pulse.wait()
+                start_ms.append((pulse.rising_time - start) * 1000)
+                width_error_ms.append(abs(pulse.width * 1000 - width_ms))
+                # The mock pin logs each change with the time since the previous one
+                pin_error_ms.append(abs(pin.states[-1].timestamp * 1000 - width_ms))
+            print(f"  {width_ms:g} ms pulses:")
+            for label, samples, tolerance in (
+                    ("send_pulse call", call_ms, None),
+                    ("rising edge late", start_ms, args.start_tolerance_ms),
+                    ("width error (edges)", width_error_ms, args.width_tolerance_ms),
+                    ("width error (pin)", pin_error_ms, args.width_tolerance_ms)):
+                stats = percentiles(samples)
+                verdict = ""
+                if tolerance is not None:
+                    ok = max(abs(sample) for sample in samples) <= tolerance
+                    failed |= not ok
+                    verdict = "  ok" if ok else "  FAIL"
+                print(f"    {label:20s} p50 {stats['p50_ms']:.3f} p99 {stats['p99_ms']:.3f} "
+                      f"max {stats['max_ms']:.3f} ms{verdict}")
+    finally:
+        trigger.cleanup()
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SamplePi benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fb_parser = subparsers.add_parser("framebuffer", help="framebuffer conversion frames/sec")
+    fb_parser.add_argument("--frames", type=int, default=200)
+    fb_parser.add_argument("--legacy-frames", type=int, default=2)
+    fb_parser.set_defaults(func=bench_framebuffer)
+
+    idle_parser = subparsers.add_parser("idle", help="idle CPU usage of the main loop")
+    idle_parser.add_argument("--seconds", type=float, default=5.0)
+    idle_parser.set_defaults(func=bench_idle)
+
+    screens_parser = subparsers.add_parser("screens", help="per-screen render time and allocations")
+    screens_parser.add_argument("--frames", type=int, default=300)
+    screens_parser.add_argument("--files", type=int, default=10000)
+    screens_parser.add_argument("--long-names", type=int, default=500)
+    screens_parser.add_argument("--json", metavar="PATH", help="write machine-readable results")
+    screens_parser.set_defaults(func=bench_screens)
+
+    sessions_parser = subparsers.add_parser("sessions", help="memory use across session cycles")
+    sessions_parser.add_argument("--cycles", type=int, default=2000)
+    sessions_parser.add_argument("--files", type=int, default=200)
+    sessions_parser.set_defaults(func=bench_sessions)
+
+    gaps_parser = subparsers.add_parser("gaps", help="inter-track gaps in offline-rendered output")
+    gaps_parser.add_argument("--gaps-ms", type=lambda v: [float(x) for x in v.split(",")],
+                             default=[0.0, 10.0, 250.0])
+    gaps_parser.add_argument("--tracks", type=int, default=4)
+    gaps_parser.add_argument("--seconds", type=float, default=0.5)
+    gaps_parser.add_argument("--tolerance-ms", type=float, default=0.5)
+    gaps_parser.set_defaults(func=bench_gaps)
+
+    stream_parser = subparsers.add_parser("stream", help="RSS and CPU of the audio engines on a long WAV")
+    stream_parser.add_argument("--minutes", type=float, default=60.0)
+    stream_parser.add_argument("--seconds", type=float, default=20.0)
+    stream_parser.set_defaults(func=bench_stream)
+
+    index_parser = subparsers.add_parser("index", help="WAV metadata index build and refresh times")
+    index_parser.add_argument("--files", type=int, default=2000)
+    index_parser.set_defaults(func=bench_index)
+
+    resample_parser = subparsers.add_parser("resample", help="Background resampling throughput")
+    resample_parser.add_argument("--files", type=int, default=8)
+    resample_parser.add_argument("--seconds", type=float, default=30.0)
+    resample_parser.set_defaults(func=bench_resample)
+
+    loudness_parser = subparsers.add_parser("loudness", help="Loudness analysis and gain cost")
+    loudness_parser.add_argument("--minutes", type=float, default=10.0)
+    loudness_parser.set_defaults(func=bench_loudness)
+
+    trigger_parser = subparsers.add_parser("trigger", help="Synchronized audio and camera trigger start")
+    trigger_parser.add_argument("--runs", type=int, default=20)
+    trigger_parser.add_argument("--engine", choices=["mixer", "mmap"], default=None)
+    trigger_parser.add_argument("--offset-ms", type=float, default=0.0)
+    trigger_parser.add_argument("--track-seconds", type=float, default=2.0)
+    trigger_parser.set_defaults(func=bench_trigger)
+
+    pulse_parser = subparsers.add_parser("pulse", help="Camera trigger pulse timing accuracy")
+    pulse_parser.add_argument("--pulses", type=int, default=50)
+    pulse_parser.add_argument("--widths-ms", type=lambda v: [float(x) for x in v.split(",")],
+                              default=[100.0, 5.0])
+    pulse_parser.add_argument("--start-tolerance-ms", type=float, default=1.0)
+    pulse_parser.add_argument("--width-tolerance-ms", type=float, default=0.5)
+    pulse_parser.set_defaults(func=bench_pulse)
+
+    rotary_parser = subparsers.add_parser("rotary", help="Rotary decoder on mock pins at several speeds")
+    rotary_parser.add_argument("--detents", type=int, default=40)
+    rotary_parser.add_argument("--speeds", type=lambda v: [float(x) for x in v.split(",")],
+                               default=[2.0, 8.0, 20.0, 60.0])
+    rotary_parser.set_defaults(func=bench_rotary)
+
+    worker_parser = subparsers.add_parser("stream-worker")
+    worker_parser.add_argument("--engine", required=True)
+    worker_parser.add_argument("--file", required=True)
+    worker_parser.add_argument("--seconds", type=float, required=True)
+    worker_parser.set_defaults(func=bench_stream_worker)
+
+    args = parser.parse_args()
+    pygame.init()
+    try:
+        return args.func(args)
+    finally:
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -60,7 +60,7 @@ fi
 echo "[6/8] Installing Python packages..."
 source .venv/bin/activate
 pip install --upgrade pip
-pip install pygame gpiozero RPi.GPIO
+pip install pygame numpy gpiozero RPi.GPIO
 
 # Create media directories
 echo "[7/8] Creating media directories..."
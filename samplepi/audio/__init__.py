@@ -1,2 +1,5 @@
 """Audio playback module"""
-from .player import AudioPlayer
+from .player import AudioPlayer, create_audio_player
+from .pcm_cache import PCMCache
+from .metadata import WavIndex, WavInfo, wav_index
+from .resample import ResamplePipeline, resample_pipeline
@@ -0,0 +1,245 @@
+"""Loudness analysis and playback gain"""
+
+import math
+import os
+from collections import namedtuple
+from samplepi.config import settings
+from samplepi.audio.metadata import FileIndex
+from samplepi.audio.samples import map_samples, decode_samples
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# Peak and RMS in dBFS, integrated loudness in LUFS (ITU-R BS.1770);
+# None where the file is digital silence
+LoudnessInfo = namedtuple('LoudnessInfo', ['peak_db', 'rms_db', 'lufs'])
+
+
+def _biquad_power(b, a, w):
+    """|H(e^jw)|^2 of a biquad at angular frequencies w"""
+    z = np.exp(-1j * w)
+    return np.abs((b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)) ** 2
+
+
+def k_weighting_power(rate, w):
+    """Power response of the BS.1770 K-weighting filter (shelf + high-pass) at rate"""
+    # High shelf: +4 dB above ~1.5 kHz (head diffraction)
+    gain = 10 ** (4.0 / 40.0)
+    w0 = 2 * math.pi * 1500.0 / rate
+    alpha = math.sin(w0) / (2 * (1 / math.sqrt(2)))
+    cos_w0, root = math.cos(w0), 2 * math.sqrt(gain) * alpha
+    shelf_b = (gain * ((gain + 1) + (gain - 1) * cos_w0 + root),
+               -2 * gain * ((gain - 1) + (gain + 1) * cos_w0),
+               gain * ((gain + 1) + (gain - 1) * cos_w0 - root))
+    shelf_a = ((gain + 1) - (gain - 1) * cos_w0 + root,
+               2 * ((gain - 1) - (gain + 1) * cos_w0),
+               (gain + 1) - (gain - 1) * cos_w0 - root)
+
+    # High-pass at 38 Hz (RLB weighting)
+    w0 = 2 * math.pi * 38.0 / rate
+    alpha = math.sin(w0) / (2 * 0.5)
+    cos_w0 = math.cos(w0)
+    pass_b = ((1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2)
+    pass_a = (1 + alpha, -2 * cos_w0, 1 - alpha)
+
+    return _biquad_power(shelf_b, shelf_a, w) * _biquad_power(pass_b, pass_a, w)
+
+
+def _db(power):
+    return 10 * math.log10(power) if power > 0 else None
+
+
+def analyze_wav(path, chunk_seconds=30.0):
+    """LoudnessInfo of a WAV file, computed chunk by chunk
+
+    The file is memory-mapped and decoded chunk_seconds at a time. Peak
+    and RMS are plain sample statistics. For integrated loudness each
+    100 ms block is K-weighted in the frequency domain (block power
+    spectrum times the filter's power response, Parseval), 400 ms gating
+    blocks are formed from four consecutive blocks, and the absolute
+    (-70 LUFS) and relative (-10 LU) gates of BS.1770 are applied.
+    Channels are weighted equally (no surround weighting).
+    """
+    header, raw = map_samples(path)
+    rate = header.sample_rate
+    block = max(1, int(round(rate * 0.1)))
+    chunk_frames = block * max(1, int(chunk_seconds * 10))
+
+    # Parseval weights of the rfft bins, including the K-weighting response
+    bins = block // 2 + 1
+    parseval = np.full(bins, 2.0)
+    parseval[0] = 1.0
+    if block % 2 == 0:
+        parseval[-1] = 1.0
+    spectrum_weights = (parseval * k_weighting_power(rate, 2 * math.pi * np.arange(bins) / block)
+                        / (block * block)).astype(np.float64)
+
+    peak = 0.0
+    square_sum = 0.0
+    samples_total = 0
+    block_powers = []
+    frames_total = header.data_size // header.block_align
+    for first in range(0, frames_total, chunk_frames):
+        last = min(frames_total, first + chunk_frames)
+        x = decode_samples(raw[first * header.block_align:last * header.block_align], header)
+        if not len(x):
+            continue
+        peak = max(peak, float(np.abs(x).max()))
+        square_sum += float(np.einsum('ij,ij->', x, x, dtype=np.float64))
+        samples_total += x.size
+
+        # Whole 100 ms blocks only (the tail of the file is not gated)
+        whole = len(x) // block
+        if whole:
+            spectrum = np.fft.rfft(x[:whole * block].reshape(whole, block, -1), axis=1)
+            power = (np.abs(spectrum) ** 2 * spectrum_weights[None, :, None]).sum(axis=(1, 2))
+            block_powers.append(power)
+
+    peak_db = 20 * math.log10(peak) if peak > 0 else None
+    rms_db = _db(square_sum / samples_total) if samples_total else None
+
+    lufs = None
+    powers = np.concatenate(block_powers) if block_powers else np.zeros(0)
+    if len(powers) >= 4:
+        gating = np.convolve(powers, np.ones(4) / 4.0, mode='valid')
+        gated = gating[gating > 10 ** ((-70.0 + 0.691) / 10)]
+        if len(gated):
+            relative = -0.691 + 10 * math.log10(gated.mean()) - 10.0
+            gated = gated[gated > 10 ** ((relative + 0.691) / 10)]
+            lufs = -0.691 + 10 * math.log10(gated.mean())
+    return LoudnessInfo(peak_db, rms_db, lufs)
+
+
+def track_gain(info):
+    """Linear gain taking a track to LOUDNESS_TARGET_LUFS, limited by its peak and the max boost"""
+    target = settings.LOUDNESS_TARGET_LUFS
+    if target is None or info is None or info.lufs is None:
+        return 1.0
+    gain_db = min(target - info.lufs, settings.LOUDNESS_MAX_GAIN_DB)
+    if info.peak_db is not None:
+        gain_db = min(gain_db, settings.LOUDNESS_PEAK_CEILING_DB - info.peak_db)
+    return 10 ** (gain_db / 20.0)
+
+
+def apply_gain(buffer, dtype, gain):
+    """Scale the samples in a writable buffer in place, clipped to the sample range
+
+    One vectorized pass; dtype is the numpy sample type ('<i2', 'u1', ...).
+    """
+    samples = np.frombuffer(buffer, dtype=dtype)
+    if samples.dtype.kind == 'f':
+        np.multiply(samples, gain, out=samples)
+        np.clip(samples, -1.0, 1.0, out=samples)
+        return
+    limits = np.iinfo(samples.dtype)
+    # Unsigned samples are centered halfway up their range
+    center = (int(limits.max) + 1) // 2 if limits.min == 0 else 0
+    scaled = (samples.astype(np.float32) - center) * gain + center
+    np.clip(scaled, limits.min, limits.max, out=scaled)
+    np.rint(scaled, out=scaled)
+    samples[:] = scaled
+
+
+class LoudnessIndex(FileIndex):
+    """Analysis results by path, filled in ahead of playback by pool workers
+
+    submit() queues an analysis on the background pool unless the file
+    already has a current entry; results are saved once no analysis is
+    pending. gain() only looks the result up, so starting a track never
+    waits for an analysis (an unanalyzed track plays at unity gain).
+    """
+
+    description = "loudness index"
+
+    def __init__(self, path=None):
+        super().__init__(path)
+        self._pending = set()
+        self._unnormalized = set()  # paths already reported as played at unity gain
+        self.analyzed = 0
+        self.failed = 0
+
+    def _from_json(self, fields):
+        return LoudnessInfo(*fields)
+
+    def submit(self, path, pool):
+        """Analyze path on pool (a ResamplePipeline) if it changed since its last analysis"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            self._load()
+            if self._is_current(path, stat) or path in self._pending:
+                return
+            self._pending.add(path)
+        job = pool.run(analyze_wav, path)
+        job.add_done_callback(lambda job: self._analyzed(path, stat, job))
+
+    def _analyzed(self, path, stat, job):
+        """Pool callback thread: store a result, save when the last pending one is in"""
+        if job.cancelled():
+            with self._lock:
+                self._pending.discard(path)
+            return
+        try:
+            info = job.result()
+        except Exception as e:
+            print(f"Error analyzing {path}: {e}")
+            info = None
+        with self._lock:
+            self._pending.discard(path)
+            if info is None:
+                self.failed += 1
+            else:
+                self._entries[path] = (stat.st_size, stat.st_mtime_ns, info)
+                self.revision += 1
+                self._unnormalized.discard(path)
+                self.analyzed += 1
+            drained = not self._pending
+        if drained:
+            self.save()
+
+    def gain(self, path):
+        """Playback gain for path (1.0 until it has been analyzed as it is now)
+
+        With a target set, a track played at unity gain is logged once.
+        """
+        if settings.LOUDNESS_TARGET_LUFS is None:
+            return 1.0
+        if not NUMPY_AVAILABLE:
+            return self._unity(path, "numpy not available")
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return 1.0
+        with self._lock:
+            self._load()
+            if self._is_current(path, stat):
+                return track_gain(self._entries[path][2])
+        return self._unity(path, "not analyzed yet")
+
+    def _unity(self, path, reason):
+        with self._lock:
+            if path in self._unnormalized:
+                return 1.0
+            self._unnormalized.add(path)
+        print(f"Loudness: {os.path.basename(path)} plays unnormalized ({reason})")
+        return 1.0
+
+    def get_stats(self):
+        """Get entry and analysis counts"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'pending': len(self._pending),
+                'analyzed': self.analyzed,
+                'failed': self.failed,
+            }
+
+
+# Shared by the players and the background pipeline
+loudness_index = LoudnessIndex(settings.LOUDNESS_INDEX_PATH)
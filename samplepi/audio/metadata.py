@@ -0,0 +1,249 @@
+"""Persistent indexes of per-file WAV data"""
+
+import json
+import os
+import struct
+import threading
+from collections import namedtuple
+from samplepi.config import settings
+
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Sample encodings the players can decode: (format tag, bits per sample)
+PLAYABLE_FORMATS = {
+    (WAVE_FORMAT_PCM, 8), (WAVE_FORMAT_PCM, 16), (WAVE_FORMAT_PCM, 24),
+    (WAVE_FORMAT_PCM, 32), (WAVE_FORMAT_IEEE_FLOAT, 32),
+}
+
+
+class WavFormatError(ValueError):
+    """File is not a WAV file (or its header is damaged)"""
+
+
+WavHeader = namedtuple('WavHeader', [
+    'format_tag', 'channels', 'sample_rate', 'block_align', 'bits', 'data_offset', 'data_size'])
+
+
+def read_wav_header(f):
+    """Parse the RIFF header of an open WAV file up to the start of its data chunk
+
+    Only the chunk headers are read; the file position is left at the
+    first sample. data_size is trimmed to the file and to whole frames.
+    """
+    file_size = os.fstat(f.fileno()).st_size
+    try:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+    except struct.error:
+        raise WavFormatError("not a RIFF/WAVE file")
+    if riff != b'RIFF' or wave_id != b'WAVE':
+        raise WavFormatError("not a RIFF/WAVE file")
+
+    fmt = None
+    data_offset = data_size = None
+    while data_offset is None:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        chunk_id, chunk_size = struct.unpack('<4sI', header)
+        if chunk_id == b'fmt ':
+            fmt = f.read(chunk_size)
+            f.seek(chunk_size & 1, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            data_offset = f.tell()
+            # Streamed recordings leave the size unset
+            data_size = min(chunk_size, file_size - data_offset)
+        else:
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+    if fmt is None or len(fmt) < 16 or data_offset is None:
+        raise WavFormatError("missing fmt or data chunk")
+    format_tag, channels, sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        format_tag = struct.unpack('<H', fmt[24:26])[0]
+    if block_align == 0 or sample_rate == 0:
+        raise WavFormatError("invalid fmt chunk")
+    data_size -= data_size % block_align
+    return WavHeader(format_tag, channels, sample_rate, block_align, bits, data_offset, data_size)
+
+
+class WavInfo(namedtuple('WavInfo', ['frames', 'sample_rate', 'channels', 'bits', 'format_tag', 'error'])):
+    """Metadata of one WAV file; error is set (and the rest 0) if it can't be parsed"""
+
+    __slots__ = ()
+
+    @property
+    def seconds(self):
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+    @property
+    def playable(self):
+        """Check if the header parsed and the sample encoding is supported"""
+        return self.error is None and (self.format_tag, self.bits) in PLAYABLE_FORMATS
+
+
+def read_wav_info(path):
+    """WavInfo for path, parsed from its RIFF header only"""
+    try:
+        with open(path, 'rb') as f:
+            header = read_wav_header(f)
+    except (OSError, WavFormatError) as e:
+        return WavInfo(0, 0, 0, 0, 0, str(e) or type(e).__name__)
+    return WavInfo(header.data_size // header.block_align, header.sample_rate,
+                   header.channels, header.bits, header.format_tag, None)
+
+
+class FileIndex:
+    """Values computed from files, kept on disk and valid while size and mtime match
+
+    Entries are (size, mtime_ns, value) by path; subclasses decide how
+    values are computed and (de)serialized. The file is written
+    atomically; path None keeps the index in memory only.
+    """
+
+    version = 1
+    description = "index"
+
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = {}  # path -> (size, mtime_ns, value)
+        self._lock = threading.Lock()
+        self._loaded = False
+        # Bumped whenever entries change, so views drawn from lookup() can tell
+        self.revision = 0
+
+    def _to_json(self, value):
+        return list(value)
+
+    def _from_json(self, fields):
+        return fields
+
+    def _load(self):
+        """Read the index file on first use (call with the lock held)"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path:
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring {self.description} {self.path}: {e}")
+            return
+        if data.get('version') != self.version:
+            return
+        for path, (size, mtime_ns, *fields) in data.get('files', {}).items():
+            self._entries[path] = (size, mtime_ns, self._from_json(fields))
+        self.revision += 1
+
+    def save(self):
+        """Write the index file"""
+        if not self.path:
+            return
+        with self._lock:
+            files = {path: [size, mtime_ns, *self._to_json(value)]
+                     for path, (size, mtime_ns, value) in self._entries.items()}
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': self.version, 'files': files}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: could not save {self.description} {self.path}: {e}")
+
+    def _is_current(self, path, stat):
+        """Check if the entry for path was made from the file as it is now"""
+        entry = self._entries.get(path)
+        return entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns
+
+    def lookup(self, path):
+        """Value for path as last computed (None if there is none)
+
+        No file I/O once the index file was read, which the first call does.
+        """
+        if not self._loaded:
+            with self._lock:
+                self._load()
+        entry = self._entries.get(path)
+        return entry[2] if entry is not None else None
+
+
+class WavIndex(FileIndex):
+    """WAV metadata by path
+
+    refresh() brings a directory's entries up to date, parsing only the
+    headers of new or changed files; lookup() is then a dict lookup with
+    no file I/O, for use while rendering. get() validates a single file
+    against its stat first. The index is saved after a refresh changed it.
+    """
+
+    description = "WAV index"
+
+    def __init__(self, path=None):
+        super().__init__(path)
+        self.parsed = 0
+        self.reused = 0
+
+    def _from_json(self, fields):
+        return WavInfo(*fields)
+
+    def _update(self, path, stat):
+        """Entry for path, reparsed if stat doesn't match it; returns True if it changed"""
+        if self._is_current(path, stat):
+            self.reused += 1
+            return False
+        self._entries[path] = (stat.st_size, stat.st_mtime_ns, read_wav_info(path))
+        self.parsed += 1
+        self.revision += 1
+        return True
+
+    def refresh(self, directory, names):
+        """Index the files `names` in directory and forget the ones that are gone"""
+        changed = False
+        with self._lock:
+            self._load()
+            paths = set()
+            for name in names:
+                path = os.path.join(directory, name)
+                paths.add(path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                changed |= self._update(path, stat)
+            for path in [p for p in self._entries if os.path.dirname(p) == directory and p not in paths]:
+                del self._entries[path]
+                self.revision += 1
+                changed = True
+        if changed:
+            self.save()
+
+    def get(self, path):
+        """WavInfo for path, reparsing it if it changed (None if it doesn't exist)"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            self._load()
+            self._update(path, stat)
+            return self._entries[path][2]
+
+    def get_stats(self):
+        """Get entry and parse counts"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'parsed': self.parsed,
+                'reused': self.reused,
+            }
+
+
+# Shared by the screens and the players
+wav_index = WavIndex(settings.WAV_INDEX_PATH)
@@ -0,0 +1,463 @@
+"""Memory-mapped WAV streaming engine"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+from samplepi.config import settings
+from samplepi.audio.metadata import (
+    WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT, WavFormatError, read_wav_header)
+from samplepi.audio.timeline import Timeline, PlaybackClock
+from samplepi.audio.resample import resample_pipeline
+from samplepi.audio.loudness import loudness_index, apply_gain
+
+try:
+    from pygame._sdl2 import audio as sdl_audio, sdl2
+    MMAP_ENGINE_AVAILABLE = True
+except ImportError:
+    MMAP_ENGINE_AVAILABLE = False
+
+
+def _sdl_format(format_tag, bits):
+    """SDL audio format for a WAV sample encoding"""
+    formats = {
+        (WAVE_FORMAT_PCM, 8): sdl_audio.AUDIO_U8,
+        (WAVE_FORMAT_PCM, 16): sdl_audio.AUDIO_S16LSB,
+        (WAVE_FORMAT_PCM, 32): sdl_audio.AUDIO_S32LSB,
+        (WAVE_FORMAT_IEEE_FLOAT, 32): sdl_audio.AUDIO_F32LSB,
+    }
+    if (format_tag, bits) not in formats:
+        raise WavFormatError(f"unsupported sample format {format_tag:#x}/{bits}-bit")
+    return formats[(format_tag, bits)]
+
+
+class WavMapping:
+    """A WAV file with its RIFF header parsed once and the data chunk memory-mapped
+
+    `data` is a read-only memoryview over the sample bytes; slicing it
+    does not copy.
+    """
+
+    def __init__(self, path, gain=1.0):
+        self.path = path
+        self.gain = gain  # applied by the player as samples are copied out
+        with open(path, 'rb') as f:
+            header = read_wav_header(f)
+            self.channels = header.channels
+            self.frequency = header.sample_rate
+            self.audio_format = _sdl_format(header.format_tag, header.bits)
+            self.frame_bytes = header.block_align
+            data_offset, data_size = header.data_offset, header.data_size
+            file_size = os.fstat(f.fileno()).st_size
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if file_size else None
+
+        if self._mmap is not None and hasattr(self._mmap, 'madvise'):
+            self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+        self.data = memoryview(self._mmap)[data_offset:data_offset + data_size] if data_size else memoryview(b'')
+        self._data_offset = data_offset
+
+    @property
+    def format_key(self):
+        """(frequency, SDL format, channels) the output device needs"""
+        return (self.frequency, self.audio_format, self.channels)
+
+    @property
+    def frames(self):
+        return len(self.data) // self.frame_bytes
+
+    def prefetch(self, nbytes):
+        """Ask the kernel to read the first nbytes of samples ahead of playback"""
+        if self._mmap is None or not hasattr(self._mmap, 'madvise') or not len(self.data):
+            return
+        start = self._data_offset - self._data_offset % mmap.PAGESIZE
+        length = min(len(self._mmap) - start, nbytes + self._data_offset - start)
+        self._mmap.madvise(mmap.MADV_WILLNEED, start, length)
+
+    def close(self):
+        """Unmap the file"""
+        self.data.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class MmapWavPlayer:
+    """Plays WAV playlists straight from memory-mapped files
+
+    Drop-in for AudioPlayer (see create_audio_player). An SDL audio device
+    is opened in each file's own format, so the device callback only
+    copies sample bytes from the mapping into SDL's buffer, one block of
+    AUDIO_BUFFER_SIZE frames at a time; SDL converts to the hardware
+    format. Consecutive tracks in the same format switch inside the
+    callback (gapless, or with AUDIO_TRACK_GAP_MS of silence); a format
+    change reopens the device from the monitor thread. The loudness
+    normalization gain is applied to each block as it is copied, in one
+    vectorized pass.
+
+    Positions are in frames at AUDIO_SAMPLE_RATE. Every callback anchors a
+    clock at the frame SDL is about to play, the clock interpolates up to
+    the last frame handed over, so get_progress() does no file I/O.
+    start_time is when the first sample of the current playback was
+    handed over (the callback time, plus its offset in the block); it
+    reaches the output output_latency (one block) later. play(start_at)
+    has the first callback open with as much silence as puts that sample
+    at start_at; prepare() maps the track and opens the device beforehand.
+    """
+
+    # start_time is stamped by the device callback that output the sample
+    start_observed = True
+
+    def __init__(self):
+        sdl2.init_subsystem(sdl2.INIT_AUDIO)
+        self.playlist = []
+        self.current_index = 0
+        self.is_playing = False
+        self.is_paused = False
+        self.gap_ms = settings.AUDIO_TRACK_GAP_MS
+
+        self._device = None
+        self._device_format = None
+        self._silence = b''
+        self._sample_dtype = None  # numpy type of the device's samples
+        self._track = None  # WavMapping being played
+        self._pos = 0  # byte offset into self._track.data
+        self._gap_left = 0  # bytes of silence still to output before self._pos
+        self._next = None  # (index, WavMapping) preloaded behind the track
+        self._prepared = None  # (index, WavMapping) mapped by prepare() for play()
+        self._start_at = None  # monotonic time the first sample of play(start_at) is due
+        self._track_done = False
+        self._restart_at = None  # monotonic time a format-changing track may start
+        self._retired = []  # mappings to close outside the callback
+        self.sample_rate = settings.AUDIO_SAMPLE_RATE
+        self.timeline = Timeline(rate=self.sample_rate)
+        self._clock = PlaybackClock(self.sample_rate)  # frames of self._track, at its rate
+        self.start_time = None
+        self.output_latency = settings.AUDIO_BUFFER_SIZE / self.sample_rate
+        self._lock = threading.Lock()
+        self._monitor = None
+        self._monitor_stop = threading.Event()
+
+    def load_playlist(self, file_paths):
+        """Load a playlist of WAV files"""
+        self.stop()
+        self.playlist = file_paths
+        self.current_index = 0
+        self.timeline = Timeline(file_paths, self.sample_rate,
+                                 int(self.sample_rate * self.gap_ms / 1000.0))
+
+    def play(self, start_at=None):
+        """Start playback from current position
+
+        start_at is the monotonic time the first sample should reach the
+        output; the first callback pads the wait with silence.
+        """
+        if not self.playlist:
+            return False
+        if self.is_paused:
+            self.resume()
+            return True
+
+        self.start_time = None
+        while self.current_index < len(self.playlist):
+            mapping = self._take_prepared(self.current_index) or self._map(self.current_index)
+            if mapping is not None:
+                self._start(self.current_index, mapping, start_at)
+                self._start_monitor()
+                return True
+            self.current_index += 1
+        return False
+
+    def prepare(self):
+        """Map the current track and open the device for it, so play() starts at once"""
+        if self.is_playing or self.current_index >= len(self.playlist):
+            return False
+        mapping = self._take_prepared(self.current_index) or self._map(self.current_index)
+        if mapping is None:
+            return False
+        self._open_device(mapping.format_key)
+        self._prepared = (self.current_index, mapping)
+        return True
+
+    def _take_prepared(self, index):
+        """The mapping prepare() made for index (None if there is none)"""
+        prepared, self._prepared = self._prepared, None
+        if prepared is None:
+            return None
+        if prepared[0] != index:
+            prepared[1].close()
+            return None
+        return prepared[1]
+
+    def pause(self):
+        """Pause playback"""
+        if self.is_playing and not self.is_paused:
+            if self._device:
+                self._device.pause(1)
+            with self._lock:
+                self._clock.pause()
+                self.is_paused = True
+
+    def resume(self):
+        """Resume from pause"""
+        if self.is_paused:
+            with self._lock:
+                self._clock.resume()
+                self.is_paused = False
+            if self._device:
+                self._device.pause(0)
+
+    def stop(self):
+        """Stop playback"""
+        self._stop_monitor()
+        if self._device:
+            self._device.pause(1)
+        with self._lock:
+            for mapping in (self._track, self._next[1] if self._next else None,
+                            self._prepared[1] if self._prepared else None):
+                if mapping is not None:
+                    self._retired.append(mapping)
+            self._track = None
+            self._next = None
+            self._prepared = None
+            self._track_done = False
+            self._restart_at = None
+            self._start_at = None
+            self._clock.set(0, running=False)
+            self.is_playing = False
+            self.is_paused = False
+        self._close_retired()
+
+    def next_track(self):
+        """Move to next track in playlist"""
+        if self.current_index < len(self.playlist) - 1:
+            self.stop()
+            self.current_index += 1
+            return self.play()
+        return False
+
+    def is_busy(self):
+        """Check if audio is currently playing"""
+        return self.is_playing and not self._track_done
+
+    def is_finished(self):
+        """Check if the last track has played out"""
+        with self._lock:
+            return (self.is_playing and not self.is_paused and self._track_done and
+                    self._next is None and self.current_index >= len(self.playlist) - 1)
+
+    def _map(self, index):
+        """Map playlist entry index, None (after printing why) if it can't be played"""
+        file_path = self.playlist[index]
+        try:
+            mapping = WavMapping(resample_pipeline.resolve(file_path), loudness_index.gain(file_path))
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Error playing {file_path}: {e}")
+            return None
+        mapping.prefetch(settings.AUDIO_BUFFER_SIZE * mapping.frame_bytes * 8)
+        return mapping
+
+    def _start(self, index, mapping, start_at=None):
+        """Play mapping (playlist entry index) from its start, reopening the device if needed"""
+        self._open_device(mapping.format_key)
+        with self._lock:
+            if self._track is not None:
+                self._retired.append(self._track)
+            if self._next is not None and self._next[1] is mapping:
+                self._next = None
+            self.current_index = index
+            self._track = mapping
+            self._pos = 0
+            self._gap_left = 0
+            self._start_at = start_at
+            self._track_done = False
+            self._clock.rate = mapping.frequency
+            self._clock.set(0)
+            self._clock.limit = 0
+            self.is_playing = True
+            self.is_paused = False
+        self._device.pause(0)
+
+    def _open_device(self, format_key):
+        if self._device is not None and self._device_format == format_key:
+            return
+        if self._device is not None:
+            self._device.close()
+            self._device = None
+        frequency, audio_format, channels = format_key
+        device_name = settings.AUDIO_DEVICE or sdl_audio.get_audio_device_names(False)[0]
+        # allowed_changes=0: SDL converts to the hardware format, the
+        # callback always receives the file's own format
+        self._device = sdl_audio.AudioDevice(
+            devicename=device_name, iscapture=False, frequency=frequency,
+            audioformat=audio_format, numchannels=channels,
+            chunksize=settings.AUDIO_BUFFER_SIZE, allowed_changes=0,
+            callback=self._callback)
+        self._device_format = format_key
+        self.output_latency = settings.AUDIO_BUFFER_SIZE / frequency
+        self._sample_dtype = {sdl_audio.AUDIO_U8: 'u1', sdl_audio.AUDIO_S16LSB: '<i2',
+                              sdl_audio.AUDIO_S32LSB: '<i4', sdl_audio.AUDIO_F32LSB: '<f4'}[audio_format]
+        fill = 0x80 if audio_format == sdl_audio.AUDIO_U8 else 0x00
+        self._silence = bytes([fill]) * (settings.AUDIO_BUFFER_SIZE * channels * 4)
+
+    def _gap_bytes(self, mapping):
+        return int(mapping.frequency * self.gap_ms / 1000.0) * mapping.frame_bytes
+
+    def _callback(self, device, stream):
+        """SDL audio thread: fill stream from the mapped track"""
+        now = time.monotonic()
+        out = memoryview(stream)
+        wanted = len(out)
+        written = 0
+        with self._lock:
+            if self._start_at is not None and self._track is not None:
+                # This block reaches the output output_latency from now:
+                # start the track that much silence into it
+                lead = int((self._start_at - now - self.output_latency) * self._track.frequency)
+                self._gap_left = max(0, lead) * self._track.frame_bytes
+                self._start_at = None
+            while written < wanted and self._track is not None and not self._track_done:
+                if self._gap_left:
+                    count = min(self._gap_left, wanted - written)
+                    out[written:written + count] = self._silence[:count]
+                    self._gap_left -= count
+                    written += count
+                    continue
+
+                data = self._track.data
+                count = min(len(data) - self._pos, wanted - written)
+                if count > 0:
+                    out[written:written + count] = data[self._pos:self._pos + count]
+                    if self.start_time is None:
+                        self.start_time = now + written // self._track.frame_bytes / self._track.frequency
+                    if self._track.gain != 1.0:
+                        apply_gain(out[written:written + count], self._sample_dtype, self._track.gain)
+                    self._pos += count
+                    written += count
+                    continue
+
+                # Track exhausted: continue with the preloaded one if the
+                # device can play it as is, otherwise leave it to the monitor
+                if self._next is not None and self._next[1].format_key == self._device_format:
+                    self._retired.append(self._track)
+                    self.current_index, self._track = self._next
+                    self._next = None
+                    self._pos = 0
+                    self._gap_left = self._gap_bytes(self._track)
+                else:
+                    self._track_done = True
+
+            if self._track is not None:
+                # SDL plays this block next: its first frame is audible now
+                frame_bytes = self._track.frame_bytes
+                end = (self._pos - self._gap_left) // frame_bytes
+                self._clock.set(end - written // frame_bytes, running=not self.is_paused)
+                self._clock.limit = end
+
+        if written < wanted:
+            out[written:] = self._silence[:wanted - written]
+
+    def service(self):
+        """Preload the next track, close finished mappings and handle format changes"""
+        self._close_retired()
+        if not self.is_playing or self.is_paused:
+            return
+
+        with self._lock:
+            next_index = self.current_index + 1
+            need_next = self._next is None and next_index < len(self.playlist)
+        if need_next:
+            mapping = self._map(next_index)
+            with self._lock:
+                if mapping is None:
+                    # Unreadable file, drop it from the playlist
+                    del self.playlist[next_index]
+                    self.timeline.drop(next_index)
+                elif self._next is None and self.current_index + 1 == next_index:
+                    self._next = (next_index, mapping)
+                    mapping = None
+            if mapping is not None:
+                mapping.close()
+
+        with self._lock:
+            if not self._track_done or self._next is None:
+                return
+            now = time.monotonic()
+            if self._restart_at is None:
+                self._restart_at = now + self.gap_ms / 1000.0
+            if now < self._restart_at:
+                return
+            self._restart_at = None
+            index, mapping = self._next
+        self._start(index, mapping)
+
+    def _close_retired(self):
+        with self._lock:
+            retired, self._retired = self._retired, []
+        for mapping in retired:
+            mapping.close()
+
+    def _start_monitor(self):
+        if self._monitor is not None and self._monitor.is_alive():
+            return
+        self._monitor_stop.clear()
+        self._monitor = threading.Thread(target=self._monitor_loop, name="audio-monitor", daemon=True)
+        self._monitor.start()
+
+    def _stop_monitor(self):
+        if self._monitor is None:
+            return
+        self._monitor_stop.set()
+        if self._monitor is not threading.current_thread():
+            self._monitor.join()
+        self._monitor = None
+
+    def _monitor_loop(self):
+        while not self._monitor_stop.wait(settings.AUDIO_MONITOR_INTERVAL):
+            self.service()
+
+    def get_current_file(self):
+        """Get current playing file name"""
+        if 0 <= self.current_index < len(self.playlist):
+            return os.path.basename(self.playlist[self.current_index])
+        return None
+
+    def get_position(self, now=None):
+        """(track position, playlist position) in frames, from the callback clock (at monotonic time now)"""
+        with self._lock:
+            frames = self._clock.frames(now)
+            if self._track is not None:
+                frames = frames * self.sample_rate / self._track.frequency
+            return self.timeline.position(self.current_index, frames)
+
+    def first_sample_time(self):
+        """Monotonic time the first sample of this playback reaches the output (None before it starts)"""
+        if self.start_time is None:
+            return None
+        return self.start_time + self.output_latency
+
+    def get_progress(self):
+        """Get playback progress
+
+        Positions and durations are in frames at sample_rate.
+        """
+        position, playlist_position = self.get_position()
+        return {
+            'current_index': self.current_index,
+            'total_files': len(self.playlist),
+            'is_playing': self.is_playing,
+            'is_paused': self.is_paused,
+            'current_file': self.get_current_file(),
+            'sample_rate': self.sample_rate,
+            'position_frames': position,
+            'duration_frames': self.timeline.track_frames(self.current_index),
+            'playlist_position_frames': playlist_position,
+            'playlist_duration_frames': self.timeline.total_frames,
+        }
+
+    def cleanup(self):
+        """Clean up audio resources"""
+        self.stop()
+        if self._device:
+            self._device.close()
+            self._device = None
@@ -0,0 +1,201 @@
+"""Memory-budgeted cache of decoded audio"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+import pygame
+from samplepi.config import settings
+from samplepi.audio.loudness import apply_gain
+from samplepi.audio.metadata import WAVE_FORMAT_PCM, WavFormatError, read_wav_header
+from samplepi.audio.timeline import wav_frames
+
+
+def decoded_size(path):
+    """Bytes a file takes once decoded to the mixer format (from the WAV metadata index)"""
+    init = pygame.mixer.get_init()
+    if init is None:
+        return os.path.getsize(path)
+    frequency, size, channels = init
+    frames = wav_frames(path, frequency)
+    if frames is None:
+        # Not plain PCM; the file size is a reasonable guess
+        return os.path.getsize(path)
+    return frames * (abs(size) // 8) * channels
+
+
+class PCMCache:
+    """Decoded Sounds kept in memory up to budget_bytes
+
+    The least recently used entry is evicted first; pinned paths (the
+    current playlist) stay until unpinned.
+    """
+
+    def __init__(self, budget_bytes=None):
+        self.budget_bytes = budget_bytes if budget_bytes is not None else settings.AUDIO_CACHE_BUDGET_BYTES
+        self._entries = OrderedDict()  # path -> (stat key, sound, bytes)
+        self._pinned = set()
+        self._lock = threading.Lock()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def fits(self, path, pad_frames=0):
+        """Check if path can be cached on its own (otherwise it should be streamed)
+
+        Files the mixer has to convert briefly need a second copy while
+        they are decoded, so the budget has to hold two.
+        """
+        try:
+            nbytes = decoded_size(path)
+        except OSError:
+            return True
+        if pygame.mixer.get_init() is not None:
+            nbytes += pad_frames * self._frame_bytes()
+        return 2 * nbytes <= self.budget_bytes
+
+    def pin(self, paths):
+        """Protect paths from eviction, replacing the previous pin set"""
+        with self._lock:
+            self._pinned = set(paths)
+
+    def lookup(self, path, gain=1.0, pad_frames=0, source=None):
+        """The Sound get() would return if it is cached, else None (never decodes)"""
+        source = path if source is None else source
+        key = (source, self._stat_key(source), gain, pad_frames)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != key:
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[1]
+
+    def get(self, path, gain=1.0, pad_frames=0, source=None):
+        """Decoded Sound for path with gain applied, decoding and caching it on a miss
+
+        source is the file decoded for path (default: path itself), e.g. its
+        resampled copy; the entry stays under path, so pins by playlist path
+        hold. The Sound starts with pad_frames of silence. Gain and padding
+        are applied once, when the Sound is decoded, so playing it costs
+        nothing extra; the entry is decoded again when the file's size or
+        mtime, the gain or the padding change. Raises pygame.error /
+        FileNotFoundError like pygame.mixer.Sound.
+        """
+        source = path if source is None else source
+        key = (source, self._stat_key(source), gain, pad_frames)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Decode outside the lock, it can take a while for long files
+        sound = self._decode(source, gain, pad_frames)
+        nbytes = self._sound_bytes(sound)
+
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.used_bytes -= old[2]
+            if nbytes <= self.budget_bytes and self._make_room(nbytes):
+                self._entries[path] = (key, sound, nbytes)
+                self.used_bytes += nbytes
+        return sound
+
+    def _decode(self, source, gain, pad_frames):
+        """Decode source into a single padded buffer, applying gain in place
+
+        WAVs already in the mixer format are read straight into the buffer;
+        anything else is decoded by the mixer and copied over once, dropping
+        the mixer's copy before the final Sound is built.
+        """
+        if gain == 1.0 and not pad_frames:
+            return pygame.mixer.Sound(source)
+        pad_bytes = pad_frames * self._frame_bytes()
+        samples = self._read_raw(source, pad_bytes)
+        if samples is None:
+            sound = pygame.mixer.Sound(source)
+            raw = memoryview(sound)
+            samples = bytearray(pad_bytes + raw.nbytes)
+            samples[pad_bytes:] = raw.cast('B')
+            raw.release()
+            del sound
+        if gain != 1.0:
+            apply_gain(memoryview(samples)[pad_bytes:], self._sample_dtype(), gain)
+        return pygame.mixer.Sound(buffer=samples)
+
+    def _read_raw(self, source, pad_bytes):
+        """Read a WAV's samples after pad_bytes of silence, or None if the mixer has to convert it"""
+        frequency, size, channels = pygame.mixer.get_init()
+        if size != -16 or sys.byteorder != 'little':
+            return None
+        try:
+            with open(source, 'rb') as f:
+                header = read_wav_header(f)
+                if (header.format_tag != WAVE_FORMAT_PCM or header.bits != 16
+                        or header.channels != channels or header.sample_rate != frequency):
+                    return None
+                samples = bytearray(pad_bytes + header.data_size)
+                view = memoryview(samples)
+                read = f.readinto(view[pad_bytes:])
+                view.release()
+        except WavFormatError:
+            return None
+        if read is not None and read < header.data_size:
+            del samples[pad_bytes + read:]
+        return samples
+
+    def _make_room(self, nbytes):
+        """Evict unpinned entries, least recently used first, until nbytes fit"""
+        for path in list(self._entries):
+            if self.used_bytes + nbytes <= self.budget_bytes:
+                break
+            if path in self._pinned:
+                continue
+            self.used_bytes -= self._entries.pop(path)[2]
+            self.evictions += 1
+        return self.used_bytes + nbytes <= self.budget_bytes
+
+    def _stat_key(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def _sample_dtype(self):
+        """numpy type of the mixer's samples"""
+        size = pygame.mixer.get_init()[1]
+        return {8: 'u1', -8: 'i1', 16: '<u2', -16: '<i2', 32: '<f4', -32: '<i4'}[size]
+
+    def _frame_bytes(self):
+        _, size, channels = pygame.mixer.get_init()
+        return (abs(size) // 8) * channels
+
+    def _sound_bytes(self, sound):
+        return int(round(sound.get_length() * pygame.mixer.get_init()[0])) * self._frame_bytes()
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self.used_bytes = 0
+
+    def get_stats(self):
+        """Get usage and hit/miss statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'used_bytes': self.used_bytes,
+                'budget_bytes': self.budget_bytes,
+                'pinned': len(self._pinned),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
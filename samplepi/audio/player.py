@@ -2,14 +2,37 @@
 
 import pygame
 import os
+import threading
+import time
 from samplepi.config import settings
+from samplepi.audio.pcm_cache import PCMCache
+from samplepi.audio.timeline import Timeline, PlaybackClock
+from samplepi.audio.resample import resample_pipeline
+from samplepi.audio.loudness import loudness_index
 
 
 class AudioPlayer:
-    """Handles audio playback of WAV files"""
+    """Handles audio playback of WAV files
 
-    def __init__(self):
-        """Initialize the audio player"""
+    Tracks are decoded into a PCMCache and played on a reserved mixer
+    channel; a monitor thread queues the next track behind the current
+    one, so SDL switches tracks at the sample level without waiting for
+    the UI. Files too large for the cache are streamed through
+    pygame.mixer.music instead. Positions are in frames at the mixer rate.
+    """
+
+    # start_time is when play() scheduled the first sample: pygame doesn't
+    # report when SDL's mixer callback actually picked the Sound up
+    start_observed = False
+
+    def __init__(self, channel=None, cache=None):
+        """Initialize the audio player
+
+        cache is the PCMCache to decode into (default: a new one with
+        AUDIO_CACHE_BUDGET_BYTES). channel replaces the reserved mixer
+        channel for offline rendering; no monitor thread is started then,
+        the caller drives service() itself.
+        """
         # Initialize pygame mixer with fallback for missing audio devices
         try:
             pygame.mixer.init(
@@ -25,60 +48,146 @@ class AudioPlayer:
             os.environ['SDL_AUDIODRIVER'] = 'dummy'
             pygame.mixer.init()
 
+        self._run_monitor = channel is None
+        if channel is None:
+            # Keep Sound.play() elsewhere from grabbing the playback channel
+            pygame.mixer.set_reserved(1)
+            channel = pygame.mixer.Channel(0)
+        self.channel = channel
+
         self.playlist = []
         self.current_index = 0
         self.is_playing = False
         self.is_paused = False
+        self.gap_ms = settings.AUDIO_TRACK_GAP_MS
+        self.cache = cache if cache is not None else PCMCache()
+        self.sample_rate = pygame.mixer.get_init()[0]
+        # Durations from the WAV metadata index, so get_progress() does no file I/O
+        self.timeline = Timeline(rate=self.sample_rate)
+        # Per playlist entry: too large for the cache, played through mixer.music
+        self._streamed = []
+        # Frame 0 is the start of the Sound on the channel, which begins
+        # with _lead_in frames of silence and is _sound_frames long
+        self._clock = PlaybackClock(self.sample_rate)
+        self._sound_frames = None
+        self._lead_in = 0
+        # When the first sample of the current playback (after any lead-in)
+        # was handed to SDL; it reaches the output output_latency later
+        self.start_time = None
+        self.output_latency = settings.AUDIO_BUFFER_SIZE / self.sample_rate
+
+        # Track queued on the channel behind the current one: (index, sound)
+        self._queued = None
+        # Track decoded to start by hand after the current stream: (index, sound)
+        self._preloaded = None
+        self._streaming = False
+        # Monotonic time a streamed track (or a track after it) may start
+        self._next_start = None
+        self._paused_at = None
+        # Bumped by stop() so a decode that raced with it is thrown away
+        self._generation = 0
+        self._lock = threading.RLock()
+        self._monitor = None
+        self._monitor_stop = threading.Event()
 
     def load_playlist(self, file_paths):
         """Load a playlist of WAV files"""
+        self.stop()
         self.playlist = file_paths
         self.current_index = 0
+        self.timeline = Timeline(file_paths, self.sample_rate, self._gap_frames())
+        # Decided once here; the monitor checks the next track every tick
+        self._streamed = [not self.cache.fits(path, self._pad_frames(index))
+                          for index, path in enumerate(file_paths)]
+        # Keep the whole playlist resident for "Play Again"
+        self.cache.pin(file_paths)
+
+    def prepare(self):
+        """Decode the current track ahead of play(), so starting it doesn't wait for the decoder"""
+        with self._lock:
+            if self.is_playing or self.current_index >= len(self.playlist):
+                return False
+            index = self.current_index
+        if self._is_streamed(index):
+            return True
+        # The decoded Sound stays in the cache (the playlist is pinned)
+        return self._load_sound(index) is not None
 
-    def play(self):
-        """Start playback from current position"""
+    def play(self, start_at=None):
+        """Start playback from current position
+
+        start_at is the monotonic time the first sample should reach the
+        output; the wait is played as leading silence (streamed tracks
+        start at once). Nothing is decoded here: a track whose Sound isn't
+        cached yet (see prepare()) is streamed this time while a background
+        thread decodes it for the next play.
+        """
         if not self.playlist:
             return False
 
-        if self.is_paused:
-            # Resume from pause
-            pygame.mixer.music.unpause()
-            self.is_paused = False
-            self.is_playing = True
-            return True
-
-        # Load and play current file
-        if self.current_index < len(self.playlist):
-            file_path = self.playlist[self.current_index]
-            try:
-                pygame.mixer.music.load(file_path)
-                pygame.mixer.music.play()
-                self.is_playing = True
-                self.is_paused = False
+        with self._lock:
+            if self.is_paused:
+                # Resume from pause
+                self.resume()
                 return True
-            except pygame.error as e:
-                print(f"Error playing {file_path}: {e}")
-                return False
+
+            self.start_time = None
+            # Load and play current file, skipping files that fail to load
+            while self.current_index < len(self.playlist):
+                index = self.current_index
+                sound = None
+                if not self._is_streamed(index):
+                    sound = self._cached_sound(index)
+                    if sound is None:
+                        self._decode_async(index)
+                if self._start_track(index, start_at, sound):
+                    self.is_playing = True
+                    self.is_paused = False
+                    self._start_monitor()
+                    return True
+                self.current_index += 1
 
         return False
 
     def pause(self):
         """Pause playback"""
-        if self.is_playing and not self.is_paused:
-            pygame.mixer.music.pause()
-            self.is_paused = True
+        with self._lock:
+            if self.is_playing and not self.is_paused:
+                if self._streaming:
+                    pygame.mixer.music.pause()
+                else:
+                    self.channel.pause()
+                self._clock.pause()
+                self._paused_at = time.monotonic()
+                self.is_paused = True
 
     def resume(self):
         """Resume from pause"""
-        if self.is_paused:
-            pygame.mixer.music.unpause()
-            self.is_paused = False
+        with self._lock:
+            if self.is_paused:
+                if self._streaming:
+                    pygame.mixer.music.unpause()
+                else:
+                    self.channel.unpause()
+                self._clock.resume()
+                if self._next_start is not None:
+                    self._next_start += time.monotonic() - self._paused_at
+                self.is_paused = False
 
     def stop(self):
         """Stop playback"""
-        pygame.mixer.music.stop()
-        self.is_playing = False
-        self.is_paused = False
+        self._stop_monitor()
+        with self._lock:
+            self.channel.stop()
+            pygame.mixer.music.stop()
+            self._queued = None
+            self._preloaded = None
+            self._streaming = False
+            self._next_start = None
+            self._clock.set(0, running=False)
+            self._generation += 1
+            self.is_playing = False
+            self.is_paused = False
 
     def next_track(self):
         """Move to next track in playlist"""
@@ -90,7 +199,240 @@ class AudioPlayer:
 
     def is_busy(self):
         """Check if audio is currently playing"""
-        return pygame.mixer.music.get_busy()
+        with self._lock:
+            if self._streaming:
+                return pygame.mixer.music.get_busy()
+            return self.channel.get_busy()
+
+    def is_finished(self):
+        """Check if the last track has played out"""
+        with self._lock:
+            return (self.is_playing and not self.is_paused and self._queued is None and
+                    self._next_start is None and not self.is_busy() and
+                    self.current_index >= len(self.playlist) - 1)
+
+    def service(self):
+        """Advance the playlist at the audio layer (called by the monitor thread)
+
+        Notices when the channel moved on to the queued track, preloads and
+        queues the one after it, and starts streamed tracks once the
+        previous track and the gap are over (within AUDIO_MONITOR_INTERVAL).
+        The channel holds one queued Sound, so gapless transitions need
+        tracks longer than a mixer buffer (AUDIO_BUFFER_SIZE frames).
+        """
+        with self._lock:
+            if not self.is_playing or self.is_paused:
+                return
+
+            # SDL started the queued track
+            if self._queued is not None and self.channel.get_queue() is None:
+                self.current_index, sound = self._queued
+                self._queued = None
+                # It started right where the previous Sound ended
+                self._clock.shift(self._sound_frames)
+                self._sound_frames = self._frames_of(sound)
+                self._lead_in = self._pad_frames(self.current_index)
+
+            next_index = self.current_index + 1
+            if next_index >= len(self.playlist) or self._queued is not None:
+                return
+
+            if self._is_streamed(next_index) or (self._streaming and self._preloaded is not None):
+                self._start_after_gap(next_index)
+                return
+            generation = self._generation
+
+        # Decode without the lock so pause/stop and UI polls don't wait on it
+        sound = self._load_sound(next_index)
+
+        with self._lock:
+            if generation != self._generation or self._queued is not None:
+                return
+            if sound is None:
+                # Unreadable file, drop it from the playlist
+                self._drop_track(next_index)
+                return
+            if self._streaming:
+                # The stream can't queue a Sound, it is started once the stream ends
+                self._preloaded = (next_index, sound)
+                self._start_after_gap(next_index)
+                return
+            self.channel.queue(sound)
+            self._queued = (next_index, sound)
+
+    def _start_after_gap(self, index):
+        """Start a track by hand once the current one ended and the gap passed
+
+        Called with the lock held, so nothing is decoded here: a track that
+        isn't streamed was preloaded by service() first.
+        """
+        if self.is_busy():
+            return
+        if self._is_streamed(index):
+            # A decoded Sound plays its own gap; a stream is started after it
+            now = time.monotonic()
+            if self._next_start is None:
+                self._next_start = now + self.gap_ms / 1000.0
+            if now < self._next_start:
+                return
+            self._next_start = None
+        sound = None
+        if self._preloaded is not None and self._preloaded[0] == index:
+            sound = self._preloaded[1]
+        self._preloaded = None
+        if sound is None and not self._is_streamed(index):
+            return
+        self.current_index = index
+        if not self._start_track(index, sound=sound):
+            self._drop_track(index)
+            self.current_index = index - 1
+
+    def _start_track(self, index, start_at=None, sound=None):
+        """Play track index now (or from monotonic time start_at), returns False if it can't be played
+
+        The track is played from sound, its decoded Sound, or streamed if
+        that is None.
+        """
+        file_path = self.playlist[index]
+        if sound is None:
+            try:
+                pygame.mixer.music.load(self._source(index))
+                # The music stream can only be attenuated
+                pygame.mixer.music.set_volume(min(1.0, loudness_index.gain(file_path)))
+                pygame.mixer.music.play()
+            except pygame.error as e:
+                print(f"Error playing {file_path}: {e}")
+                return False
+            self._streaming = True
+            self._started(None)
+            return True
+
+        self._streaming = False
+        lead = 0
+        if start_at is not None:
+            # Taken after the cache lookup; the Sound's gap counts towards it
+            lead = int((start_at - self.output_latency - time.monotonic()) * self.sample_rate)
+            lead -= self._pad_frames(index)
+        if lead > 0:
+            # Play the wait as a short Sound of its own with the track queued behind it
+            silence = pygame.mixer.Sound(buffer=self._silence(lead))
+            self.channel.play(silence)
+            self.channel.queue(sound)
+            self._queued = (index, sound)
+            self._started(silence, lead + self._pad_frames(index))
+        else:
+            self.channel.play(sound)
+            self._started(sound, self._pad_frames(index))
+        return True
+
+    def _started(self, sound, lead_in=0):
+        """Restart the position clock for a Sound (None: streamed) that just started
+
+        The Sound begins with lead_in frames of silence.
+        """
+        now = time.monotonic()
+        if self.start_time is None:
+            self.start_time = now + lead_in / self.sample_rate
+        self._clock.set(0, now)
+        self._sound_frames = self._frames_of(sound) if sound is not None else None
+        self._lead_in = lead_in
+
+    def _frames_of(self, sound):
+        return int(round(sound.get_length() * self.sample_rate))
+
+    def _gap_frames(self):
+        return int(self.sample_rate * self.gap_ms / 1000.0)
+
+    def _pad_frames(self, index):
+        """Silence in front of track index's Sound: the gap before it (none before the first)"""
+        return self._gap_frames() if index > 0 else 0
+
+    def _drop_track(self, index):
+        """Remove an unplayable track from the playlist"""
+        del self.playlist[index]
+        del self._streamed[index]
+        self.timeline.drop(index)
+
+    def _source(self, index):
+        """File to play for track index: its converted copy once the resampler made one"""
+        return resample_pipeline.resolve(self.playlist[index])
+
+    def _is_streamed(self, index):
+        """Files too large for the decoded audio cache are streamed"""
+        return self._streamed[index]
+
+    def _sound_args(self, index):
+        """(path, gain, pad frames, source) track index's Sound is cached under
+
+        It is decoded from the resampler's converted copy once it has one,
+        with the loudness normalization gain baked in and, after the first
+        track, gap_ms of silence in front.
+        """
+        file_path = self.playlist[index]
+        return file_path, loudness_index.gain(file_path), self._pad_frames(index), self._source(index)
+
+    def _load_sound(self, index):
+        """Decoded track index (cached)"""
+        return self._decode(*self._sound_args(index))
+
+    def _cached_sound(self, index):
+        """Decoded track index if it is in the cache already (None otherwise)"""
+        file_path, gain, pad_frames, source = self._sound_args(index)
+        return self.cache.lookup(file_path, gain, pad_frames, source=source)
+
+    def _decode_async(self, index):
+        """Decode track index into the cache on a background thread"""
+        threading.Thread(target=self._decode, args=self._sound_args(index),
+                         name="audio-decode", daemon=True).start()
+
+    def _decode(self, file_path, gain, pad_frames, source):
+        try:
+            return self.cache.get(file_path, gain, pad_frames, source=source)
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Error playing {file_path}: {e}")
+            return None
+
+    def _silence(self, frames):
+        """Raw silence of frames frames in the mixer's format"""
+        _, size, channels = pygame.mixer.get_init()
+        return bytes(frames * (abs(size) // 8) * channels)
+
+    def get_position(self, now=None):
+        """(track position, playlist position) in frames, from the clock (at monotonic time now)
+
+        The clock is anchored when SDL starts each Sound and moved on by
+        the exact length of the Sound it replaced.
+        """
+        with self._lock:
+            frames = self._clock.frames(now) - self._lead_in
+            return self.timeline.position(self.current_index, frames)
+
+    def first_sample_time(self):
+        """Monotonic time the first sample of this playback reaches the output (None before it starts)"""
+        if self.start_time is None:
+            return None
+        return self.start_time + self.output_latency
+
+    def _start_monitor(self):
+        if not self._run_monitor:
+            return
+        if self._monitor is not None and self._monitor.is_alive():
+            return
+        self._monitor_stop.clear()
+        self._monitor = threading.Thread(target=self._monitor_loop, name="audio-monitor", daemon=True)
+        self._monitor.start()
+
+    def _stop_monitor(self):
+        if self._monitor is None:
+            return
+        self._monitor_stop.set()
+        if self._monitor is not threading.current_thread():
+            self._monitor.join()
+        self._monitor = None
+
+    def _monitor_loop(self):
+        while not self._monitor_stop.wait(settings.AUDIO_MONITOR_INTERVAL):
+            self.service()
 
     def get_current_file(self):
         """Get current playing file name"""
@@ -99,16 +441,44 @@ class AudioPlayer:
         return None
 
     def get_progress(self):
-        """Get playback progress"""
+        """Get playback progress
+
+        Positions and durations are in frames at sample_rate.
+        """
+        position, playlist_position = self.get_position()
         return {
             'current_index': self.current_index,
             'total_files': len(self.playlist),
             'is_playing': self.is_playing,
             'is_paused': self.is_paused,
-            'current_file': self.get_current_file()
+            'current_file': self.get_current_file(),
+            'sample_rate': self.sample_rate,
+            'position_frames': position,
+            'duration_frames': self.timeline.track_frames(self.current_index),
+            'playlist_position_frames': playlist_position,
+            'playlist_duration_frames': self.timeline.total_frames,
         }
 
     def cleanup(self):
         """Clean up audio resources"""
         self.stop()
         pygame.mixer.quit()
+
+
+def create_audio_player(engine=None):
+    """Create the player for engine (default settings.AUDIO_ENGINE)
+
+    "mixer" is AudioPlayer (pygame.mixer with the decoded audio cache),
+    "mmap" is MmapWavPlayer (WAVs streamed from memory-mapped files).
+    """
+    if engine is None:
+        engine = settings.AUDIO_ENGINE
+
+    if engine == "mmap":
+        from samplepi.audio.mmap_engine import MmapWavPlayer, MMAP_ENGINE_AVAILABLE
+        if MMAP_ENGINE_AVAILABLE:
+            return MmapWavPlayer()
+        print("Warning: mmap audio engine needs pygame 2 with SDL2, using the mixer")
+    elif engine != "mixer":
+        print(f"Warning: unknown audio engine '{engine}', using the mixer")
+    return AudioPlayer()
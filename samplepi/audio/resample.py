@@ -0,0 +1,374 @@
+"""Background conversion of WAVs to the output format"""
+
+import hashlib
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from samplepi.config import settings
+from samplepi.audio.metadata import WAVE_FORMAT_PCM, wav_index
+from samplepi.audio.samples import map_samples, decode_samples
+from samplepi.audio.loudness import loudness_index
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+def needs_conversion(info):
+    """Check if a file (WavInfo) differs from the mixer's output format"""
+    return (info is not None and info.playable and
+            (info.sample_rate != settings.AUDIO_SAMPLE_RATE or info.format_tag != WAVE_FORMAT_PCM or
+             info.bits != 16 or info.channels > 2))
+
+
+def convert_wav(source, destination, rate, half_taps=16, block_frames=16384):
+    """Resample source to 16-bit PCM at rate (at most stereo), written to destination
+
+    Windowed-sinc interpolation: each output frame is a Kaiser-windowed
+    sinc over the input around its position (half_taps zero crossings
+    per side), with the cutoff lowered to the output Nyquist when
+    downsampling. The input is memory-mapped and
+    processed block_frames output frames at a time, so memory use does
+    not depend on the file length. Runs in a pool worker; returns the
+    numbers the pipeline's metrics are built from.
+    """
+    cpu_start = time.process_time()
+    header, raw = map_samples(source)
+    in_frames = header.data_size // header.block_align
+    channels = min(header.channels, 2)
+
+    # Output frame n sits at input position n * down / up; the fractional
+    # part only takes `up` distinct values, so the filter is tabulated
+    # per phase once and looked up per frame
+    divisor = math.gcd(rate, header.sample_rate)
+    up, down = rate // divisor, header.sample_rate // divisor
+    out_frames = in_frames * up // down
+    cutoff = min(1.0, up / down)
+    reach = int(math.ceil(half_taps / cutoff))
+    offsets = np.arange(-reach + 1, reach + 1)
+    distance = np.arange(up)[:, None] / up - offsets[None, :]
+    window = np.i0(8.0 * np.sqrt(np.clip(1.0 - (distance / reach) ** 2, 0.0, 1.0))) / np.i0(8.0)
+    table = (cutoff * np.sinc(cutoff * distance) * window).astype(np.float32)
+
+    tmp_path = f"{destination}.tmp-{os.getpid()}"
+    with wave.open(tmp_path, 'wb') as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        for first in range(0, out_frames, block_frames):
+            frames = np.arange(first, min(first + block_frames, out_frames), dtype=np.int64) * down
+            base, phase = frames // up, frames % up
+            weights = table[phase]
+
+            # Input frames the block reaches, zero-padded past both ends
+            low = int(base[0]) - reach + 1
+            high = int(base[-1]) + reach + 1
+            padded = np.zeros((high - low, channels), np.float32)
+            read_low, read_high = max(0, low), min(in_frames, high)
+            if read_high > read_low:
+                padded[read_low - low:read_high - low] = decode_samples(
+                    raw[read_low * header.block_align:read_high * header.block_align], header)[:, :channels]
+
+            index = base - low - reach + 1
+            mixed = np.zeros((len(base), channels), np.float32)
+            for tap in range(len(offsets)):
+                mixed += weights[:, tap, None] * padded[index + tap]
+            out.writeframes((np.clip(mixed, -1.0, 1.0) * 32767.0).astype('<i2').tobytes())
+    os.replace(tmp_path, destination)
+
+    return {
+        'seconds': in_frames / header.sample_rate,
+        'bytes_in': header.data_size,
+        'bytes_out': out_frames * channels * 2,
+        # CPU time of this worker process, not wall time
+        'cpu_seconds': time.process_time() - cpu_start,
+    }
+
+
+def _lower_priority(nice):
+    """Pool worker initializer: stay out of the way of the UI and audio threads"""
+    try:
+        os.nice(nice)
+    except OSError:
+        pass
+    if hasattr(os, 'sched_setscheduler') and hasattr(os, 'SCHED_IDLE'):
+        try:
+            os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+        except OSError:
+            pass
+
+
+class ResamplePipeline:
+    """Converts files that don't match the output format into a cache directory
+
+    Directories are scanned on a background thread (scan_async), using
+    the WAV metadata index to find files whose rate, encoding or channel
+    count differs from the mixer's. Those are converted in a process pool
+    with one low-priority worker per core (RESAMPLE_WORKERS), so the UI
+    process only waits for futures, never for the conversion itself.
+    Converted copies are named after the source path, size and mtime;
+    resolve() maps a source file to its converted copy once it exists.
+    The same scan queues loudness analysis (see LoudnessIndex) on the
+    pool, which other background jobs can use through run().
+    """
+
+    def __init__(self, cache_dir=None, workers=None):
+        self.cache_dir = cache_dir or settings.RESAMPLE_CACHE_DIR
+        self.workers = workers or settings.RESAMPLE_WORKERS or os.cpu_count() or 1
+        self._pool = None
+        self._lock = threading.Lock()
+        self._jobs = {}  # source path -> Future
+        self._ready = {}  # source path -> (size, mtime_ns, converted path)
+        self._scan_queue = queue.Queue()
+        self._scanner = None
+        self._warned = False
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+        self._started = None
+        self._finished = None
+
+    def available(self):
+        """Check if conversions or analysis can run (warns once if not)"""
+        if not settings.RESAMPLE_ENABLED and settings.LOUDNESS_TARGET_LUFS is None:
+            return False
+        if not NUMPY_AVAILABLE:
+            if not self._warned:
+                print("Warning: numpy not available. Background resampling disabled.")
+                self._warned = True
+            return False
+        return True
+
+    def cache_path(self, path, stat):
+        """Converted copy of path for its current size and mtime"""
+        key = f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0{settings.AUDIO_SAMPLE_RATE}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest()[:20] + ".wav")
+
+    def scan_async(self, directories, prune=False, on_done=None):
+        """Queue directories for scan() on the background scanner thread
+
+        The scan also brings the WAV metadata index up to date when nothing
+        can be converted, so screens never refresh it themselves; on_done()
+        is called on the scanner thread once it finished.
+        """
+        with self._lock:
+            self._scan_queue.put((list(directories), prune, on_done))
+            if self._scanner is None:
+                self._scanner = threading.Thread(target=self._scan_loop, name="resample-scan", daemon=True)
+                self._scanner.start()
+
+    def _scan_loop(self):
+        while True:
+            try:
+                directories, prune, on_done = self._scan_queue.get(timeout=1.0)
+            except queue.Empty:
+                with self._lock:
+                    if self._scan_queue.empty():
+                        self._scanner = None
+                        return
+                continue
+            try:
+                self.scan(directories, prune)
+            except Exception as e:
+                # Keep the scanner alive for later requests
+                print(f"Warning: resample scan failed: {e}")
+            if on_done is not None:
+                on_done()
+
+    def scan(self, directories, prune=False):
+        """Index directories, convert every mismatched file without a converted copy
+        and analyze the loudness of files that changed
+
+        With prune, cached copies that no longer belong to any file in
+        directories are deleted. Only the index is refreshed if nothing
+        can run (see available()).
+        """
+        active = self.available()
+        if active:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        wanted = set()
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                names = [entry.name for entry in entries if entry.name.endswith('.wav')]
+            wav_index.refresh(directory, names)
+            if not active:
+                continue
+            for name in names:
+                path = os.path.join(directory, name)
+                info = wav_index.lookup(path)
+                if settings.LOUDNESS_TARGET_LUFS is not None and info is not None and info.playable:
+                    loudness_index.submit(path, self)
+                converted = self.submit(path) if settings.RESAMPLE_ENABLED else None
+                if converted:
+                    wanted.add(os.path.basename(converted))
+
+        if prune and active and settings.RESAMPLE_ENABLED:
+            now = time.time()
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                # Partial output of a running conversion is rewritten constantly
+                if ".tmp-" in name and now - os.path.getmtime(path) < 600:
+                    continue
+                if name not in wanted:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def submit(self, path):
+        """Convert path in the pool if it needs it; returns its converted copy's path (or None)"""
+        if not needs_conversion(wav_index.get(path)):
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        destination = self.cache_path(path, stat)
+        ready = (stat.st_size, stat.st_mtime_ns, destination)
+
+        with self._lock:
+            if os.path.exists(destination):
+                self._ready[path] = ready
+                return destination
+            job = self._jobs.get(path)
+            if job is not None and not job.done():
+                return destination
+            if not any(not job.done() for job in self._jobs.values()):
+                self._reset_metrics()
+                self._started = time.perf_counter()
+            job = self._get_pool().submit(convert_wav, path, destination, settings.AUDIO_SAMPLE_RATE)
+            self._jobs[path] = job
+            self.submitted += 1
+        job.add_done_callback(lambda job: self._job_done(path, ready, job))
+        return destination
+
+    def _get_pool(self):
+        """The worker pool, started on first use (call with the lock held)"""
+        if self._pool is None:
+            context = multiprocessing.get_context(
+                "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                             initializer=_lower_priority,
+                                             initargs=(settings.RESAMPLE_NICE,))
+        return self._pool
+
+    def run(self, fn, *args):
+        """Run fn(*args) in a low-priority pool worker, returns its Future"""
+        with self._lock:
+            return self._get_pool().submit(fn, *args)
+
+    def _job_done(self, path, ready, job):
+        """Pool callback thread: record the result and report when the queue drained"""
+        if job.cancelled():
+            return
+        try:
+            result = job.result()
+        except Exception as e:
+            print(f"Error converting {path}: {e}")
+            result = None
+        with self._lock:
+            if result is None:
+                self.failed += 1
+            else:
+                self.completed += 1
+                self.audio_seconds += result['seconds']
+                self.bytes_in += result['bytes_in']
+                self.bytes_out += result['bytes_out']
+                self.cpu_seconds += result['cpu_seconds']
+                self._ready[path] = ready
+            drained = self.completed + self.failed == self.submitted
+            if drained:
+                self._finished = time.perf_counter()
+        if drained:
+            print(self.format_summary())
+
+    def resolve(self, path):
+        """Converted copy of path if one is ready and still matches the file, else path"""
+        ready = self._ready.get(path)
+        if ready is None:
+            return path
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return path
+        if (stat.st_size, stat.st_mtime_ns) != ready[:2] or not os.path.exists(ready[2]):
+            with self._lock:
+                self._ready.pop(path, None)
+            return path
+        return ready[2]
+
+    def wait(self, timeout=None):
+        """Block until every submitted conversion finished (benchmarks, shutdown)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                jobs = [job for job in self._jobs.values() if not job.done()]
+            if not jobs:
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            try:
+                jobs[0].result(timeout=remaining)
+            except Exception:
+                pass
+
+    def get_stats(self):
+        """Get progress and throughput of the current (or last) batch"""
+        with self._lock:
+            done = self.completed + self.failed
+            if self._started is None:
+                wall = 0.0
+            else:
+                wall = (self._finished if done == self.submitted and self._finished else time.perf_counter()) \
+                    - self._started
+            return {
+                'workers': self.workers,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'pending': self.submitted - done,
+                'progress': done / self.submitted if self.submitted else 1.0,
+                'audio_seconds': self.audio_seconds,
+                'wall_seconds': wall,
+                'cpu_seconds': self.cpu_seconds,
+                'realtime_factor': self.audio_seconds / wall if wall else 0.0,
+                'mb_in_per_s': self.bytes_in / wall / 1e6 if wall else 0.0,
+                'mb_out_per_s': self.bytes_out / wall / 1e6 if wall else 0.0,
+            }
+
+    def format_summary(self):
+        """One-line report of the current batch"""
+        stats = self.get_stats()
+        return (f"Resample: {stats['completed']}/{stats['submitted']} files "
+                f"({stats['failed']} failed, {stats['progress'] * 100:.0f}%), "
+                f"{stats['audio_seconds']:.1f}s of audio in {stats['wall_seconds']:.1f}s "
+                f"on {stats['workers']} workers ({stats['realtime_factor']:.1f}x realtime, "
+                f"{stats['mb_in_per_s']:.1f} MB/s in)")
+
+    def shutdown(self):
+        """Stop the pool, dropping conversions that haven't started"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared by the players and the app
+resample_pipeline = ResamplePipeline()
@@ -0,0 +1,40 @@
+"""WAV sample data as numpy arrays"""
+
+from samplepi.audio.metadata import WAVE_FORMAT_IEEE_FLOAT, read_wav_header
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+def map_samples(path):
+    """(WavHeader, read-only uint8 memmap of the data chunk) for a WAV file
+
+    Nothing is read until the array is sliced, so long files can be
+    processed block by block.
+    """
+    with open(path, 'rb') as f:
+        header = read_wav_header(f)
+    if not header.data_size:
+        return header, np.zeros(0, np.uint8)
+    return header, np.memmap(path, dtype=np.uint8, mode='r', offset=header.data_offset,
+                             shape=(header.data_size,))
+
+
+def decode_samples(raw, header):
+    """float32 frames x channels in [-1, 1) from raw sample bytes in header's encoding"""
+    if header.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        samples = raw.view('<f4').astype(np.float32)
+    elif header.bits == 8:
+        samples = (raw.astype(np.float32) - 128.0) / 128.0
+    elif header.bits == 16:
+        samples = raw.view('<i2').astype(np.float32) / 32768.0
+    elif header.bits == 24:
+        triples = raw.reshape(-1, 3).astype(np.int32)
+        samples = (triples[:, 0] | (triples[:, 1] << 8) | (triples[:, 2] << 16))
+        samples = np.where(samples >= 1 << 23, samples - (1 << 24), samples).astype(np.float32) / 8388608.0
+    else:
+        samples = raw.view('<i4').astype(np.float32) / 2147483648.0
+    return samples.reshape(-1, header.channels)
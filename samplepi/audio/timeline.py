@@ -0,0 +1,116 @@
+"""Playlist durations and playback position in sample frames"""
+
+import time
+from samplepi.audio.metadata import wav_index
+
+
+def wav_frames(path, rate):
+    """Length of a WAV file in frames at rate, from the metadata index (None if unknown)"""
+    info = wav_index.get(path)
+    if info is None or info.error is not None:
+        return None
+    return int(round(info.frames * rate / info.sample_rate))
+
+
+class Timeline:
+    """Per-track durations of a playlist, and where each track starts
+
+    Durations come from the WAV metadata index when the playlist is
+    loaded, and converted to `rate`; tracks are separated by gap_frames of
+    silence. Unknown durations (unreadable headers) count as 0.
+    """
+
+    def __init__(self, paths=(), rate=44100, gap_frames=0):
+        self.rate = rate
+        self.gap_frames = gap_frames
+        self.durations = [wav_frames(path, rate) for path in paths]
+        self._update_offsets()
+
+    def _update_offsets(self):
+        self.offsets = []
+        offset = 0
+        for duration in self.durations:
+            self.offsets.append(offset)
+            offset += (duration or 0) + self.gap_frames
+        self.total_frames = max(0, offset - self.gap_frames)
+
+    def drop(self, index):
+        """Remove track index (it was dropped from the playlist)"""
+        del self.durations[index]
+        self._update_offsets()
+
+    def track_frames(self, index):
+        """Duration of track index in frames (None if unknown)"""
+        if 0 <= index < len(self.durations):
+            return self.durations[index]
+        return None
+
+    def position(self, index, frames):
+        """(track position, playlist position) for `frames` into track index
+
+        frames may be negative in the gap before the track. The track
+        position is clamped to the track, so that gap reads as its start;
+        the playlist position keeps running through it.
+        """
+        if index >= len(self.durations):
+            return 0, self.total_frames
+        if index < 0:
+            return 0, 0
+        frames = max(int(frames), -self.gap_frames)
+        duration = self.durations[index]
+        if duration is not None:
+            frames = min(frames, duration)
+        playlist_position = min(max(self.offsets[index] + frames, 0), self.total_frames)
+        return max(frames, 0), playlist_position
+
+
+class PlaybackClock:
+    """Frames played since a reference point, run off the monotonic clock
+
+    set() anchors the clock at a known frame; between anchors the
+    position advances at `rate` frames per second unless paused.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._frame = 0.0
+        self._time = time.monotonic()
+        self._paused = True
+        self.limit = None  # highest frame the clock may report (None = no limit)
+
+    def set(self, frame, now=None, running=True):
+        """Anchor the clock: `frame` is playing at `now`"""
+        self._frame = float(frame)
+        self._time = time.monotonic() if now is None else now
+        self._paused = not running
+        self.limit = None
+
+    def shift(self, frames):
+        """Move the reference point by frames (the next track starts frames later)"""
+        self._frame -= frames
+        if self.limit is not None:
+            self.limit -= frames
+
+    def pause(self, now=None):
+        """Freeze the position"""
+        if not self._paused:
+            now = time.monotonic() if now is None else now
+            self._frame = self.frames(now)
+            self._time = now
+            self._paused = True
+
+    def resume(self, now=None):
+        """Continue from the frozen position"""
+        if self._paused:
+            self._time = time.monotonic() if now is None else now
+            self._paused = False
+
+    def frames(self, now=None):
+        """Current position in frames"""
+        if self._paused:
+            return self._frame
+        now = time.monotonic() if now is None else now
+        frame = self._frame + (now - self._time) * self.rate
+        if self.limit is not None:
+            frame = min(frame, self.limit)
+        return frame
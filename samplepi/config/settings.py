@@ -3,12 +3,38 @@
 # Display settings (Waveshare 3.2" LCD is 320x240)
 DISPLAY_WIDTH = 320
 DISPLAY_HEIGHT = 240
-FPS = 30
+FPS = 30  # Upper bound; the loop only redraws when something changed
+IDLE_MAX_SLEEP = 0.5  # Longest wait for events when idle (bounds signal handling latency)
+EVENT_POLL_INTERVAL = 0.05  # SDL queue (keyboard) poll period while waiting; GPIO wakes immediately
+STARTUP_TARGET_MS = 1500  # Time to first frame the startup trace is checked against
+
+# Frame-time instrumentation: per-phase histograms (events, update, render,
+# flip) per screen class, summarized every FRAME_STATS_INTERVAL seconds (0 = never)
+FRAME_STATS_INTERVAL = 60.0
+FRAME_STATS_OVERLAY = False  # Draw live p50/p95/p99/max in the top-left corner (O key toggles)
+FRAME_STATS_OVERLAY_REFRESH = 1.0  # Seconds between overlay updates (forces a redraw)
+# Histogram buckets: log-spaced from MIN_MS to MAX_MS, each GROWTH times the previous
+FRAME_STATS_MIN_MS = 0.05
+FRAME_STATS_MAX_MS = 2000.0
+FRAME_STATS_GROWTH = 1.1
+
+# Display backend: "auto" (calibrate and pick the fastest), "sdl", "fbdev" or "headless"
+DISPLAY_BACKEND = "auto"
+DISPLAY_CALIBRATION_FRAMES = 5
+FRAMEBUFFER_DEVICE = "/dev/fb0"
+FRAMEBUFFER_ROTATION = 0  # Clockwise rotation of the UI on the panel: 0, 90, 180 or 270
+FRAMEBUFFER_COLOR_ORDER = "auto"  # "auto" (from the driver), "rgb" or "bgr"
+
+# Framebuffer partial flush: above this fraction of damaged rows the whole
+# frame is written instead of individual row spans
+FRAMEBUFFER_FULL_FLUSH_RATIO = 0.6
 
 # GPIO Pin assignments (BCM numbering)
 ROTARY_CLK_PIN = 17  # Rotary encoder clock
 ROTARY_DT_PIN = 27   # Rotary encoder data
 ROTARY_SW_PIN = 22   # Rotary encoder switch/button
+ROTARY_LONG_PRESS_TIME = 0.8  # Seconds held for a long press (letter jump)
+ROTARY_VELOCITY_WINDOW = 0.2  # Seconds of detent history used for the rotation velocity
 
 # Physical buttons on left side of display (top to bottom)
 BUTTON_TOP_PIN = 5      # Top button (Home)
@@ -17,10 +43,31 @@ BUTTON_BOTTOM_PIN = 13  # Bottom button (Back)
 
 CAMERA_TRIGGER_PIN = 23  # GPIO output for camera trigger
 CAMERA_TRIGGER_DURATION = 0.1  # 100ms pulse duration
+# Pulse edges are fired from a timing thread: it sleeps until
+# CAMERA_TRIGGER_SPIN_MS before an edge, then busy-waits for it
+CAMERA_TRIGGER_SPIN_MS = 2.0
+CAMERA_TRIGGER_PRIORITY = 50  # SCHED_FIFO priority of the timing thread (0 = normal scheduling)
+# Recorded sessions start the audio and the trigger pulse together: the
+# first sample reaches the output CAMERA_START_OFFSET_MS after the rising
+# edge (negative: before it). Set it to the camera's recording start delay.
+# Only the mmap engine starts to the sample; the mixer engine can't see when
+# SDL starts the Sound, so its audio may start up to one buffer late
+CAMERA_START_OFFSET_MS = 0.0
+SYNC_START_LEAD_MS = 20.0  # Minimum time from release to the first of the two events
 
 # Audio settings
 AUDIO_SAMPLE_RATE = 44100
 AUDIO_BUFFER_SIZE = 2048
+# Playback engine: "mixer" (pygame.mixer, decoded audio cache) or "mmap"
+# (WAVs streamed from memory-mapped files, for long recordings and
+# sample-accurate synchronized starts)
+AUDIO_ENGINE = "mixer"
+AUDIO_DEVICE = None  # SDL output device name for the mmap engine (None = first device)
+AUDIO_TRACK_GAP_MS = 0  # Silence between playlist tracks (0 = gapless)
+# Decoded audio kept in memory (LRU, current playlist pinned); files that
+# don't fit on their own are streamed from disk instead
+AUDIO_CACHE_BUDGET_BYTES = 128 * 1024 * 1024
+AUDIO_MONITOR_INTERVAL = 0.005  # Seconds between playlist checks on the audio monitor thread
 
 # File paths
 import os
@@ -29,6 +76,24 @@ MEDIA_ROOT = os.path.join(PROJECT_ROOT, "test_media")  # For development
 # MEDIA_ROOT = "/home/pi/media"  # Uncomment for production on Pi
 TEST_WAVS_DIR = os.path.join(MEDIA_ROOT, "test_wavs")
 SAMPLES_DIR = os.path.join(MEDIA_ROOT, "samples")
+# WAV header metadata (duration, format) of both directories, reparsed
+# only for files whose size or mtime changed (None = keep in memory only)
+WAV_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "samplepi", "wav_index.json")
+# Files whose rate, encoding or channel count differ from the mixer's are
+# converted in the background (one low-priority process per core) and
+# played from this cache once ready
+RESAMPLE_ENABLED = True
+RESAMPLE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "samplepi", "resampled")
+RESAMPLE_WORKERS = 0  # 0 = one per CPU core
+RESAMPLE_NICE = 19
+# Loudness normalization (opt-in): every file is analyzed in the background
+# (peak, RMS, integrated loudness) and played with a gain towards the
+# target, without boosting past LOUDNESS_MAX_GAIN_DB or the peak ceiling.
+# Files not analyzed yet play at unity gain, so levels can differ until then
+LOUDNESS_TARGET_LUFS = None  # e.g. -18.0; None = play everything at unity gain
+LOUDNESS_MAX_GAIN_DB = 12.0
+LOUDNESS_PEAK_CEILING_DB = -1.0
+LOUDNESS_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "samplepi", "loudness.json")
 
 # UI settings
 BUTTON_HEIGHT = 60
@@ -36,6 +101,12 @@ FONT_SIZE_LARGE = 24
 FONT_SIZE_MEDIUM = 18
 FONT_SIZE_SMALL = 14
 
+# Rendered text surfaces kept by the shared text cache
+TEXT_CACHE_SIZE = 256
+
+# Screens kept for Back navigation; the oldest entries are dropped beyond this
+SCREEN_HISTORY_LIMIT = 16
+
 # Colors (R, G, B)
 COLOR_BACKGROUND = (20, 20, 30)
 COLOR_TEXT = (255, 255, 255)
@@ -45,3 +116,10 @@ COLOR_HIGHLIGHT = (100, 150, 255)
 
 # Menu pagination
 ITEMS_PER_PAGE = 5
+
+# Scroll acceleration: below ROTARY_ACCEL_THRESHOLD detents/s each detent moves
+# one row, above it (velocity / threshold)^2 rows, up to ROTARY_ACCEL_MAX_GAIN.
+# Spins faster than MENU_JUMP_VELOCITY jump between first letters instead.
+ROTARY_ACCEL_THRESHOLD = 8.0
+ROTARY_ACCEL_MAX_GAIN = 20
+MENU_JUMP_VELOCITY = 40.0
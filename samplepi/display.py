@@ -0,0 +1,211 @@
+"""Display backends: SDL fullscreen, direct framebuffer and headless output"""
+
+import os
+import time
+import pygame
+from samplepi.config import settings
+
+
+# SDL_VIDEODRIVER as set by the environment, restored when switching back to SDL
+_ORIGINAL_VIDEODRIVER = os.environ.get('SDL_VIDEODRIVER')
+
+
+def _init_video(driver=None):
+    """(Re)initialize the SDL video subsystem with the given driver
+
+    driver=None restores whatever driver the environment asked for.
+    """
+    if pygame.display.get_init():
+        pygame.display.quit()
+    if driver:
+        os.environ['SDL_VIDEODRIVER'] = driver
+    elif _ORIGINAL_VIDEODRIVER is not None:
+        os.environ['SDL_VIDEODRIVER'] = _ORIGINAL_VIDEODRIVER
+    else:
+        os.environ.pop('SDL_VIDEODRIVER', None)
+    pygame.display.init()
+
+
+class DisplayBackend:
+    """Base class for display backends
+
+    Screens draw into `surface`; `present()` makes the frame visible.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.surface = None
+        self.frame_cost_ms = None
+
+    def open(self):
+        """Open the backend, returns True if it can be used"""
+        return False
+
+    def present(self, dirty_rects=None):
+        """Show the current frame (dirty_rects=None means the whole surface)"""
+        pass
+
+    def calibrate(self, frames):
+        """Average milliseconds to draw and present a representative frame"""
+        font = pygame.font.Font(None, settings.FONT_SIZE_MEDIUM)
+        start = time.perf_counter()
+        for i in range(frames):
+            self.surface.fill(settings.COLOR_BACKGROUND)
+            pygame.draw.rect(self.surface, settings.COLOR_BUTTON, (0, 40, settings.DISPLAY_WIDTH, 40))
+            text = font.render(f"Calibrating {i}", True, settings.COLOR_TEXT)
+            self.surface.blit(text, (10, 50))
+            self._present_sync()
+        self.frame_cost_ms = (time.perf_counter() - start) * 1000 / frames
+        return self.frame_cost_ms
+
+    def _present_sync(self):
+        """Present a full frame and wait until it is actually out"""
+        self.present(None)
+
+    def close(self):
+        """Release the backend"""
+        pass
+
+
+class SDLBackend(DisplayBackend):
+    """Fullscreen SDL window (KMS/DRM, X11, Wayland, macOS...)"""
+
+    name = "sdl"
+
+    def open(self):
+        try:
+            _init_video()
+            if pygame.display.get_driver() in ("dummy", "offscreen"):
+                # SDL has no real output here
+                return False
+            self.surface = pygame.display.set_mode(
+                (settings.DISPLAY_WIDTH, settings.DISPLAY_HEIGHT),
+                pygame.FULLSCREEN
+            )
+        except pygame.error as e:
+            print(f"SDL display not available: {e}")
+            return False
+        pygame.mouse.set_visible(False)
+        pygame.display.set_caption("SamplePi")
+        return True
+
+    def present(self, dirty_rects=None):
+        if dirty_rects is None:
+            pygame.display.flip()
+        elif dirty_rects:
+            pygame.display.update(dirty_rects)
+
+    def close(self):
+        pygame.display.quit()
+        self.surface = None
+
+
+class FramebufferBackend(DisplayBackend):
+    """Direct /dev/fb writes through Framebuffer and a writer thread"""
+
+    name = "fbdev"
+
+    def __init__(self):
+        super().__init__()
+        self.framebuffer = None
+        self.presenter = None
+
+    def open(self):
+        from samplepi.framebuffer import Framebuffer, FramebufferPresenter
+
+        if not os.path.exists(settings.FRAMEBUFFER_DEVICE):
+            return False
+        self.framebuffer = Framebuffer(settings.FRAMEBUFFER_DEVICE)
+        if not self.framebuffer.is_available():
+            self.framebuffer = None
+            return False
+
+        # SDL still drives events and fonts, without a window
+        _init_video("dummy")
+        self.surface = pygame.Surface((settings.DISPLAY_WIDTH, settings.DISPLAY_HEIGHT))
+        self.presenter = FramebufferPresenter(self.framebuffer)
+        self.presenter.start()
+        return True
+
+    def present(self, dirty_rects=None):
+        self.presenter.present(self.surface, dirty_rects)
+
+    def _present_sync(self):
+        self.framebuffer.blit(self.surface)
+
+    def close(self):
+        if self.presenter:
+            self.presenter.stop()
+            self.presenter = None
+        if self.framebuffer:
+            self.framebuffer.close()
+            self.framebuffer = None
+        self.surface = None
+
+
+class HeadlessBackend(DisplayBackend):
+    """Offscreen surface only (no display attached, benchmarks)"""
+
+    name = "headless"
+
+    def open(self):
+        _init_video("dummy")
+        self.surface = pygame.Surface((settings.DISPLAY_WIDTH, settings.DISPLAY_HEIGHT))
+        return True
+
+    def close(self):
+        self.surface = None
+
+
+# Backends that produce visible output, in order of preference on a tie
+BACKENDS = {
+    SDLBackend.name: SDLBackend,
+    FramebufferBackend.name: FramebufferBackend,
+    HeadlessBackend.name: HeadlessBackend,
+}
+
+
+def select_display_backend(name=None):
+    """Open the configured backend, or calibrate and pick the fastest one
+
+    name (default settings.DISPLAY_BACKEND) pins a backend; "auto" times
+    DISPLAY_CALIBRATION_FRAMES frames on every visible backend. Headless is
+    only used when pinned or when nothing else opens. An unknown name is
+    warned about and auto-detected.
+    """
+    if name is None:
+        name = settings.DISPLAY_BACKEND
+
+    if name != "auto" and name not in BACKENDS:
+        valid = ", ".join(f'"{backend_name}"' for backend_name in ("auto", *BACKENDS))
+        print(f"Warning: unknown display backend '{name}' (expected one of {valid}), auto-detecting")
+    elif name != "auto":
+        backend = BACKENDS[name]()
+        if backend.open():
+            cost = backend.calibrate(settings.DISPLAY_CALIBRATION_FRAMES)
+            print(f"Display backend: {backend.name} (pinned), {cost:.2f} ms/frame")
+            return backend
+        print(f"Warning: pinned display backend '{name}' is not available")
+
+    results = {}
+    for backend_name in (SDLBackend.name, FramebufferBackend.name):
+        backend = BACKENDS[backend_name]()
+        if not backend.open():
+            continue
+        results[backend_name] = backend.calibrate(settings.DISPLAY_CALIBRATION_FRAMES)
+        print(f"  {backend_name}: {results[backend_name]:.2f} ms/frame")
+        backend.close()
+
+    if results:
+        best = min(results, key=results.get)
+        backend = BACKENDS[best]()
+        if backend.open():
+            backend.frame_cost_ms = results[best]
+            print(f"Display backend: {best}, {results[best]:.2f} ms/frame")
+            return backend
+
+    backend = HeadlessBackend()
+    backend.open()
+    print("Warning: no display found, running headless")
+    return backend
@@ -0,0 +1,183 @@
+"""Frame-time instrumentation: per-phase histograms and summaries"""
+
+import math
+import time
+from samplepi.config import settings
+
+
+# Loop phases timed by MediaPlayerApp.step, plus the whole rendered frame
+PHASES = ("events", "update", "render", "flip")
+FRAME = "frame"
+
+
+class FrameHistogram:
+    """Fixed-memory histogram of durations with log-spaced buckets
+
+    Bucket edges grow by FRAME_STATS_GROWTH from FRAME_STATS_MIN_MS up to
+    FRAME_STATS_MAX_MS, so percentiles are exact to within one bucket
+    (~10%) no matter how many samples are recorded. max is exact.
+    """
+
+    def __init__(self):
+        self._log_min = math.log(settings.FRAME_STATS_MIN_MS)
+        self._log_growth = math.log(settings.FRAME_STATS_GROWTH)
+        bucket_count = int(math.ceil(
+            (math.log(settings.FRAME_STATS_MAX_MS) - self._log_min) / self._log_growth)) + 1
+        self._counts = [0] * bucket_count
+        self.reset()
+
+    def reset(self):
+        """Forget all samples"""
+        for i in range(len(self._counts)):
+            self._counts[i] = 0
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def _bucket(self, ms):
+        if ms <= settings.FRAME_STATS_MIN_MS:
+            return 0
+        index = int((math.log(ms) - self._log_min) / self._log_growth) + 1
+        return min(index, len(self._counts) - 1)
+
+    def _upper_edge(self, index):
+        return settings.FRAME_STATS_MIN_MS * settings.FRAME_STATS_GROWTH ** index
+
+    def add(self, ms):
+        """Record one duration in milliseconds"""
+        self._counts[self._bucket(ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, p):
+        """Upper bound of the p-th percentile (0-100) in milliseconds"""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(math.ceil(self.count * p / 100.0)))
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self._upper_edge(index), self.max_ms)
+        return self.max_ms
+
+    def get_stats(self):
+        """Get count, mean, p50/p95/p99 and max in milliseconds"""
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max_ms,
+        }
+
+
+class FrameStats:
+    """Per-phase frame timings, broken down by screen class
+
+    The loop calls begin_frame() once events have arrived, lap(phase)
+    after each phase and end_frame() after presenting. Histograms cover
+    the current summary interval and are reset when it is printed.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._histograms = {}  # screen class name -> {phase: FrameHistogram}
+        self._screen = None
+        self._frame_start = None
+        self._lap_start = None
+        self._window_start = time.monotonic()
+        self.frames = 0
+
+    def begin_frame(self, screen):
+        """Start timing a loop iteration on the given screen"""
+        self._screen = type(screen).__name__ if screen is not None else "None"
+        self._frame_start = self._lap_start = self._clock()
+
+    def lap(self, phase):
+        """Record the time since the previous lap as phase"""
+        if self._lap_start is None:
+            return
+        now = self._clock()
+        self._histogram(self._screen, phase).add((now - self._lap_start) * 1000)
+        self._lap_start = now
+
+    def end_frame(self):
+        """Record the whole iteration as a rendered frame"""
+        if self._frame_start is None:
+            return
+        self._histogram(self._screen, FRAME).add((self._clock() - self._frame_start) * 1000)
+        self.frames += 1
+
+    def _histogram(self, screen_name, phase):
+        phases = self._histograms.get(screen_name)
+        if phases is None:
+            phases = self._histograms[screen_name] = {}
+        histogram = phases.get(phase)
+        if histogram is None:
+            histogram = phases[phase] = FrameHistogram()
+        return histogram
+
+    def get_stats(self, screen_name=None):
+        """Stats per screen class and phase ({screen: {phase: stats}})"""
+        screens = [screen_name] if screen_name else list(self._histograms)
+        return {
+            name: {phase: hist.get_stats() for phase, hist in self._histograms.get(name, {}).items()}
+            for name in screens
+        }
+
+    def summary_due(self, now):
+        """Check if FRAME_STATS_INTERVAL passed since the last summary"""
+        return (settings.FRAME_STATS_INTERVAL > 0 and
+                now - self._window_start >= settings.FRAME_STATS_INTERVAL)
+
+    def format_summary(self):
+        """One line per screen class: frame percentiles, then p95 per phase"""
+        lines = []
+        for name, phases in self._histograms.items():
+            frame = phases.get(FRAME)
+            if frame is None or not frame.count:
+                continue
+            stats = frame.get_stats()
+            line = (f"  {name}: {stats['count']} frames, p50 {stats['p50_ms']:.1f} "
+                    f"p95 {stats['p95_ms']:.1f} p99 {stats['p99_ms']:.1f} "
+                    f"max {stats['max_ms']:.1f} ms")
+            parts = [f"{phase} {phases[phase].percentile(95):.1f}"
+                     for phase in PHASES if phase in phases]
+            if parts:
+                line += f" (p95 {', '.join(parts)})"
+            lines.append(line)
+        return lines
+
+    def print_summary(self):
+        """Print the summary for the current interval and start a new one"""
+        elapsed = time.monotonic() - self._window_start
+        lines = self.format_summary()
+        if lines:
+            print(f"Frame times over {elapsed:.0f}s:")
+            for line in lines:
+                print(line)
+        else:
+            print(f"Frame times over {elapsed:.0f}s: idle, no frames rendered")
+        self.reset()
+
+    def reset(self):
+        """Start a new summary interval"""
+        for phases in self._histograms.values():
+            for histogram in phases.values():
+                histogram.reset()
+        self._window_start = time.monotonic()
+
+    def overlay_lines(self):
+        """Short lines for the on-screen overlay (current screen class)"""
+        frame = self._histograms.get(self._screen, {}).get(FRAME)
+        if frame is None or not frame.count:
+            return ["-- ms"]
+        stats = frame.get_stats()
+        return [
+            f"p50 {stats['p50_ms']:.1f} p95 {stats['p95_ms']:.1f}",
+            f"p99 {stats['p99_ms']:.1f} max {stats['max_ms']:.1f}",
+        ]
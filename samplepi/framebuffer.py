@@ -1,27 +1,83 @@
 """Direct framebuffer rendering for displays that don't work with SDL drivers"""
 
 import os
+import math
 import mmap
 import struct
+import threading
+
+from samplepi.config import settings
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    print("Warning: numpy not available. Framebuffer output disabled.")
+
+# ioctl returning struct fb_var_screeninfo (linux/fb.h)
+FBIOGET_VSCREENINFO = 0x4600
 
 
 class Framebuffer:
-    """Direct framebuffer access for ILI9486 and similar displays"""
+    """Direct framebuffer access for ILI9486 and similar displays
+
+    Handles 16bpp (RGB565/BGR565), 24bpp and 32bpp layouts and 0/90/180/270
+    degree rotation in one conversion pass into a preallocated buffer.
+    """
 
-    def __init__(self, device="/dev/fb0"):
+    def __init__(self, device="/dev/fb0", width=None, height=None, bpp=None,
+                 rotation=None, color_order=None):
+        """Open the framebuffer device
+
+        width, height and bpp are normally read from sysfs. Passing them
+        explicitly skips sysfs, which lets a plain file stand in for the
+        device (used by the benchmark). rotation and color_order default
+        to FRAMEBUFFER_ROTATION and FRAMEBUFFER_COLOR_ORDER.
+        """
         self.device = device
         self.fbfd = None
         self.fbmmap = None
-        self.width = 0
-        self.height = 0
-        self.bpp = 0
+        self.width = width or 0
+        self.height = height or 0
+        self.bpp = bpp or 0
         self.stride = 0
+        self.rotation = settings.FRAMEBUFFER_ROTATION if rotation is None else rotation
+        self.color_order = color_order or settings.FRAMEBUFFER_COLOR_ORDER
+
+        # (offset, length) in bits of the red, green and blue channels
+        self.channels = None
+        self.transp = (0, 0)
+
+        # Write counters (see get_stats)
+        self.last_frame_bytes = 0
+        self.total_bytes = 0
+        self.frames = 0
+        self.full_flushes = 0
+        self.partial_flushes = 0
+
+        # Preallocated per-frame buffers (created once the geometry is known)
+        self._fb_pixels = None
+        self._out = None
+        self._scratch = None
+        self._scaled = None
 
         try:
+            if self.rotation not in (0, 90, 180, 270):
+                raise ValueError(f"Unsupported rotation: {self.rotation}")
             self._open_framebuffer()
+            self._allocate_buffers()
         except Exception as e:
             print(f"Warning: Could not open framebuffer {device}: {e}")
             print("Framebuffer output will not work")
+            self.close()
+
+    @property
+    def surface_size(self):
+        """Size of the UI surface before rotation"""
+        if self.rotation in (90, 270):
+            return (self.height, self.width)
+        return (self.width, self.height)
 
     def _open_framebuffer(self):
         """Open and memory-map the framebuffer device"""
@@ -30,74 +86,211 @@ class Framebuffer:
 
         # Get framebuffer info from sysfs
         fb_name = os.path.basename(self.device)
+        sysfs = f"/sys/class/graphics/{fb_name}"
+
+        if not (self.width and self.height and self.bpp):
+            # Read resolution
+            with open(f"{sysfs}/virtual_size", 'r') as f:
+                width, height = map(int, f.read().strip().split(','))
+                self.width = width
+                self.height = height
 
-        # Read resolution
-        with open(f"/sys/class/graphics/{fb_name}/virtual_size", 'r') as f:
-            width, height = map(int, f.read().strip().split(','))
-            self.width = width
-            self.height = height
+            # Read bits per pixel
+            with open(f"{sysfs}/bits_per_pixel", 'r') as f:
+                self.bpp = int(f.read().strip())
 
-        # Read bits per pixel
-        with open(f"/sys/class/graphics/{fb_name}/bits_per_pixel", 'r') as f:
-            self.bpp = int(f.read().strip())
+        if self.bpp not in (16, 24, 32):
+            raise ValueError(f"Unsupported framebuffer depth: {self.bpp}bpp")
 
-        # Calculate stride (bytes per line)
-        self.stride = (self.width * self.bpp) // 8
+        # Drivers may pad lines, so prefer the real stride over width*bpp/8
+        try:
+            with open(f"{sysfs}/stride", 'r') as f:
+                self.stride = int(f.read().strip())
+        except (OSError, ValueError):
+            self.stride = (self.width * self.bpp) // 8
+
+        self._read_channel_layout()
 
         # Memory map the framebuffer
         fbsize = self.stride * self.height
         self.fbmmap = mmap.mmap(self.fbfd, fbsize, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
 
-        print(f"Framebuffer opened: {self.width}x{self.height}, {self.bpp}bpp, stride={self.stride}")
+        print(f"Framebuffer opened: {self.width}x{self.height}, {self.bpp}bpp, stride={self.stride}, "
+              f"rgb={self.channels}, rotation={self.rotation}")
 
-    def blit(self, surface):
-        """Blit a pygame surface to the framebuffer"""
-        if not self.fbmmap:
-            return
+    def _read_channel_layout(self):
+        """Find the channel bit layout (FBIOGET_VSCREENINFO, else the usual defaults)"""
+        try:
+            import fcntl
+            info = fcntl.ioctl(self.fbfd, FBIOGET_VSCREENINFO, bytes(160))
+            fields = struct.unpack_from('20I', info)
+            if fields[6] != self.bpp:
+                raise ValueError("bits_per_pixel mismatch")
+            self.channels = ((fields[8], fields[9]), (fields[11], fields[12]), (fields[14], fields[15]))
+            self.transp = (fields[17], fields[18])
+        except (ImportError, OSError, ValueError, struct.error):
+            if self.bpp == 16:
+                self.channels = ((11, 5), (5, 6), (0, 5))
+            else:
+                self.channels = ((16, 8), (8, 8), (0, 8))
+
+        red, green, blue = self.channels
+        if self.color_order in ("rgb", "bgr") and (self.color_order == "rgb") != (red[0] > blue[0]):
+            # Configured order disagrees with the driver: swap red and blue
+            self.channels = (blue, green, red)
+
+        if self.bpp != 16 and any(length != 8 or offset % 8 for offset, length in self.channels):
+            raise ValueError(f"Unsupported {self.bpp}bpp channel layout: {self.channels}")
 
-        # Convert pygame surface to RGB565 format (most common for small TFT displays)
+    def _allocate_buffers(self):
+        """Allocate the conversion buffers and the mmap pixel view once"""
         import pygame
 
-        # Scale surface to framebuffer size if needed
-        if surface.get_size() != (self.width, self.height):
-            surface = pygame.transform.scale(surface, (self.width, self.height))
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is required for framebuffer output")
+
+        # Reused target for scaling / depth conversion of incoming surfaces
+        self._scaled = pygame.Surface(self.surface_size, depth=32)
 
-        # Convert to 16-bit RGB565 if framebuffer is 16bpp
         if self.bpp == 16:
-            self._blit_rgb565(surface)
-        elif self.bpp == 32:
-            self._blit_rgb888(surface)
+            # Row-major (height, width) view straight onto the mapping
+            self._fb_pixels = np.ndarray(
+                (self.height, self.width), dtype=np.uint16,
+                buffer=self.fbmmap, strides=(self.stride, 2)
+            )
+            self._out = np.empty((self.height, self.width), dtype=np.uint16)
+            self._scratch = np.empty((self.height, self.width), dtype=np.uint16)
         else:
-            print(f"Unsupported framebuffer depth: {self.bpp}bpp")
+            # (height, width, bytes) view, channels addressed by byte
+            pixel_bytes = self.bpp // 8
+            self._fb_pixels = np.ndarray(
+                (self.height, self.width, pixel_bytes), dtype=np.uint8,
+                buffer=self.fbmmap, strides=(self.stride, pixel_bytes, 1)
+            )
+            self._out = np.zeros((self.height, self.width, pixel_bytes), dtype=np.uint8)
+            if self.transp[1]:
+                # Opaque alpha, set once
+                self._out[:, :, self.transp[0] // 8] = 0xFF
 
-    def _blit_rgb565(self, surface):
-        """Convert and blit surface as RGB565"""
+    def _prepare_surface(self, surface):
+        """Return a surface of UI size that pixels3d can view"""
         import pygame
 
-        # Get pixel data
-        pixels = pygame.surfarray.array3d(surface)
+        if surface.get_size() != self.surface_size:
+            pygame.transform.scale(surface, self.surface_size, self._scaled)
+            return self._scaled
+        if surface.get_bytesize() not in (3, 4):
+            self._scaled.blit(surface, (0, 0))
+            return self._scaled
+        return surface
+
+    def blit(self, surface, dirty_rects=None):
+        """Blit a pygame surface to the framebuffer
+
+        dirty_rects lists the damaged areas of the surface. They are merged
+        into row spans and only those rows are converted and written. None
+        (or damage above FRAMEBUFFER_FULL_FLUSH_RATIO of the rows) flushes
+        the whole frame; an empty list writes nothing.
+        """
+        if not self.fbmmap:
+            return
+
+        spans = self._row_spans(dirty_rects, surface.get_height())
+        surface = self._prepare_surface(surface)
+
+        if spans is None:
+            spans = [(0, self.height)]
+            self.full_flushes += 1
+        elif spans:
+            self.partial_flushes += 1
+
+        written = self._convert(surface, spans) if spans else 0
+
+        self.last_frame_bytes = written
+        self.total_bytes += written
+        self.frames += 1
 
-        # Convert to RGB565 format
-        for y in range(self.height):
-            for x in range(self.width):
-                r, g, b = pixels[x, y]
+    def _row_spans(self, dirty_rects, source_height):
+        """Merge damaged rects into sorted (top, bottom) framebuffer row spans
 
-                # Pack to RGB565: RRRRRGGGGGGBBBBB
-                rgb565 = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | ((b & 0xF8) >> 3)
+        Returns None when a full flush is cheaper or was requested.
+        """
+        if dirty_rects is None or self.rotation in (90, 270):
+            # Source rows become framebuffer columns when rotated sideways
+            return None
 
-                # Write to framebuffer
-                offset = y * self.stride + x * 2
-                self.fbmmap[offset:offset+2] = struct.pack('H', rgb565)
+        # Map source rows onto framebuffer rows when the surface is scaled
+        scale = self.height / source_height if source_height else 1
+        intervals = []
+        for rect in dirty_rects:
+            top = max(0, int(rect[1] * scale))
+            bottom = min(self.height, math.ceil((rect[1] + rect[3]) * scale))
+            if bottom > top:
+                if self.rotation == 180:
+                    top, bottom = self.height - bottom, self.height - top
+                intervals.append((top, bottom))
+        intervals.sort()
 
-    def _blit_rgb888(self, surface):
-        """Convert and blit surface as RGB888 (32bpp)"""
+        spans = []
+        for top, bottom in intervals:
+            if spans and top <= spans[-1][1]:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], bottom))
+            else:
+                spans.append((top, bottom))
+
+        rows = sum(bottom - top for top, bottom in spans)
+        if rows > self.height * settings.FRAMEBUFFER_FULL_FLUSH_RATIO:
+            return None
+        return spans
+
+    def _convert(self, surface, spans):
+        """Convert and write the given framebuffer row spans of surface"""
         import pygame
 
-        # Get pixel data as string
-        pixels = pygame.image.tostring(surface, 'RGBX')
+        # Zero-copy (width, height, 3) view, transposed to row-major order and
+        # rotated clockwise as a view, so rotation happens inside the copy below
+        pixels = pygame.surfarray.pixels3d(surface).transpose(1, 0, 2)
+        if self.rotation:
+            pixels = np.rot90(pixels, -(self.rotation // 90), axes=(0, 1))
+
+        written = 0
+        for top, bottom in spans:
+            src = pixels[top:bottom]
+            out = self._out[top:bottom]
+
+            if self.bpp == 16:
+                # Pack channels (e.g. RRRRRGGGGGGBBBBB), in place to avoid temporaries
+                scratch = self._scratch[top:bottom]
+                for i, (offset, length) in enumerate(self.channels):
+                    target = out if i == 0 else scratch
+                    np.copyto(target, src[:, :, i])
+                    target >>= 8 - length
+                    target <<= offset
+                    if i:
+                        out |= scratch
+            else:
+                # 24/32bpp: each channel is one byte of the little-endian pixel
+                for i, (offset, length) in enumerate(self.channels):
+                    np.copyto(out[:, :, offset // 8], src[:, :, i])
 
-        # Write directly to framebuffer
-        self.fbmmap[:len(pixels)] = pixels
+            # Single copy per span into the mapping
+            np.copyto(self._fb_pixels[top:bottom], out)
+            written += (bottom - top) * self.width * (self.bpp // 8)
+
+        # Release the surface lock before the next draw
+        pixels = src = None
+        return written
+
+    def get_stats(self):
+        """Get write counters"""
+        return {
+            'frames': self.frames,
+            'last_frame_bytes': self.last_frame_bytes,
+            'total_bytes': self.total_bytes,
+            'avg_frame_bytes': self.total_bytes // self.frames if self.frames else 0,
+            'full_flushes': self.full_flushes,
+            'partial_flushes': self.partial_flushes,
+        }
 
     def clear(self):
         """Clear the framebuffer to black"""
@@ -106,11 +299,109 @@ class Framebuffer:
 
     def close(self):
         """Close the framebuffer"""
+        # Views onto the mapping must be dropped before it can be closed
+        self._fb_pixels = None
         if self.fbmmap:
             self.fbmmap.close()
+            self.fbmmap = None
         if self.fbfd:
             os.close(self.fbfd)
+            self.fbfd = None
 
     def is_available(self):
         """Check if framebuffer is available"""
         return self.fbmmap is not None
+
+
+class FramebufferPresenter:
+    """Double-buffered framebuffer output on a dedicated writer thread
+
+    The main loop copies each finished frame into the back buffer with
+    present() and returns immediately. The writer thread converts and
+    writes the latest frame while the next one is drawn. If a new frame
+    arrives before the writer picked up the previous one, the stale frame
+    is dropped (its damage is carried over) instead of queued.
+    """
+
+    def __init__(self, framebuffer):
+        import pygame
+
+        self.framebuffer = framebuffer
+        size = framebuffer.surface_size
+        self._back = pygame.Surface(size, depth=32)
+        self._front = pygame.Surface(size, depth=32)
+
+        self._lock = threading.Condition()
+        self._pending = False
+        self._pending_damage = None
+        self._running = False
+        self._thread = None
+
+        self.frames_presented = 0
+        self.frames_dropped = 0
+
+    def start(self):
+        """Start the writer thread"""
+        if self._thread:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._writer_loop, name="fb-writer", daemon=True)
+        self._thread.start()
+
+    def present(self, surface, dirty_rects=None):
+        """Hand off a finished frame (dirty_rects as for Framebuffer.blit)"""
+        import pygame
+
+        with self._lock:
+            if self._pending:
+                # Writer is still busy: replace the stale frame, keep its damage
+                self.frames_dropped += 1
+                if self._pending_damage is None or dirty_rects is None:
+                    damage = None
+                else:
+                    damage = self._pending_damage + list(dirty_rects)
+            else:
+                damage = None if dirty_rects is None else list(dirty_rects)
+
+            if surface.get_size() == self._back.get_size():
+                self._back.blit(surface, (0, 0))
+            else:
+                pygame.transform.scale(surface, self._back.get_size(), self._back)
+                # Damage is in source coordinates; just flush everything
+                damage = None
+
+            self._pending = True
+            self._pending_damage = damage
+            self._lock.notify()
+
+    def _writer_loop(self):
+        """Writer thread: swap in the newest frame and write it out"""
+        while True:
+            with self._lock:
+                while self._running and not self._pending:
+                    self._lock.wait()
+                if not self._running:
+                    return
+                self._front, self._back = self._back, self._front
+                damage = self._pending_damage
+                self._pending = False
+                self._pending_damage = None
+
+            self.framebuffer.blit(self._front, damage)
+            self.frames_presented += 1
+
+    def get_stats(self):
+        """Get presented/dropped frame counters"""
+        return {
+            'frames_presented': self.frames_presented,
+            'frames_dropped': self.frames_dropped,
+        }
+
+    def stop(self):
+        """Stop the writer thread (pending frames are discarded)"""
+        with self._lock:
+            self._running = False
+            self._lock.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
@@ -1,5 +1,9 @@
 """Camera trigger GPIO output handler"""
 
+import heapq
+import itertools
+import os
+import threading
 import time
 try:
     from gpiozero import OutputDevice
@@ -11,11 +15,166 @@ except (ImportError, RuntimeError):
 from samplepi.config import settings
 
 
+class Pulse:
+    """One trigger pulse; the timing thread fills in when its edges happened
+
+    start is the monotonic time the rising edge is due, rising_time and
+    falling_time (None until they happened) are the monotonic times taken
+    right after the pin was switched.
+    """
+
+    def __init__(self, start, duration):
+        self.start = start
+        self.duration = duration
+        self.rising_time = None
+        self.falling_time = None
+        self._done = threading.Event()
+
+    @property
+    def width(self):
+        """Achieved pulse width in seconds (None until the falling edge)"""
+        if self.falling_time is None:
+            return None
+        return self.falling_time - self.rising_time
+
+    def is_done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Wait for the falling edge, returns False on timeout"""
+        return self._done.wait(timeout)
+
+
+def _wait_until(deadline):
+    """Sleep until shortly before deadline (monotonic), then spin for it"""
+    coarse = deadline - settings.CAMERA_TRIGGER_SPIN_MS / 1000.0
+    now = time.monotonic()
+    if now < coarse:
+        time.sleep(coarse - now)
+    while time.monotonic() < deadline:
+        pass
+
+
+class PulseScheduler:
+    """Fires pulse edges on a dedicated timing thread
+
+    on and off switch the output. Edges are kept in one queue ordered by
+    due time, so a falling edge doesn't hold up another pulse's rising
+    edge. The thread is started on the first pulse and raised to
+    SCHED_FIFO (CAMERA_TRIGGER_PRIORITY) where the process is allowed to;
+    each edge is slept towards and then spun for (see _wait_until). A
+    pulse due while another is still high waits for its falling edge. The
+    falling edge is timed from the actual rising edge, so the width
+    doesn't absorb the lateness of the start.
+    """
+
+    def __init__(self, on, off, name="trigger-pulse"):
+        self._on = on
+        self._off = off
+        self._name = name
+        self._queue = []  # heap of (due, seq, callback)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._high = None  # Pulse whose falling edge is pending
+
+    def _call_at(self, when, callback):
+        """Run callback() on the timing thread at monotonic time when"""
+        with self._cond:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+            heapq.heappush(self._queue, (when, next(self._seq), callback))
+            self._cond.notify()
+
+    def schedule(self, start=None, duration=None):
+        """Queue a pulse with its rising edge at monotonic time start (default now)"""
+        pulse = Pulse(time.monotonic() if start is None else start,
+                      settings.CAMERA_TRIGGER_DURATION if duration is None else duration)
+        self._call_at(pulse.start, lambda: self._rise(pulse))
+        return pulse
+
+    def _rise(self, pulse):
+        if self._high is not None:
+            # Still high from the previous pulse: start right after it ends
+            high = self._high
+            self._call_at(high.rising_time + high.duration, lambda: self._rise(pulse))
+            return
+        self._on()
+        pulse.rising_time = time.monotonic()
+        self._high = pulse
+        self._call_at(pulse.rising_time + pulse.duration, lambda: self._fall(pulse))
+
+    def _fall(self, pulse):
+        self._off()
+        pulse.falling_time = time.monotonic()
+        self._high = None
+        pulse._done.set()
+
+    def _raise_priority(self):
+        priority = settings.CAMERA_TRIGGER_PRIORITY
+        if not priority or not hasattr(os, 'sched_setscheduler'):
+            return
+        try:
+            # pid 0 is the calling thread
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        except OSError as e:
+            print(f"Warning: camera trigger timing runs at normal priority: {e}")
+
+    def _next_due(self):
+        """Wait for the first event to come within the spin window (None when stopping)"""
+        spin = settings.CAMERA_TRIGGER_SPIN_MS / 1000.0
+        with self._cond:
+            while not self._stopping:
+                if self._queue:
+                    due = self._queue[0][0]
+                    remaining = due - spin - time.monotonic()
+                    if remaining <= 0:
+                        due, _, callback = heapq.heappop(self._queue)
+                        return due, callback
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _run(self):
+        self._raise_priority()
+        while True:
+            event = self._next_due()
+            if event is None:
+                return
+            due, callback = event
+            _wait_until(due)
+            callback()
+
+    def shutdown(self):
+        """Stop the thread and drop pending events; a pulse still high is ended now"""
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._queue.clear()
+            self._cond.notify()
+        if thread is not None:
+            thread.join()
+        if self._high is not None:
+            self._fall(self._high)
+        with self._cond:
+            self._thread = None
+
+
 class CameraTrigger:
-    """Handles camera trigger GPIO output"""
+    """Handles camera trigger GPIO output
+
+    Pulses are fired by a PulseScheduler, so send_pulse() returns at once
+    with the Pulse; its edge timestamps are filled in as they happen. In
+    mock mode the pulses are timed the same way without a pin.
+    """
 
     def __init__(self):
         self.trigger = None
+        self.last_pulse = None
         if GPIO_AVAILABLE:
             try:
                 self.trigger = OutputDevice(
@@ -26,18 +185,31 @@ class CameraTrigger:
                 print(f"Warning: Could not initialize camera trigger: {e}")
                 print("Running in mock GPIO mode")
                 self.trigger = None
+        self.scheduler = PulseScheduler(self._on, self._off)
 
-    def send_pulse(self):
-        """Send a 100ms HIGH pulse to trigger camera recording"""
+    def _on(self):
         if self.trigger:
             self.trigger.on()
-            time.sleep(settings.CAMERA_TRIGGER_DURATION)
+
+    def _off(self):
+        if self.trigger:
             self.trigger.off()
+
+    def send_pulse(self, start=None, duration=None):
+        """Send a HIGH pulse (CAMERA_TRIGGER_DURATION) to trigger camera recording
+
+        The rising edge comes at monotonic time start (default now); returns
+        the Pulse without waiting for it.
+        """
+        self.last_pulse = self.scheduler.schedule(start, duration)
+        if self.trigger:
             print("Camera trigger: pulse sent")
         else:
             print("Camera trigger: pulse sent (mock mode)")
+        return self.last_pulse
 
     def cleanup(self):
         """Clean up GPIO resources"""
+        self.scheduler.shutdown()
         if GPIO_AVAILABLE and self.trigger:
             self.trigger.close()
@@ -1,5 +1,8 @@
 """Rotary encoder input handler"""
 
+import time
+from collections import deque
+
 try:
     from gpiozero import RotaryEncoder as GPIORotaryEncoder, Button
     GPIO_AVAILABLE = True
@@ -11,13 +14,27 @@ from samplepi.config import settings
 
 
 class RotaryEncoder:
-    """Handles rotary encoder input with button press"""
+    """Handles rotary encoder input with button press
+
+    Every detent is timestamped with clock (monotonic by default) and the
+    rotate callback receives (delta, velocity): the signed number of steps
+    since the last callback and the rotation speed in detents/s over the
+    last ROTARY_VELOCITY_WINDOW seconds.
+    """
 
-    def __init__(self):
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
         self.position = 0
+        self.velocity = 0.0
+        self.last_detent_time = None
+        # (timestamp, steps) of recent detents in the current direction
+        self._detents = deque()
+        self._last_sign = 0
         self.button_pressed = False
         self._on_rotate_callback = None
         self._on_press_callback = None
+        self._on_long_press_callback = None
+        self._held = False
         self.encoder = None
         self.button = None
 
@@ -28,13 +45,17 @@ class RotaryEncoder:
                     settings.ROTARY_CLK_PIN,
                     settings.ROTARY_DT_PIN,
                     wrap=False,
-                    max_steps=1000
+                    max_steps=0  # Unbounded steps; a clamped count would hide rotation
                 )
                 self.encoder.when_rotated = self._handle_rotation
 
                 # Initialize button
-                self.button = Button(settings.ROTARY_SW_PIN, pull_up=True)
-                self.button.when_pressed = self._handle_press
+                # Select fires on release unless the press became a long press
+                self.button = Button(settings.ROTARY_SW_PIN, pull_up=True,
+                                     hold_time=settings.ROTARY_LONG_PRESS_TIME)
+                self.button.when_pressed = self._handle_press_start
+                self.button.when_held = self._handle_hold
+                self.button.when_released = self._handle_release
             except (RuntimeError, Exception) as e:
                 print(f"Warning: Could not initialize rotary encoder: {e}")
                 print("Running in mock GPIO mode")
@@ -45,15 +66,52 @@ class RotaryEncoder:
         """Internal rotation handler"""
         if self.encoder:
             steps = self.encoder.steps
-            direction = 1 if steps > self.position else -1
+            delta = steps - self.position
             self.position = steps
+            if delta:
+                self._report_rotation(delta)
 
-            if self._on_rotate_callback:
-                self._on_rotate_callback(direction)
+    def _report_rotation(self, delta):
+        """Timestamp a detent, update the velocity and notify the callback"""
+        now = self.clock()
+        self.last_detent_time = now
+        self.velocity = self._update_velocity(now, delta)
 
-    def _handle_press(self):
-        """Internal button press handler"""
-        if self._on_press_callback:
+        if self._on_rotate_callback:
+            self._on_rotate_callback(delta, self.velocity)
+
+    def _update_velocity(self, now, delta):
+        """Detents/s over the velocity window (0 for an isolated detent)"""
+        sign = 1 if delta > 0 else -1
+        if sign != self._last_sign:
+            # Direction change restarts the measurement
+            self._detents.clear()
+            self._last_sign = sign
+
+        self._detents.append((now, abs(delta)))
+        while now - self._detents[0][0] > settings.ROTARY_VELOCITY_WINDOW:
+            self._detents.popleft()
+
+        elapsed = now - self._detents[0][0]
+        if len(self._detents) < 2 or elapsed <= 0:
+            return 0.0
+        # Steps after the oldest detent, over the time since it
+        steps = sum(count for _, count in self._detents) - self._detents[0][1]
+        return steps / elapsed
+
+    def _handle_press_start(self):
+        """Internal button down handler"""
+        self._held = False
+
+    def _handle_hold(self):
+        """Internal long press handler"""
+        self._held = True
+        if self._on_long_press_callback:
+            self._on_long_press_callback()
+
+    def _handle_release(self):
+        """Internal button release handler (short press)"""
+        if not self._held and self._on_press_callback:
             self._on_press_callback()
 
     def on_rotate(self, callback):
@@ -64,10 +122,13 @@ class RotaryEncoder:
         """Register callback for button press events"""
         self._on_press_callback = callback
 
+    def on_long_press(self, callback):
+        """Register callback for long press events"""
+        self._on_long_press_callback = callback
+
     def simulate_rotation(self, direction):
-        """Simulate rotation for testing (direction: 1 or -1)"""
-        if self._on_rotate_callback:
-            self._on_rotate_callback(direction)
+        """Simulate rotation for testing (direction: signed step count)"""
+        self._report_rotation(direction)
 
     def simulate_press(self):
         """Simulate button press for testing"""
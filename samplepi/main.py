@@ -1,91 +1,282 @@
 #!/usr/bin/env python3
 """Main entry point for MediaPlayer application"""
 
+import time
+# Taken before the heavy imports so the startup trace includes them
+_PROCESS_START = time.perf_counter()
+
 import pygame
 import sys
 import os
 import signal
+import threading
 from samplepi.config import settings
+from samplepi.display import select_display_backend
+from samplepi.frame_stats import FrameStats
+from samplepi.trigger_latency import TriggerLatency
+from samplepi.startup import StartupTrace
 from samplepi.state import AppState
+from samplepi.ui.screen_registry import ScreenRegistry
 from samplepi.ui.screens import StartScreen
-from samplepi.gpio import RotaryEncoder, CameraTrigger
-from samplepi.gpio.touchscreen import TouchscreenButtons
+
+# Posted by GPIO callback threads so input is handled on the main thread
+# and wakes the event-driven loop
+INPUT_EVENT = pygame.USEREVENT + 1
 
 
 class MediaPlayerApp:
     def __init__(self):
-        """Initialize the MediaPlayer application"""
-        pygame.init()
-
-        # Run fullscreen pygame application
-        print("Initializing fullscreen display")
-        self.screen = pygame.display.set_mode(
-            (settings.DISPLAY_WIDTH, settings.DISPLAY_HEIGHT),
-            pygame.FULLSCREEN
-        )
-        pygame.mouse.set_visible(False)
-        pygame.display.set_caption("SamplePi")
-        print(f"Display initialized: {settings.DISPLAY_WIDTH}x{settings.DISPLAY_HEIGHT} fullscreen")
-
-        self.clock = pygame.time.Clock()
+        """Initialize the MediaPlayer application
+
+        Only what the StartScreen needs runs before its first frame is
+        presented; GPIO is set up on a background thread and audio on the
+        first loop iteration (see init_gpio and init_audio).
+        """
+        self.startup = StartupTrace(_PROCESS_START)
+        self.startup.mark("imports")
+
+        # Not pygame.init(): the mixer is opened later by AudioPlayer with
+        # the configured parameters, the display by the backend
+        with self.startup.stage("pygame"):
+            pygame.font.init()
+
+        # Pick SDL fullscreen, direct framebuffer or headless output
+        print("Initializing display")
+        with self.startup.stage("display"):
+            self.display = select_display_backend()
+            self.screen = self.display.surface
+        print(f"Display initialized: {settings.DISPLAY_WIDTH}x{settings.DISPLAY_HEIGHT} ({self.display.name})")
+
         self.running = True
+        self._presented_screen = None
+
+        # Render loop scheduling (monotonic seconds)
+        self._last_render = 0.0
+        self._next_update = 0.0
+        self.frame_count = 0
+        # Set by GPIO callbacks to cut an idle wait short
+        self._wakeup = threading.Event()
+
+        # Per-phase frame timings, summarized periodically
+        self.frame_stats = FrameStats()
+        self.show_frame_stats = settings.FRAME_STATS_OVERLAY
+        self._overlay_rect = None
+        self._overlay_updated = 0.0
+        self.trigger_latency = TriggerLatency()
 
         # Load fonts
-        self.font_large = pygame.font.Font(None, settings.FONT_SIZE_LARGE)
-        self.font_medium = pygame.font.Font(None, settings.FONT_SIZE_MEDIUM)
-        self.font_small = pygame.font.Font(None, settings.FONT_SIZE_SMALL)
+        with self.startup.stage("fonts"):
+            self.font_large = pygame.font.Font(None, settings.FONT_SIZE_LARGE)
+            self.font_medium = pygame.font.Font(None, settings.FONT_SIZE_MEDIUM)
+            self.font_small = pygame.font.Font(None, settings.FONT_SIZE_SMALL)
 
         # Initialize state
         self.state = AppState()
+        self.screens = ScreenRegistry(self)
+
+        # Deferred subsystems, see init_audio and init_gpio
+        self._audio_player = None
+        self._camera_trigger = None
+        self.rotary = None
+        self.touchscreen = None
+        self._gpio_ready = threading.Event()
+        self.startup.defer("audio")
+        self.startup.defer("gpio")
+
+        # Start with home screen and get it on the display right away
+        with self.startup.stage("start screen"):
+            self.state.goto_screen(self.screens.get(StartScreen))
+        with self.startup.stage("first frame"):
+            self.render()
+            self._last_render = time.monotonic()
+        self.startup.first_frame()
+
+        self._gpio_thread = threading.Thread(target=self.init_gpio, name="gpio-init", daemon=True)
+        self._gpio_thread.start()
+
+    @property
+    def audio_player(self):
+        """AudioPlayer, created on first use if the deferred init hasn't run yet"""
+        if self._audio_player is None:
+            self.init_audio()
+        return self._audio_player
+
+    @property
+    def camera_trigger(self):
+        """CameraTrigger, waiting for the GPIO init thread if it is still running"""
+        self._gpio_ready.wait()
+        return self._camera_trigger
+
+    def init_audio(self):
+        """Open the mixer (deferred until after the first frame)
 
-        # Initialize audio player
-        from samplepi.audio import AudioPlayer
-        self.audio_player = AudioPlayer()
+        Also starts the background conversion of files that don't match
+        the output format.
+        """
+        if self._audio_player is not None:
+            return
+        with self.startup.stage("audio", deferred=True):
+            from samplepi.audio import create_audio_player, resample_pipeline
+            self._audio_player = create_audio_player()
+        self.startup.finish("audio")
+        resample_pipeline.scan_async([settings.TEST_WAVS_DIR, settings.SAMPLES_DIR], prune=True)
 
-        # Initialize GPIO (with mock mode for desktop)
-        self.rotary = RotaryEncoder()
-        self.camera_trigger = CameraTrigger()
-        self.touchscreen = TouchscreenButtons()
+    def init_gpio(self):
+        """Set up the encoder, buttons and camera trigger (background thread)
 
-        # Set up rotary encoder callbacks
-        self.rotary.on_rotate(self.handle_scroll)
-        self.rotary.on_press(self.handle_select)
+        Importing gpiozero and claiming pins is the slowest part of startup
+        on a Pi, so it runs while the StartScreen is already shown. Inputs
+        arrive through post_input, so callbacks may be attached from here.
+        """
+        try:
+            with self.startup.stage("gpio", deferred=True):
+                # Initialize GPIO (with mock mode for desktop)
+                from samplepi.gpio import RotaryEncoder, CameraTrigger
+                from samplepi.gpio.touchscreen import TouchscreenButtons
 
-        # Set up touchscreen callbacks
-        # Top button = Home (left), Middle button = Next (right), Bottom button = Back (middle)
-        self.touchscreen.on_left(lambda: self.handle_button("left"))
-        self.touchscreen.on_middle(lambda: self.handle_button("right"))
-        self.touchscreen.on_right(lambda: self.handle_button("middle"))
+                rotary = RotaryEncoder()
+                self._camera_trigger = CameraTrigger()
+                touchscreen = TouchscreenButtons()
 
-        # Start with home screen
-        self.state.goto_screen(StartScreen(self))
+                # Set up rotary encoder callbacks
+                rotary.on_rotate(lambda delta, velocity: self.post_input("scroll", (delta, velocity)))
+                rotary.on_press(lambda: self.post_input("select"))
+                rotary.on_long_press(lambda: self.post_input("jump", 1))
+
+                # Set up touchscreen callbacks
+                # Top button = Home (left), Middle button = Next (right), Bottom button = Back (middle)
+                touchscreen.on_left(lambda: self.post_input("button", "left"))
+                touchscreen.on_middle(lambda: self.post_input("button", "right"))
+                touchscreen.on_right(lambda: self.post_input("button", "middle"))
+
+                self.rotary = rotary
+                self.touchscreen = touchscreen
+        finally:
+            self._gpio_ready.set()
+            self.startup.finish("gpio")
+            # Let the main loop print the startup report
+            self._wakeup.set()
 
     def run(self):
         """Main application loop"""
         print("Starting main event loop...")
-        frame_count = 0
         while self.running:
-            self.handle_events()
+            self.step()
+
+        print("Exiting main loop, cleaning up...")
+        self.cleanup()
+
+    def step(self):
+        """One loop iteration: sleep until an event or deadline, then update/render as needed"""
+        # Deferred startup: audio right after the first frame is up
+        if self._audio_player is None:
+            self.init_audio()
+
+        now = time.monotonic()
+        events = self.wait_for_events(max(0.0, self.next_deadline(now) - now))
+
+        stats = self.frame_stats
+        stats.begin_frame(self.state.current_screen)
+        if events:
+            self.dispatch_events(events)
+            stats.lap("events")
+
+        screen = self.state.current_screen
+        now = time.monotonic()
+        if screen and screen.update_interval is not None and now >= self._next_update:
+            # Scheduled first: update() may stop the polling
+            self._next_update = now + screen.update_interval
             self.update()
+            stats.lap("update")
+
+        if self.show_frame_stats and now - self._overlay_updated >= settings.FRAME_STATS_OVERLAY_REFRESH:
+            self._overlay_updated = now
+            if screen:
+                screen.mark_dirty(self._overlay_rect)
+
+        if self.needs_render(now):
             self.render()
-            self.clock.tick(settings.FPS)
+            self._last_render = now
+            self.frame_count += 1
+            stats.end_frame()
 
-            # Print status every 60 frames (once per second at 60 FPS)
-            frame_count += 1
-            if frame_count % 60 == 0:
-                print(f"App running... (frame {frame_count})")
+        if stats.summary_due(now):
+            stats.print_summary()
 
-        print("Exiting main loop, cleaning up...")
-        self.cleanup()
+        self.startup.report_once()
+
+    def needs_render(self, now):
+        """Redraw only when the screen changed, reported damage or has a periodic redraw due"""
+        screen = self.state.current_screen
+        if screen is None:
+            return False
+        if now - self._last_render < 1.0 / settings.FPS:
+            return False
+        if screen is not self._presented_screen or screen.has_damage():
+            return True
+        return (screen.redraw_interval is not None and
+                now - self._last_render >= screen.redraw_interval)
+
+    def next_deadline(self, now):
+        """Monotonic time by which the loop has to wake up even without events"""
+        deadline = now + settings.IDLE_MAX_SLEEP
+        screen = self.state.current_screen
+        if screen is None:
+            return deadline
+        if screen.update_interval is not None:
+            deadline = min(deadline, self._next_update)
+        if screen is not self._presented_screen or screen.has_damage():
+            deadline = min(deadline, self._last_render + 1.0 / settings.FPS)
+        elif screen.redraw_interval is not None:
+            deadline = min(deadline, self._last_render + screen.redraw_interval)
+        if self.show_frame_stats:
+            deadline = min(deadline, self._overlay_updated + settings.FRAME_STATS_OVERLAY_REFRESH)
+        return deadline
 
-    def handle_events(self):
-        """Handle pygame events"""
-        for event in pygame.event.get():
+    def post_input(self, action, value=None):
+        """Queue an input from a GPIO callback thread for the main loop"""
+        pygame.event.post(pygame.event.Event(INPUT_EVENT, action=action, value=value))
+        self._wakeup.set()
+
+    def handle_events(self, timeout=0.0):
+        """Handle pygame events, waiting up to timeout seconds for the first one"""
+        self.dispatch_events(self.wait_for_events(timeout))
+
+    def wait_for_events(self, timeout=0.0):
+        """Return pending pygame events, waiting up to timeout seconds for the first one
+
+        SDL's own wait busy-polls on most video drivers, so sleep on a
+        threading.Event instead: GPIO input wakes it immediately, keyboard
+        input is picked up every EVENT_POLL_INTERVAL.
+        """
+        events = pygame.event.get()
+        deadline = time.monotonic() + timeout
+        while not events and self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._wakeup.wait(min(remaining, settings.EVENT_POLL_INTERVAL))
+            self._wakeup.clear()
+            events = pygame.event.get()
+        return events
+
+    def dispatch_events(self, events):
+        """Route pygame and GPIO input events to the current screen"""
+        for event in events:
             if event.type == pygame.QUIT:
                 print("Received QUIT event, shutting down...")
                 self.running = False
             elif event.type == pygame.KEYDOWN:
                 self.handle_keyboard(event.key)
+            elif event.type == INPUT_EVENT:
+                if event.action == "scroll":
+                    self.handle_scroll(*event.value)
+                elif event.action == "select":
+                    self.handle_select()
+                elif event.action == "jump":
+                    self.handle_jump(event.value)
+                elif event.action == "button":
+                    self.handle_button(event.value)
 
     def handle_keyboard(self, key):
         """Handle keyboard input (for testing on Mac)"""
@@ -99,23 +290,34 @@ class MediaPlayerApp:
             self.handle_scroll(1)
         elif key == pygame.K_RETURN or key == pygame.K_SPACE:
             self.handle_select()
+        elif key == pygame.K_PAGEDOWN:  # Page keys = letter jump (long press)
+            self.handle_jump(1)
+        elif key == pygame.K_PAGEUP:
+            self.handle_jump(-1)
         elif key == pygame.K_h:  # H = Home button (top button)
             self.handle_button("left")
         elif key == pygame.K_n:  # N = Next button (middle button)
             self.handle_button("right")
         elif key == pygame.K_b:  # B = Back button (bottom button)
             self.handle_button("middle")
+        elif key == pygame.K_o:  # O = frame time overlay
+            self.toggle_frame_stats()
 
-    def handle_scroll(self, direction):
+    def handle_scroll(self, direction, velocity=None):
         """Handle scroll input"""
         if self.state.current_screen:
-            self.state.current_screen.handle_scroll(direction)
+            self.state.current_screen.handle_scroll(direction, velocity)
 
     def handle_select(self):
         """Handle select/enter input"""
         if self.state.current_screen:
             self.state.current_screen.handle_select()
 
+    def handle_jump(self, direction):
+        """Handle letter jump input"""
+        if self.state.current_screen:
+            self.state.current_screen.handle_jump(direction)
+
     def handle_button(self, button):
         """Handle button press"""
         if self.state.current_screen:
@@ -127,16 +329,62 @@ class MediaPlayerApp:
             self.state.current_screen.update()
 
     def render(self):
-        """Render the current screen"""
+        """Render the current screen and flush only the damaged areas"""
+        screen = self.state.current_screen
+        damage = None
+        if screen:
+            screen.render()
+            damage = screen.consume_damage()
+            # A screen change always needs a full flush
+            if screen is not self._presented_screen:
+                damage = None
+            self._presented_screen = screen
+
+        if self.show_frame_stats:
+            self.draw_frame_stats()
+            if damage is not None:
+                damage.append(self._overlay_rect)
+        self.frame_stats.lap("render")
+
+        self.display.present(damage)
+        self.frame_stats.lap("flip")
+
+    def toggle_frame_stats(self):
+        """Show or hide the frame time overlay"""
+        self.show_frame_stats = not self.show_frame_stats
+        self._overlay_updated = 0.0
         if self.state.current_screen:
-            self.state.current_screen.render()
+            self.state.current_screen.mark_dirty()
+
+    def draw_frame_stats(self):
+        """Draw the live frame time percentiles in the top-left corner"""
+        # Rendered directly: the changing numbers would only churn the text cache
+        lines = [self.font_small.render(line, True, settings.COLOR_TEXT)
+                 for line in self.frame_stats.overlay_lines()]
+        line_height = self.font_small.get_linesize()
+        rect = pygame.Rect(0, 0, max(line.get_width() for line in lines) + 6,
+                           line_height * len(lines) + 4)
+        self.screen.fill((0, 0, 0), rect)
+        for i, line in enumerate(lines):
+            self.screen.blit(line, (3, 2 + i * line_height))
 
-        pygame.display.flip()
+        # Damage the old and new extent so a shrinking overlay is cleaned up
+        self._overlay_rect = rect if self._overlay_rect is None else rect.union(self._overlay_rect)
 
     def cleanup(self):
         """Clean up resources"""
-        self.rotary.cleanup()
-        self.camera_trigger.cleanup()
+        self._gpio_thread.join(timeout=5.0)
+        summary = self.trigger_latency.format_summary()
+        if summary:
+            print(summary)
+        if self._audio_player is not None:
+            from samplepi.audio import resample_pipeline
+            resample_pipeline.shutdown()
+        if self.rotary:
+            self.rotary.cleanup()
+        if self._camera_trigger:
+            self._camera_trigger.cleanup()
+        self.display.close()
         pygame.quit()
         sys.exit(0)
 
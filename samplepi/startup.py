@@ -0,0 +1,82 @@
+"""Startup timing trace"""
+
+import threading
+import time
+from contextlib import contextmanager
+from samplepi.config import settings
+
+
+class StartupTrace:
+    """Milliseconds spent in each startup stage
+
+    Stages run before the first frame count towards time to first frame;
+    deferred stages (GPIO, audio) are reported separately once they are
+    done. Times are relative to `origin` (a time.perf_counter() value
+    taken as early as possible, before the heavy imports).
+    """
+
+    def __init__(self, origin=None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.stages = []  # (name, ms, deferred)
+        self.first_frame_ms = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._reported = False
+
+    def mark(self, name, since=None, deferred=False):
+        """Record a stage that started at `since` (default: origin) and ended now"""
+        start = self.origin if since is None else since
+        with self._lock:
+            self.stages.append((name, (time.perf_counter() - start) * 1000, deferred))
+
+    @contextmanager
+    def stage(self, name, deferred=False):
+        """Time the body of a with block as a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, start, deferred)
+
+    def defer(self, name):
+        """Register a deferred stage that still has to run"""
+        with self._lock:
+            self._pending.add(name)
+
+    def finish(self, name):
+        """Mark a deferred stage as complete"""
+        with self._lock:
+            self._pending.discard(name)
+
+    def first_frame(self):
+        """Record that the first frame is on screen"""
+        if self.first_frame_ms is None:
+            self.first_frame_ms = (time.perf_counter() - self.origin) * 1000
+
+    def is_complete(self):
+        """Check if the first frame is up and every deferred stage finished"""
+        with self._lock:
+            return self.first_frame_ms is not None and not self._pending
+
+    def report_once(self):
+        """Print the report the first time everything is complete"""
+        if self._reported or not self.is_complete():
+            return False
+        self._reported = True
+        print(self.format_report())
+        return True
+
+    def format_report(self):
+        """Per-stage milliseconds and time to first frame against the target"""
+        lines = ["Startup trace:"]
+        with self._lock:
+            stages = list(self.stages)
+        for name, ms, deferred in stages:
+            suffix = " (after first frame)" if deferred else ""
+            lines.append(f"  {name:14s} {ms:8.1f} ms{suffix}")
+        if self.first_frame_ms is not None:
+            target = settings.STARTUP_TARGET_MS
+            verdict = "OK" if self.first_frame_ms <= target else "OVER TARGET"
+            lines.append(f"  first frame    {self.first_frame_ms:8.1f} ms "
+                         f"(target {target:.0f} ms, {verdict})")
+        return "\n".join(lines)
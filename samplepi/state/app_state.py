@@ -1,12 +1,14 @@
 """Application state manager"""
 
+from collections import deque
+from samplepi.config import settings
 
 class AppState:
     """Manages application state and screen transitions"""
 
     def __init__(self):
         self.current_screen = None
-        self.screen_history = []
+        self.screen_history = deque(maxlen=settings.SCREEN_HISTORY_LIMIT)
 
         # User selections
         self.selected_test_wavs = []
@@ -18,8 +20,18 @@ class AppState:
         self.is_paused = False
 
     def goto_screen(self, screen):
-        """Navigate to a new screen"""
-        if self.current_screen:
+        """Navigate to a screen
+
+        Screens are reused (see ScreenRegistry), so going to one that is
+        already in the history (e.g. "Play Again") unwinds back to it
+        instead of stacking it a second time.
+        """
+        if screen is self.current_screen:
+            return
+        if screen in self.screen_history:
+            while self.screen_history.pop() is not screen:
+                pass
+        elif self.current_screen:
             self.screen_history.append(self.current_screen)
         self.current_screen = screen
 
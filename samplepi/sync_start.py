@@ -0,0 +1,53 @@
+"""Synchronized start of playback and the camera trigger"""
+
+import time
+from samplepi.config import settings
+
+_warned_unobserved = False
+
+
+class SynchronizedStart:
+    """Starts a player and a trigger pulse a fixed time apart
+
+    offset_ms (default CAMERA_START_OFFSET_MS) is the time from the pulse's
+    rising edge to the first audio sample reaching the output; negative
+    starts the audio first. arm() gets the player ready to start without
+    delay (first track decoded or mapped, device open). release() picks
+    both times at least SYNC_START_LEAD_MS (and two audio buffers) ahead,
+    queues the pulse on the trigger's timing thread and starts the player
+    with that start time; the player plays the wait as silence, so the
+    audio side is aligned to the sample rather than to when a thread
+    wakes up. That needs a player that observes its start (the mmap
+    engine); with the mixer engine the audio can start up to one buffer
+    late, which is warned about once.
+    """
+
+    def __init__(self, player, trigger, offset_ms=None):
+        self.player = player
+        self.trigger = trigger
+        self.offset_ms = settings.CAMERA_START_OFFSET_MS if offset_ms is None else offset_ms
+        global _warned_unobserved
+        if not player.start_observed and not _warned_unobserved:
+            _warned_unobserved = True
+            print("Warning: the mixer engine can't observe its start, the audio may follow the trigger "
+                  "by up to one audio buffer; set AUDIO_ENGINE = \"mmap\" for sample-accurate sync")
+        self.pulse = None
+        self.audio_time = None  # monotonic time the first sample is due at the output
+
+    def arm(self):
+        """Prepare the player; returns False if it has nothing to play"""
+        return self.player.prepare()
+
+    def release(self):
+        """Schedule the pulse and start the player, returns the Pulse"""
+        lead = max(settings.SYNC_START_LEAD_MS / 1000.0, 2 * self.player.output_latency)
+        base = time.monotonic() + lead
+        offset = self.offset_ms / 1000.0
+        self.audio_time = base + max(0.0, offset)
+        self.pulse = self.trigger.send_pulse(base + max(0.0, -offset))
+        self.player.play(start_at=self.audio_time)
+        return self.pulse
+
+    def pending(self):
+        """Check if the audio is still in its lead-in silence"""
+        return self.audio_time is not None and time.monotonic() < self.audio_time
@@ -0,0 +1,125 @@
+"""Camera trigger to audio start offsets: per-pulse measurements and a histogram"""
+
+from collections import namedtuple
+from samplepi.frame_stats import FrameHistogram
+
+
+class TriggerMeasurement(namedtuple('TriggerMeasurement', [
+        'pulse_time', 'audio_time', 'output_latency', 'position_frames', 'sample_rate', 'target_ms',
+        'measured'])):
+    """One pulse, timed on the monotonic clock
+
+    pulse_time is the trigger's rising edge, audio_time the moment the
+    first sample of the playback reaches the output (its start plus
+    output_latency, the audio buffer in seconds). position_frames is the
+    playlist frame reaching the output at the edge (the players' clocks
+    count frames handed over, so they are read output_latency earlier).
+    target_ms is the offset the start was scheduled for. measured is False
+    when the player only knows when its start was scheduled (the mixer
+    engine); the offset is then an estimate.
+    """
+
+    __slots__ = ()
+
+    @property
+    def offset_ms(self):
+        """Audio start minus trigger edge (positive: the audio starts after the pulse)"""
+        return (self.audio_time - self.pulse_time) * 1000
+
+    @property
+    def error_ms(self):
+        """Achieved minus target offset"""
+        return self.offset_ms - self.target_ms
+
+
+class TriggerLatency:
+    """Offsets between camera trigger pulses and audio starts over the app run
+
+    record() is called with a Pulse as soon as it was scheduled. Neither
+    its rising edge (fired by the trigger's timing thread) nor the audio
+    start (the mmap engine only learns it in its first device callback)
+    may be known yet, so the measurement is completed by poll().
+    The histogram holds how far each offset was from its target (with a
+    target of 0, how far apart the two events were); the signed extremes
+    of the offset are kept next to it. Estimates from players that don't
+    observe their start are counted but kept out of both. Each
+    measurement is printed as it completes.
+    """
+
+    def __init__(self):
+        self.histogram = FrameHistogram()
+        self.last = None
+        self.min_ms = None
+        self.max_ms = None
+        self.estimates = 0
+        self._pending = None  # (Pulse, player, target_ms)
+
+    @property
+    def count(self):
+        return self.histogram.count
+
+    def record(self, pulse, player, target_ms=0.0):
+        """Measure a Pulse against player's current playback (returns the measurement once complete)"""
+        self._pending = (pulse, player, target_ms)
+        return self.poll()
+
+    def poll(self):
+        """Complete the pending measurement once the rising edge happened and the audio started"""
+        if self._pending is None:
+            return None
+        pulse, player, target_ms = self._pending
+        pulse_time = pulse.rising_time
+        audio_time = player.first_sample_time()
+        if pulse_time is None or audio_time is None:
+            return None
+        self._pending = None
+        position = player.get_position(pulse_time - player.output_latency)[1]
+
+        measurement = TriggerMeasurement(pulse_time, audio_time, player.output_latency,
+                                         position, player.sample_rate, target_ms, player.start_observed)
+        offset = measurement.offset_ms
+        self.last = measurement
+        if not measurement.measured:
+            self.estimates += 1
+            print(f"Trigger latency: audio scheduled {offset:+.1f} ms from the pulse, target {target_ms:+.1f} ms "
+                  f"(not measured: the mixer engine doesn't observe its start)")
+            return measurement
+        self.histogram.add(abs(measurement.error_ms))
+        self.min_ms = offset if self.min_ms is None else min(self.min_ms, offset)
+        self.max_ms = offset if self.max_ms is None else max(self.max_ms, offset)
+        print(f"Trigger latency: audio {offset:+.1f} ms from the pulse, target {target_ms:+.1f} ms, "
+              f"error {measurement.error_ms:+.1f} ms (frame {position} at the edge, "
+              f"output latency {measurement.output_latency * 1000:.1f} ms)")
+        return measurement
+
+    def finish(self):
+        """Last poll for a playback that is over; an unfinished measurement is dropped"""
+        measurement = self.poll()
+        self._pending = None
+        return measurement
+
+    def get_stats(self):
+        """Count, percentiles of the error magnitude, and signed offset min/max/last in milliseconds
+
+        last_offset_ms is from the last measurement only; estimates are counted.
+        """
+        stats = self.histogram.get_stats()
+        stats['estimates'] = self.estimates
+        last = self.last if self.last is not None and self.last.measured else None
+        stats['min_offset_ms'] = self.min_ms
+        stats['max_offset_ms'] = self.max_ms
+        stats['last_offset_ms'] = last.offset_ms if last is not None else None
+        stats['last_target_ms'] = last.target_ms if last is not None else None
+        return stats
+
+    def format_summary(self):
+        """One line for the logs (None before the first measurement)"""
+        if not self.count:
+            if self.estimates:
+                return (f"Trigger latency not measured over {self.estimates} pulses "
+                        f"(the mixer engine doesn't observe its start)")
+            return None
+        stats = self.histogram.get_stats()
+        return (f"Trigger latency over {stats['count']} pulses: |error| p50 {stats['p50_ms']:.1f} "
+                f"p95 {stats['p95_ms']:.1f} max {stats['max_ms']:.1f} ms, "
+                f"offset range {self.min_ms:+.1f} to {self.max_ms:+.1f} ms")
@@ -1,3 +1,7 @@
 """UI components and screens"""
 from .screen import Screen
+from .screen_registry import ScreenRegistry
+from .list_model import ListModel
 from .menu_list import MenuList
+from .list_renderer import IncrementalListRenderer
+from .text_cache import TextCache, text_cache, render_text
@@ -0,0 +1,69 @@
+"""Virtualized list model for menus"""
+
+from bisect import bisect_right
+
+
+def jump_key(item):
+    """First-letter group of an item ('#' for anything not starting with a letter)"""
+    text = str(item)
+    first = text[:1].upper()
+    return first if first.isalpha() else "#"
+
+
+class ListModel:
+    """Indexable sequence of menu items with an optional first-letter jump index
+
+    Menus only ever touch the rows in the visible window, so rendering and
+    scrolling cost the same for 5 or 50,000 items. The jump index (start
+    of every first-letter group) is built once when the list is loaded;
+    items are expected to be sorted case-insensitively for it to be useful.
+    """
+
+    def __init__(self, items, jump_index=False):
+        self.items = items
+        self.group_starts = None
+        if jump_index:
+            self.build_jump_index()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def window(self, start, count):
+        """Items start..start+count (the visible rows)"""
+        return self.items[start:start + count]
+
+    def build_jump_index(self):
+        """Record the index where each first-letter group starts"""
+        starts = []
+        previous = None
+        for i, item in enumerate(self.items):
+            key = jump_key(item)
+            if key != previous:
+                starts.append(i)
+                previous = key
+        self.group_starts = starts
+
+    def has_jump_index(self):
+        """Check if letter jumps are available"""
+        return bool(self.group_starts)
+
+    def jump(self, index, direction):
+        """Index of the first item of the next (1) or previous (-1) letter group
+
+        Jumping back from inside a group lands on its first item. Wraps
+        around at both ends.
+        """
+        if not self.group_starts:
+            return index
+        group = bisect_right(self.group_starts, index) - 1
+        if direction > 0:
+            group = (group + 1) % len(self.group_starts)
+        elif self.group_starts[group] == index:
+            group = (group - 1) % len(self.group_starts)
+        return self.group_starts[group]
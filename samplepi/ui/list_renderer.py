@@ -0,0 +1,136 @@
+"""Incremental row-strip renderer for menu lists"""
+
+import pygame
+from samplepi.config import settings
+
+
+class IncrementalListRenderer:
+    """Keeps the visible rows of a MenuList rendered in a strip surface
+
+    When the window scrolls, already rendered rows are shifted with
+    Surface.scroll and only the newly exposed rows are drawn. When the
+    highlight moves inside the window, only the old and new highlighted
+    rows are redrawn. Row backgrounds are copied from the screen's static
+    layer, so the strip can be blitted opaque; if that background doesn't
+    repeat row by row, scrolling redraws all rows instead of shifting.
+
+    draw_row(surface, item, is_selected, x_offset, y) draws one row into
+    the strip; y is the row's text baseline in strip coordinates (the
+    slot starts 5px above it) and x_offset must be subtracted from
+    screen x coordinates.
+    """
+
+    def __init__(self, menu, rect, draw_row):
+        self.menu = menu
+        self.rect = pygame.Rect(rect)
+        self.draw_row = draw_row
+
+        self._strip = None
+        self._area = None
+        self._scrollable = True
+        self._start = None
+        self._selected = None
+        self._dirty = set()
+        self._background_key = None
+
+        # Rows rasterized since creation (vs. visible_items per frame without the strip)
+        self.rows_drawn = 0
+
+    def invalidate(self, index=None):
+        """Force a redraw of one item's row, or of every row (index=None)"""
+        if index is None:
+            self._start = None
+        elif self._start is not None and 0 <= index - self._start < self.menu.visible_items:
+            self._dirty.add(index - self._start)
+
+    def render(self, screen, background=None, background_version=0):
+        """Bring the strip up to date and blit it to screen
+
+        background is the surface the rows sit on (normally the screen's
+        static layer); pass a new background_version whenever it changes.
+        Only the part of the list inside the screen's clip area is kept.
+        """
+        menu = self.menu
+        visible = menu.visible_items
+        height = menu.item_height
+
+        area = self.rect.clip(screen.get_clip())
+        background_key = (id(background), background_version)
+        if area != self._area or background_key != self._background_key:
+            if self._strip is None or self._strip.get_size() != area.size:
+                self._strip = pygame.Surface(area.size, 0, screen)
+            self._area = area
+            self._background_key = background_key
+            self._scrollable = self._is_periodic(background, area, height)
+            self._start = None
+
+        start, end = menu.get_visible_range()
+        selected = menu.selected_index
+
+        if self._start is None:
+            dirty = set(range(visible))
+        else:
+            dirty = self._dirty
+            shift = start - self._start
+            if shift and (abs(shift) >= visible or not self._scrollable):
+                dirty = set(range(visible))
+            elif shift:
+                # Move the rows still on screen, then draw the rest; rows
+                # that were only partly inside the strip can't be reused
+                self._strip.scroll(0, -shift * height)
+                kept = {slot for slot in range(visible)
+                        if self._slot_inside(slot + shift) and slot + shift not in dirty}
+                dirty = set(range(visible)) - kept
+            if selected != self._selected:
+                for index in (self._selected, selected):
+                    if 0 <= index - start < visible:
+                        dirty.add(index - start)
+
+        for slot in dirty:
+            self._draw_slot(slot, start, end, selected, background)
+
+        self._start = start
+        self._selected = selected
+        self._dirty = set()
+
+        screen.blit(self._strip, area.topleft)
+
+    def _slot_rect(self, slot):
+        """Rect of a row slot in strip coordinates"""
+        height = self.menu.item_height
+        return pygame.Rect(0, self.rect.y - self._area.y + slot * height, self._area.width, height)
+
+    def _slot_inside(self, slot):
+        """Check if a row slot lies completely inside the strip"""
+        return (0 <= slot < self.menu.visible_items and
+                self._strip.get_rect().contains(self._slot_rect(slot)))
+
+    @staticmethod
+    def _is_periodic(background, area, height):
+        """Check if the background repeats every row, so rows can be shifted with their background"""
+        if background is None or area.height <= height:
+            return True
+        span = area.height - height
+        upper = background.subsurface((area.x, area.y, area.width, span))
+        lower = background.subsurface((area.x, area.y + height, area.width, span))
+        return pygame.image.tostring(upper, 'RGB') == pygame.image.tostring(lower, 'RGB')
+
+    def _draw_slot(self, slot, start, end, selected, background):
+        """Redraw one row slot of the strip"""
+        area = self._area
+        slot_rect = self._slot_rect(slot)
+        if not slot_rect.colliderect(self._strip.get_rect()):
+            return
+
+        if background is not None:
+            self._strip.blit(background, slot_rect, slot_rect.move(area.topleft))
+        else:
+            self._strip.fill(settings.COLOR_BACKGROUND, slot_rect)
+
+        index = start + slot
+        if index < end:
+            self._strip.set_clip(slot_rect)
+            self.draw_row(self._strip, self.menu.items[index], index == selected,
+                          area.x, slot_rect.y + 5)
+            self._strip.set_clip(None)
+            self.rows_drawn += 1
@@ -2,23 +2,67 @@
 
 import pygame
 from samplepi.config import settings
+from samplepi.ui.list_model import ListModel
+from samplepi.ui.list_renderer import IncrementalListRenderer
+from samplepi.ui.text_cache import render_text
+
+
+def acceleration_gain(velocity):
+    """Rows moved per encoder detent at the given rotation velocity (detents/s)"""
+    if not velocity or velocity <= settings.ROTARY_ACCEL_THRESHOLD:
+        return 1
+    gain = int((velocity / settings.ROTARY_ACCEL_THRESHOLD) ** 2)
+    return max(1, min(settings.ROTARY_ACCEL_MAX_GAIN, gain))
 
 
 class MenuList:
-    """Scrollable list of menu items with selection"""
+    """Scrollable list of menu items with selection
+
+    items may be a plain list or a ListModel; with jump_index=True, spins
+    faster than MENU_JUMP_VELOCITY jump between first-letter groups.
+    """
 
-    def __init__(self, items, y_start=80, item_height=40):
-        self.items = items
+    def __init__(self, items, y_start=80, item_height=40, jump_index=False):
+        self.items = items if isinstance(items, ListModel) else ListModel(items, jump_index)
         self.selected_index = 0
         self.y_start = y_start
         self.item_height = item_height
         self.visible_items = 5
 
-    def scroll(self, direction):
-        """Scroll selection (1 = down, -1 = up)"""
-        self.selected_index += direction
+        # Rows are kept in a strip and redrawn incrementally
+        self._renderer = None
+        self._font = None
+
+    def scroll(self, direction, velocity=None):
+        """Scroll selection by direction steps (positive = down, negative = up)
+
+        velocity is the rotary encoder speed in detents/s; fast spins move
+        several rows per detent (see acceleration_gain).
+        """
+        if not direction:
+            return
+        if (velocity is not None and velocity >= settings.MENU_JUMP_VELOCITY
+                and self.items.has_jump_index()):
+            self.jump(1 if direction > 0 else -1)
+            return
+
+        self.selected_index += direction * acceleration_gain(velocity)
         self.selected_index = max(0, min(len(self.items) - 1, self.selected_index))
 
+    def jump(self, direction):
+        """Move selection to the next (1) or previous (-1) first-letter group"""
+        self.selected_index = self.items.jump(self.selected_index, direction)
+
+    def get_visible_range(self):
+        """(start, end) indices of the rows currently on screen"""
+        start_idx = max(0, self.selected_index - self.visible_items // 2)
+        end_idx = min(len(self.items), start_idx + self.visible_items)
+
+        # Adjust if at end of list
+        if end_idx - start_idx < self.visible_items:
+            start_idx = max(0, end_idx - self.visible_items)
+        return start_idx, end_idx
+
     def get_selected(self):
         """Get currently selected item"""
         if 0 <= self.selected_index < len(self.items):
@@ -29,39 +73,44 @@ class MenuList:
         """Get selected index"""
         return self.selected_index
 
-    def render(self, screen, font):
-        """Render the menu list"""
-        # Calculate visible range
-        start_idx = max(0, self.selected_index - self.visible_items // 2)
-        end_idx = min(len(self.items), start_idx + self.visible_items)
+    def get_rect(self):
+        """Area covered by render (rows and scroll indicator)"""
+        return pygame.Rect(0, self.y_start - 5, settings.DISPLAY_WIDTH,
+                           self.visible_items * self.item_height + 5)
 
-        # Adjust if at end of list
-        if end_idx - start_idx < self.visible_items:
-            start_idx = max(0, end_idx - self.visible_items)
-
-        # Draw items
-        y = self.y_start
-        for i in range(start_idx, end_idx):
-            item = self.items[i]
-            is_selected = (i == self.selected_index)
-
-            # Draw selection background
-            if is_selected:
-                rect = pygame.Rect(40, y - 5, settings.DISPLAY_WIDTH - 80, self.item_height)
-                pygame.draw.rect(screen, settings.COLOR_BUTTON_ACTIVE, rect)
-                pygame.draw.rect(screen, settings.COLOR_HIGHLIGHT, rect, 2)
+    def render(self, screen, font, background=None, background_version=0):
+        """Render the menu list
 
-            # Draw item text
-            color = settings.COLOR_HIGHLIGHT if is_selected else settings.COLOR_TEXT
-            text = font.render(str(item), True, color)
-            text_rect = text.get_rect(left=60, centery=y + self.item_height // 2 - 5)
-            screen.blit(text, text_rect)
+        background is the surface behind the rows (the screen's static
+        layer); see IncrementalListRenderer.
+        """
+        if self._renderer is None:
+            rect = pygame.Rect(0, self.y_start - 5, settings.DISPLAY_WIDTH,
+                               self.visible_items * self.item_height)
+            self._renderer = IncrementalListRenderer(self, rect, self.draw_row)
+        if font is not self._font:
+            self._font = font
+            self._renderer.invalidate()
 
-            y += self.item_height
+        self._renderer.render(screen, background, background_version)
 
         # Draw scroll indicator if needed
         if len(self.items) > self.visible_items:
             indicator_text = f"{self.selected_index + 1}/{len(self.items)}"
-            indicator = font.render(indicator_text, True, settings.COLOR_TEXT)
+            indicator = render_text(font, indicator_text, True, settings.COLOR_TEXT)
             indicator_rect = indicator.get_rect(right=settings.DISPLAY_WIDTH - 20, top=self.y_start)
             screen.blit(indicator, indicator_rect)
+
+    def draw_row(self, surface, item, is_selected, x_offset, y):
+        """Draw one row (see IncrementalListRenderer)"""
+        # Draw selection background
+        if is_selected:
+            rect = pygame.Rect(40 - x_offset, y - 5, settings.DISPLAY_WIDTH - 80, self.item_height)
+            pygame.draw.rect(surface, settings.COLOR_BUTTON_ACTIVE, rect)
+            pygame.draw.rect(surface, settings.COLOR_HIGHLIGHT, rect, 2)
+
+        # Draw item text
+        color = settings.COLOR_HIGHLIGHT if is_selected else settings.COLOR_TEXT
+        text = render_text(self._font, str(item), True, color)
+        text_rect = text.get_rect(left=60 - x_offset, centery=y + self.item_height // 2 - 5)
+        surface.blit(text, text_rect)
@@ -2,11 +2,17 @@
 
 import pygame
 from samplepi.config import settings
+from samplepi.ui.text_cache import render_text
 
 
 class Screen:
     """Base class for all screens in the application"""
 
+    # Seconds between update() polls while shown (None = no polling needed)
+    update_interval = None
+    # Seconds between redraws for time-based content (None = only when damaged)
+    redraw_interval = None
+
     def __init__(self, app):
         self.app = app
         self.screen = app.screen
@@ -14,6 +20,14 @@ class Screen:
         self.font_medium = app.font_medium
         self.font_small = app.font_small
 
+        # Areas changed since the last presented frame (None = whole screen)
+        self._damage = None
+
+        # Retained layer holding the static chrome, see draw_static_layer
+        self._static_layer = None
+        self._static_key = None
+        self.static_version = 0
+
     def handle_input(self, event):
         """Handle input events (keyboard, mouse, etc.)"""
         pass
@@ -22,14 +36,22 @@ class Screen:
         """Handle button press (left/middle/right)"""
         pass
 
-    def handle_scroll(self, direction):
-        """Handle scroll input (1 = down, -1 = up)"""
+    def handle_scroll(self, direction, velocity=None):
+        """Handle scroll input (steps, positive = down; velocity in detents/s if known)"""
         pass
 
     def handle_select(self):
         """Handle select/enter input"""
         pass
 
+    def handle_jump(self, direction):
+        """Handle letter jump input (long press / page keys)"""
+        pass
+
+    def on_enter(self):
+        """Start a new visit: called by ScreenRegistry when the screen is reused"""
+        self.mark_dirty()
+
     def update(self):
         """Update screen state"""
         pass
@@ -38,9 +60,62 @@ class Screen:
         """Render the screen"""
         pass
 
+    def static_key(self):
+        """Inputs of draw_static; the static layer is rebuilt when this changes"""
+        return None
+
+    def draw_static(self):
+        """Draw the content that doesn't change from frame to frame"""
+        self.screen.fill(settings.COLOR_BACKGROUND)
+
+    def draw_static_layer(self):
+        """Blit the cached static layer, rebuilding it only when static_key() changed"""
+        key = self.static_key()
+        if self._static_layer is None or key != self._static_key:
+            if self._static_layer is None:
+                self._static_layer = pygame.Surface(self.screen.get_size(), 0, self.screen)
+
+            # Point the draw helpers at the layer while it is composed
+            target = self.screen
+            self.screen = self._static_layer
+            try:
+                self.draw_static()
+            finally:
+                self.screen = target
+            self._static_key = key
+            self.static_version += 1
+
+        self.screen.blit(self._static_layer, (0, 0))
+
+    def mark_dirty(self, rect=None):
+        """Report a changed area so the display backend can flush it (None = whole screen)"""
+        if rect is None:
+            self._damage = None
+        elif self._damage is not None:
+            self._damage.append(pygame.Rect(rect))
+
+    def has_damage(self):
+        """Check if anything changed since the last presented frame"""
+        return self._damage is None or bool(self._damage)
+
+    def consume_damage(self):
+        """Return the damaged rects since the last call (None = whole screen)"""
+        damage = self._damage
+        self._damage = []
+        return damage
+
+    def get_button_bar_rect(self):
+        """Area covered by draw_buttons"""
+        button_y = settings.DISPLAY_HEIGHT - settings.BUTTON_HEIGHT
+        return pygame.Rect(0, button_y, settings.DISPLAY_WIDTH, settings.BUTTON_HEIGHT)
+
+    def get_content_rect(self):
+        """Area above the button bar, where dynamic content may draw"""
+        return pygame.Rect(0, 0, settings.DISPLAY_WIDTH, settings.DISPLAY_HEIGHT - settings.BUTTON_HEIGHT)
+
     def draw_title(self, text, y=30):
         """Draw centered title text"""
-        title = self.font_large.render(text, True, settings.COLOR_TEXT)
+        title = render_text(self.font_large, text, True, settings.COLOR_TEXT)
         title_rect = title.get_rect(center=(settings.DISPLAY_WIDTH // 2, y))
         self.screen.blit(title, title_rect)
 
@@ -51,7 +126,7 @@ class Screen:
         if color is None:
             color = settings.COLOR_TEXT
 
-        text_surface = font.render(text, True, color)
+        text_surface = render_text(font, text, True, color)
         text_rect = text_surface.get_rect(center=(settings.DISPLAY_WIDTH // 2, y))
         self.screen.blit(text_surface, text_rect)
 
@@ -72,6 +147,6 @@ class Screen:
             pygame.draw.rect(self.screen, settings.COLOR_TEXT, button_rect, 2)
 
             # Draw button label
-            text = self.font_medium.render(label, True, settings.COLOR_TEXT)
+            text = render_text(self.font_medium, label, True, settings.COLOR_TEXT)
             text_rect = text.get_rect(center=(x + button_width // 2, button_y + settings.BUTTON_HEIGHT // 2))
             self.screen.blit(text, text_rect)
@@ -0,0 +1,41 @@
+"""Registry of reusable screen instances"""
+
+
+class ScreenRegistry:
+    """Hands out one instance per (screen class, arguments)
+
+    Screens keep their surfaces, fonts and lists across visits instead of
+    being rebuilt on every navigation. A reused screen has on_enter() called
+    so it starts from the same state a fresh instance would.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._screens = {}
+        self.created = 0
+        self.reused = 0
+
+    def get(self, screen_class, *args):
+        """Return the screen for screen_class(app, *args), reset for a new visit"""
+        key = (screen_class, args)
+        screen = self._screens.get(key)
+        if screen is None:
+            screen = screen_class(self.app, *args)
+            self._screens[key] = screen
+            self.created += 1
+        else:
+            screen.on_enter()
+            self.reused += 1
+        return screen
+
+    def clear(self):
+        """Drop all instances (they are rebuilt on next use)"""
+        self._screens.clear()
+
+    def get_stats(self):
+        """Get instance counts"""
+        return {
+            'screens': len(self._screens),
+            'created': self.created,
+            'reused': self.reused,
+        }
@@ -1,7 +1,25 @@
-"""Screen implementations"""
-from .start_screen import StartScreen
-from .file_selection_screen import FileSelectionScreen
-from .recording_toggle_screen import RecordingToggleScreen
-from .confirm_screen import ConfirmScreen
-from .playback_screen import PlaybackScreen
-from .complete_screen import CompleteScreen
+"""Screen implementations
+
+Screen modules are imported on first access, so startup only loads the
+StartScreen before the first frame.
+"""
+import importlib
+
+_MODULES = {
+    "StartScreen": ".start_screen",
+    "FileSelectionScreen": ".file_selection_screen",
+    "RecordingToggleScreen": ".recording_toggle_screen",
+    "ConfirmScreen": ".confirm_screen",
+    "PlaybackScreen": ".playback_screen",
+    "CompleteScreen": ".complete_screen",
+}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    screen_class = getattr(importlib.import_module(_MODULES[name], __name__), name)
+    globals()[name] = screen_class
+    return screen_class
@@ -13,9 +13,15 @@ class CompleteScreen(Screen):
         super().__init__(app)
         self.menu = MenuList(["Play Again", "Return to Home"])
 
-    def handle_scroll(self, direction):
+    def on_enter(self):
+        """Start a new visit with the first item selected"""
+        super().on_enter()
+        self.menu.selected_index = 0
+
+    def handle_scroll(self, direction, velocity=None):
         """Handle scroll input"""
-        self.menu.scroll(direction)
+        self.menu.scroll(direction, velocity)
+        self.mark_dirty(self.menu.get_rect())
 
     def handle_select(self):
         """Handle select input"""
@@ -23,32 +29,51 @@ class CompleteScreen(Screen):
         if selected == "Play Again":
             # Go back to playback with same settings
             from .playback_screen import PlaybackScreen
-            self.app.state.goto_screen(PlaybackScreen(self.app))
+            self.app.state.goto_screen(self.app.screens.get(PlaybackScreen))
         elif selected == "Return to Home":
             from .start_screen import StartScreen
             self.app.state.go_home()
-            self.app.state.goto_screen(StartScreen(self.app))
+            self.app.state.goto_screen(self.app.screens.get(StartScreen))
 
     def handle_button(self, button):
         """Handle button press"""
         if button == "left":  # Home
             from .start_screen import StartScreen
             self.app.state.go_home()
-            self.app.state.goto_screen(StartScreen(self.app))
+            self.app.state.goto_screen(self.app.screens.get(StartScreen))
         elif button == "middle":  # Home (same as left)
             from .start_screen import StartScreen
             self.app.state.go_home()
-            self.app.state.goto_screen(StartScreen(self.app))
+            self.app.state.goto_screen(self.app.screens.get(StartScreen))
         elif button == "right":  # Select
             self.handle_select()
 
-    def render(self):
-        """Render the screen"""
+    def static_key(self):
+        """The latency line changes with each trigger pulse"""
+        latency = self.app.trigger_latency
+        return (self.app.state.record_video, latency.count, latency.estimates)
+
+    def draw_static(self):
+        """Draw background, title, message, trigger latency and buttons"""
         self.screen.fill(settings.COLOR_BACKGROUND)
         self.draw_title("Playback Complete")
 
         self.draw_text("Session finished successfully", 70, self.font_medium, settings.COLOR_HIGHLIGHT)
 
-        self.menu.render(self.screen, self.font_medium)
+        latency = self.app.trigger_latency
+        if self.app.state.record_video and latency.last is not None and not latency.last.measured:
+            self.draw_text("Trigger offset not measured (mixer engine)", 170, self.font_small)
+        elif self.app.state.record_video and latency.last is not None:
+            stats = latency.histogram.get_stats()
+            self.draw_text(f"Audio {latency.last.offset_ms:+.1f} ms from trigger, "
+                           f"target {latency.last.target_ms:+.0f} (p95 err {stats['p95_ms']:.1f})",
+                           170, self.font_small)
 
         self.draw_buttons(["Home", None, "Select"])
+
+    def render(self):
+        """Render the screen"""
+        self.draw_static_layer()
+        self.screen.set_clip(self.get_content_rect())
+        self.menu.render(self.screen, self.font_medium, self._static_layer, self.static_version)
+        self.screen.set_clip(None)
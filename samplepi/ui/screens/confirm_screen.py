@@ -1,13 +1,28 @@
 """Confirmation screen before starting playback"""
 
+import os
 import pygame
 from samplepi.ui.screen import Screen
 from samplepi.config import settings
+from samplepi.ui.text_cache import render_text
+from samplepi.audio.metadata import wav_index
+
+
+def format_duration(seconds):
+    """m:ss, or h:mm:ss from an hour up"""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
 
 
 class ConfirmScreen(Screen):
     """Screen showing summary and ready to start"""
 
+    # The metadata index refresh can finish after the summary was drawn
+    update_interval = 0.5
+
     def __init__(self, app):
         super().__init__(app)
 
@@ -20,7 +35,7 @@ class ConfirmScreen(Screen):
         if button == "left":  # Home
             from .start_screen import StartScreen
             self.app.state.go_home()
-            self.app.state.goto_screen(StartScreen(self.app))
+            self.app.state.goto_screen(self.app.screens.get(StartScreen))
         elif button == "middle":  # Back
             self.app.state.go_back()
         elif button == "right":  # Start
@@ -29,10 +44,39 @@ class ConfirmScreen(Screen):
     def start_playback(self):
         """Start playback and go to playback screen"""
         from .playback_screen import PlaybackScreen
-        self.app.state.goto_screen(PlaybackScreen(self.app))
+        self.app.state.goto_screen(self.app.screens.get(PlaybackScreen))
+
+    def update(self):
+        """Redraw once the durations in the metadata index changed"""
+        if self._static_key is not None and self._static_key[-1] != wav_index.revision:
+            self.mark_dirty()
+
+    def static_key(self):
+        """Everything on this screen derives from the selections and the metadata index"""
+        state = self.app.state
+        return (tuple(state.selected_test_wavs), tuple(state.selected_samples), state.record_video,
+                wav_index.revision)
+
+    def summarize(self, directory, names):
+        """(total seconds, unplayable count) of the selected files, from the metadata index"""
+        seconds = 0.0
+        unplayable = 0
+        for name in names:
+            info = wav_index.lookup(os.path.join(directory, name))
+            if info is None:
+                continue
+            if info.playable:
+                seconds += info.seconds
+            else:
+                unplayable += 1
+        return seconds, unplayable
 
     def render(self):
         """Render the screen"""
+        self.draw_static_layer()
+
+    def draw_static(self):
+        """Draw the summary, which only changes with the selections"""
         self.screen.fill(settings.COLOR_BACKGROUND)
         self.draw_title("Ready to Start")
 
@@ -43,21 +87,30 @@ class ConfirmScreen(Screen):
 
         y = 85
 
+        wavs_seconds, wavs_unplayable = self.summarize(settings.TEST_WAVS_DIR, self.app.state.selected_test_wavs)
+        samples_seconds, samples_unplayable = self.summarize(settings.SAMPLES_DIR, self.app.state.selected_samples)
+
         # Total counts - more prominent
         total_files = len(self.app.state.selected_test_wavs) + len(self.app.state.selected_samples)
-        self.draw_text(f"Total Files: {total_files}", y, self.font_medium, settings.COLOR_HIGHLIGHT)
+        unplayable = wavs_unplayable + samples_unplayable
+        if unplayable:
+            self.draw_text(f"Total Files: {total_files} ({unplayable} unplayable)", y,
+                           self.font_medium, (255, 120, 100))
+        else:
+            self.draw_text(f"Total Files: {total_files}  {format_duration(wavs_seconds + samples_seconds)}",
+                           y, self.font_medium, settings.COLOR_HIGHLIGHT)
 
         y += 35
         # Test WAVs count
-        wavs_text = f"Test WAVs: {len(self.app.state.selected_test_wavs)}"
-        text_surface = self.font_small.render(wavs_text, True, settings.COLOR_TEXT)
+        wavs_text = f"Test WAVs: {len(self.app.state.selected_test_wavs)} ({format_duration(wavs_seconds)})"
+        text_surface = render_text(self.font_small, wavs_text, True, settings.COLOR_TEXT)
         text_rect = text_surface.get_rect(left=60, centery=y)
         self.screen.blit(text_surface, text_rect)
 
         y += 30
         # Samples count
-        samples_text = f"Samples: {len(self.app.state.selected_samples)}"
-        text_surface = self.font_small.render(samples_text, True, settings.COLOR_TEXT)
+        samples_text = f"Samples: {len(self.app.state.selected_samples)} ({format_duration(samples_seconds)})"
+        text_surface = render_text(self.font_small, samples_text, True, settings.COLOR_TEXT)
         text_rect = text_surface.get_rect(left=60, centery=y)
         self.screen.blit(text_surface, text_rect)
 
@@ -73,7 +126,7 @@ class ConfirmScreen(Screen):
             pygame.draw.circle(self.screen, rec_color, (70, y), 8, 2)
 
         rec_text = f"Video Recording: {rec_status}"
-        text_surface = self.font_small.render(rec_text, True, rec_color)
+        text_surface = render_text(self.font_small, rec_text, True, rec_color)
         text_rect = text_surface.get_rect(left=90, centery=y)
         self.screen.blit(text_surface, text_rect)
 
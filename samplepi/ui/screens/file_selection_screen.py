@@ -1,10 +1,15 @@
 """File selection screen for WAV files"""
 
 import os
+import threading
 import pygame
 from samplepi.ui.screen import Screen
 from samplepi.ui.menu_list import MenuList
+from samplepi.ui.list_renderer import IncrementalListRenderer
 from samplepi.config import settings
+from samplepi.ui.text_cache import render_text
+from samplepi.audio.metadata import wav_index
+from samplepi.audio.resample import resample_pipeline
 
 
 class FileSelectionScreen(Screen):
@@ -13,37 +18,92 @@ class FileSelectionScreen(Screen):
     def __init__(self, app, file_type, title):
         super().__init__(app)
         self.file_type = file_type  # 'test_wavs' or 'samples'
+        if file_type == "test_wavs":
+            self.directory = settings.TEST_WAVS_DIR
+        else:
+            self.directory = settings.SAMPLES_DIR
         self.title = title
         self.selected_files = set()
-
-        # Get list of files
-        self.files = self.get_files()
-        if not self.files:
-            self.files = ["No files found"]
-
-        self.menu = MenuList(self.files, y_start=100, item_height=35)
+        self.files = None
+        # Set by the resample scanner once the metadata index is current
+        self._index_refreshed = None
+        self.load_files()
+
+        # Damage areas: "Selected: N" counter, and browser box plus page indicator
+        self.count_rect = pygame.Rect(0, 48, settings.DISPLAY_WIDTH, 24)
+        self.browser_damage_rect = pygame.Rect(0, 75, settings.DISPLAY_WIDTH, 175)
+
+    def on_enter(self):
+        """Start a new visit: clear selections and pick up added or removed files"""
+        super().on_enter()
+        self.selected_files.clear()
+        self.load_files()
+
+    def load_files(self):
+        """Scan the directory and (re)build the list if its contents changed"""
+        files = self.get_files()
+        if not files:
+            files = ["No files found"]
+        if files == self.files:
+            self.menu.selected_index = 0
+            self.list_renderer.invalidate()
+            return
+        self.files = files
+
+        self.menu = MenuList(self.files, y_start=100, item_height=35, jump_index=True)
         self.menu.visible_items = 4  # Show only 4 items to fit in box
 
+        # Rows inside the browser box clip area, redrawn incrementally
+        strip_rect = pygame.Rect(30, self.menu.y_start - 5, settings.DISPLAY_WIDTH - 90,
+                                 self.menu.visible_items * self.menu.item_height)
+        self.list_renderer = IncrementalListRenderer(self.menu, strip_rect, self.draw_file_row)
+
     def get_files(self):
-        """Get list of WAV files from directory"""
-        if self.file_type == "test_wavs":
-            directory = settings.TEST_WAVS_DIR
-        else:
-            directory = settings.SAMPLES_DIR
+        """Get list of WAV files from directory, queueing a metadata index refresh"""
+        directory = self.directory
 
         # For testing on Mac, use dummy files if directory doesn't exist
         if not os.path.exists(directory):
             return [f"test_file_{i}.wav" for i in range(1, 8)]
 
-        files = []
-        for f in os.listdir(directory):
-            if f.endswith('.wav'):
-                files.append(f)
-        return sorted(files) if files else []
-
-    def handle_scroll(self, direction):
+        # scandir avoids a stat per entry; case-insensitive order keeps
+        # first-letter groups contiguous for the jump index
+        with os.scandir(directory) as entries:
+            files = [entry.name for entry in entries if entry.name.endswith('.wav')]
+        files.sort(key=str.casefold)
+        # The scanner thread refreshes the index (statting every file) and
+        # converts new files that don't match the output format; rows are
+        # drawn from the index as it was until update() sees it finish
+        self._index_refreshed = threading.Event()
+        self.update_interval = 1.0 / settings.FPS
+        resample_pipeline.scan_async([directory], on_done=self._index_refreshed.set)
+        return files
+
+    def wait_for_index(self, timeout=None):
+        """Wait for the metadata index refresh queued by the last directory scan
+
+        Returns False if it didn't finish within timeout seconds.
+        """
+        if self._index_refreshed is None:
+            return True
+        return self._index_refreshed.wait(timeout)
+
+    def update(self):
+        """Redraw the rows once the index refresh finished, then stop polling"""
+        if self._index_refreshed is not None and self._index_refreshed.is_set():
+            self.update_interval = None
+            self.list_renderer.invalidate()
+            self.mark_dirty(self.browser_damage_rect)
+
+    def handle_scroll(self, direction, velocity=None):
         """Handle scroll input"""
-        self.menu.scroll(direction)
+        self.menu.scroll(direction, velocity)
+        self.mark_dirty(self.browser_damage_rect)
+
+    def handle_jump(self, direction):
+        """Handle letter jump input"""
+        self.menu.jump(direction)
+        self.mark_dirty(self.browser_damage_rect)
 
     def handle_select(self):
         """Handle select input - toggle file selection"""
@@ -53,13 +113,16 @@ class FileSelectionScreen(Screen):
                 self.selected_files.remove(selected)
             else:
                 self.selected_files.add(selected)
+            self.list_renderer.invalidate(self.menu.selected_index)
+            self.mark_dirty(self.count_rect)
+            self.mark_dirty(self.browser_damage_rect)
 
     def handle_button(self, button):
         """Handle button press"""
         if button == "left":  # Home
             from .start_screen import StartScreen
             self.app.state.go_home()
-            self.app.state.goto_screen(StartScreen(self.app))
+            self.app.state.goto_screen(self.app.screens.get(StartScreen))
         elif button == "middle":  # Back
             self.app.state.go_back()
         elif button == "right":  # Next
@@ -73,85 +136,87 @@ class FileSelectionScreen(Screen):
             # Save selections and go to samples selection
             self.app.state.selected_test_wavs = list(self.selected_files)
             self.app.state.goto_screen(
-                FileSelectionScreen(self.app, "samples", "Select Sample Files")
+                self.app.screens.get(FileSelectionScreen, "samples", "Select Sample Files")
             )
         else:
             # Save selections and go to recording toggle
             self.app.state.selected_samples = list(self.selected_files)
             from .recording_toggle_screen import RecordingToggleScreen
-            self.app.state.goto_screen(RecordingToggleScreen(self.app))
+            self.app.state.goto_screen(self.app.screens.get(RecordingToggleScreen))
 
-    def render(self):
-        """Render the screen"""
+    def draw_static(self):
+        """Draw background, title, file browser box and buttons"""
         self.screen.fill(settings.COLOR_BACKGROUND)
         self.draw_title(self.title)
 
-        # Show selection count
-        count_text = f"Selected: {len(self.selected_files)}"
-        self.draw_text(count_text, 60, color=settings.COLOR_HIGHLIGHT)
-
         # Draw file browser box
         self.browser_rect = pygame.Rect(30, 90, settings.DISPLAY_WIDTH - 60, 160)
         pygame.draw.rect(self.screen, (40, 40, 50), self.browser_rect)
         pygame.draw.rect(self.screen, settings.COLOR_TEXT, self.browser_rect, 2)
 
+        self.draw_buttons(["Home", "Back", "Next"])
+
+    def render(self):
+        """Render the screen"""
+        self.draw_static_layer()
+
+        # Buttons live in the static layer; keep dynamic content off them
+        self.screen.set_clip(self.get_content_rect())
+
+        # Show selection count
+        count_text = f"Selected: {len(self.selected_files)}"
+        self.draw_text(count_text, 60, color=settings.COLOR_HIGHLIGHT)
+
         # Set clipping area to browser box (excluding scrollbar area)
         clip_rect = pygame.Rect(30, 90, settings.DISPLAY_WIDTH - 90, 160)
-        self.screen.set_clip(clip_rect)
+        self.screen.set_clip(clip_rect.clip(self.get_content_rect()))
 
         # Render menu with checkmarks for selected items
         self.render_file_list()
 
-        # Remove clipping
-        self.screen.set_clip(None)
+        # Back to the content area
+        self.screen.set_clip(self.get_content_rect())
 
         # Draw scrollbar outside clip area
         if len(self.menu.items) > self.menu.visible_items:
-            start_idx = max(0, self.menu.selected_index - self.menu.visible_items // 2)
-            end_idx = min(len(self.menu.items), start_idx + self.menu.visible_items)
+            start_idx, end_idx = self.menu.get_visible_range()
             self.draw_scrollbar(start_idx, end_idx)
 
-        self.draw_buttons(["Home", "Back", "Next"])
+        self.screen.set_clip(None)
 
     def render_file_list(self):
         """Render file list with selection indicators"""
-        # Calculate visible range
-        start_idx = max(0, self.menu.selected_index - self.menu.visible_items // 2)
-        end_idx = min(len(self.menu.items), start_idx + self.menu.visible_items)
-
-        if end_idx - start_idx < self.menu.visible_items:
-            start_idx = max(0, end_idx - self.menu.visible_items)
-
-        # Draw items
-        y = self.menu.y_start
-        for i in range(start_idx, end_idx):
-            item = self.menu.items[i]
-            is_selected = (i == self.menu.selected_index)
-            is_checked = item in self.selected_files
-
-            # Draw selection background
-            if is_selected:
-                rect = pygame.Rect(40, y - 5, settings.DISPLAY_WIDTH - 90, self.menu.item_height)
-                pygame.draw.rect(self.screen, settings.COLOR_BUTTON_ACTIVE, rect)
-                pygame.draw.rect(self.screen, settings.COLOR_HIGHLIGHT, rect, 2)
-
-            # Draw checkbox
-            checkbox_rect = pygame.Rect(50, y, 20, 20)
-            pygame.draw.rect(self.screen, settings.COLOR_TEXT, checkbox_rect, 2)
-            if is_checked:
-                # Draw checkmark
-                pygame.draw.line(self.screen, settings.COLOR_HIGHLIGHT,
-                               (52, y + 10), (58, y + 16), 3)
-                pygame.draw.line(self.screen, settings.COLOR_HIGHLIGHT,
-                               (58, y + 16), (68, y + 6), 3)
-
-            # Draw item text
+        self.list_renderer.render(self.screen, self._static_layer, self.static_version)
+
+    def draw_file_row(self, surface, item, is_selected, x_offset, y):
+        """Draw one file row (see IncrementalListRenderer)"""
+        is_checked = item in self.selected_files
+
+        # Draw selection background
+        if is_selected:
+            rect = pygame.Rect(40 - x_offset, y - 5, settings.DISPLAY_WIDTH - 90, self.menu.item_height)
+            pygame.draw.rect(surface, settings.COLOR_BUTTON_ACTIVE, rect)
+            pygame.draw.rect(surface, settings.COLOR_HIGHLIGHT, rect, 2)
+
+        # Draw checkbox
+        checkbox_rect = pygame.Rect(50 - x_offset, y, 20, 20)
+        pygame.draw.rect(surface, settings.COLOR_TEXT, checkbox_rect, 2)
+        if is_checked:
+            # Draw checkmark
+            pygame.draw.line(surface, settings.COLOR_HIGHLIGHT,
+                           (52 - x_offset, y + 10), (58 - x_offset, y + 16), 3)
+            pygame.draw.line(surface, settings.COLOR_HIGHLIGHT,
+                           (58 - x_offset, y + 16), (68 - x_offset, y + 6), 3)
+
+        # Draw item text, dimmed for files the players can't decode
+        info = wav_index.lookup(os.path.join(self.directory, item))
+        if info is not None and not info.playable:
+            color = (120, 120, 130)
+        else:
             color = settings.COLOR_HIGHLIGHT if is_selected else settings.COLOR_TEXT
-            text = self.font_small.render(str(item), True, color)
-            text_rect = text.get_rect(left=80, centery=y + 10)
-            self.screen.blit(text, text_rect)
-
-            y += self.menu.item_height
+        text = render_text(self.font_small, str(item), True, color)
+        text_rect = text.get_rect(left=80 - x_offset, centery=y + 10)
+        surface.blit(text, text_rect)
 
     def draw_scrollbar(self, start_idx, end_idx):
         """Draw a visual scrollbar"""
@@ -177,6 +242,6 @@ class FileSelectionScreen(Screen):
 
         # Draw page indicator text
         indicator_text = f"{self.menu.selected_index + 1}/{total_items}"
-        indicator = self.font_small.render(indicator_text, True, settings.COLOR_TEXT)
+        indicator = render_text(self.font_small, indicator_text, True, settings.COLOR_TEXT)
         indicator_rect = indicator.get_rect(center=(scrollbar_x + 5, scrollbar_y - 15))
         self.screen.blit(indicator, indicator_rect)
@@ -4,13 +4,31 @@ import pygame
 import os
 from samplepi.ui.screen import Screen
 from samplepi.config import settings
+from samplepi.sync_start import SynchronizedStart
 
 
 class PlaybackScreen(Screen):
     """Screen shown during playback"""
 
+    # Poll the audio player for track ends and progress every frame; it
+    # only redraws what update() marks damaged
+    update_interval = 1.0 / settings.FPS
+    # Everything sits in the content area above the button bar
+    progress_bar_y = 132
+    progress_bar_margin = 20
+
     def __init__(self, app):
         super().__init__(app)
+
+        # Damage areas: status line, and file name / counter / progress bar
+        self.status_rect = pygame.Rect(0, 48, settings.DISPLAY_WIDTH, 32)
+        self.track_info_rect = pygame.Rect(0, 82, settings.DISPLAY_WIDTH, 72)
+
+        self.on_enter()
+
+    def on_enter(self):
+        """Start playback of the current selections (every visit plays again)"""
+        super().on_enter()
         self.app.state.is_playing = True
         self.app.state.is_paused = False
         self.status_message = "Playing..."
@@ -22,14 +40,21 @@ class PlaybackScreen(Screen):
         for sample in self.app.state.selected_samples:
             playlist.append(os.path.join(settings.SAMPLES_DIR, sample))
 
-        # Load playlist and start playback
-        self.app.audio_player.load_playlist(playlist)
-        self.app.audio_player.play()
-
-        # Trigger camera if recording enabled
+        # Load playlist and start playback; when recording, the audio and
+        # the camera trigger are started CAMERA_START_OFFSET_MS apart
+        player = self.app.audio_player
+        player.load_playlist(playlist)
+        self.sync_start = None
         if self.app.state.record_video:
-            self.app.camera_trigger.send_pulse()
+            self.sync_start = SynchronizedStart(player, self.app.camera_trigger)
+            self.sync_start.arm()
+            pulse = self.sync_start.release()
+            self.app.trigger_latency.record(pulse, player, self.sync_start.offset_ms)
             self.status_message = "Recording started..."
+        else:
+            player.play()
+        self.shown_index = player.current_index
+        self.shown_fill = 0
 
     def handle_button(self, button):
         """Handle button press"""
@@ -42,6 +67,9 @@ class PlaybackScreen(Screen):
 
     def toggle_pause(self):
         """Toggle pause/resume (does NOT affect recording)"""
+        if self.sync_start is not None and self.sync_start.pending():
+            # Pausing the lead-in would move the audio against the pulse
+            return
         self.app.state.is_paused = not self.app.state.is_paused
         if self.app.state.is_paused:
             self.app.audio_player.pause()
@@ -49,77 +77,123 @@ class PlaybackScreen(Screen):
         else:
             self.app.audio_player.resume()
             self.status_message = "Playing..."
+        self.mark_dirty(self.status_rect)
+        self.mark_dirty(self.get_button_bar_rect())
 
     def stop_playback(self):
         """Stop playback and show completion screen"""
         self.app.state.is_playing = False
+        self.app.trigger_latency.finish()
         self.app.audio_player.stop()
         from .complete_screen import CompleteScreen
-        self.app.state.goto_screen(CompleteScreen(self.app))
+        self.app.state.goto_screen(self.app.screens.get(CompleteScreen))
 
     def reset(self):
         """Reset to home screen"""
         self.app.state.is_playing = False
+        self.app.trigger_latency.finish()
         self.app.audio_player.stop()
         from .start_screen import StartScreen
         self.app.state.go_home()
-        self.app.state.goto_screen(StartScreen(self.app))
+        self.app.state.goto_screen(self.app.screens.get(StartScreen))
 
     def update(self):
         """Update playback state"""
-        # Check if current track finished
-        if not self.app.audio_player.is_busy() and self.app.state.is_playing and not self.app.state.is_paused:
-            # Try to play next track
-            if not self.app.audio_player.next_track():
-                # Playlist finished
-                self.stop_playback()
+        # Track changes happen in the audio player, the screen only follows
+        player = self.app.audio_player
+        self.app.trigger_latency.poll()
+        if player.current_index != self.shown_index:
+            self.shown_index = player.current_index
+            self.mark_dirty(self.track_info_rect)
+
+        # Only redraw the bar when its fill moves by a pixel
+        fill = self.get_progress_fill(player.get_progress())
+        if fill != self.shown_fill:
+            self.shown_fill = fill
+            self.mark_dirty(self.get_progress_bar_rect(self.progress_bar_y))
+
+        if self.app.state.is_playing and not self.app.state.is_paused and player.is_finished():
+            # Playlist finished
+            self.stop_playback()
 
-    def render(self):
-        """Render the screen"""
+    def static_key(self):
+        """Inputs of the static layer: pause label and recording indicator"""
+        return (self.app.state.is_paused, self.app.state.record_video,
+                len(self.app.audio_player.playlist) > 0)
+
+    def draw_static(self):
+        """Draw background, title, progress bar frame, recording note and buttons"""
         self.screen.fill(settings.COLOR_BACKGROUND)
         self.draw_title("Playback")
 
-        y = 80
+        y = self.progress_bar_y
+        if self.app.audio_player.playlist:
+            self.draw_progress_bar_background(y)
+            y += 35
+
+        if self.app.state.record_video:
+            self.draw_text("Camera Recording Active", y, self.font_small, settings.COLOR_HIGHLIGHT)
+
+        # Show playback controls
+        pause_label = "Resume" if self.app.state.is_paused else "Pause"
+        self.draw_buttons([pause_label, "Reset", "Stop"])
+
+    def render(self):
+        """Render the screen"""
+        self.draw_static_layer()
+
+        # Buttons live in the static layer; keep dynamic content off them
+        self.screen.set_clip(self.get_content_rect())
+
+        y = 64
         # Show status
         status_color = settings.COLOR_HIGHLIGHT if not self.app.state.is_paused else settings.COLOR_TEXT
         self.draw_text(self.status_message, y, self.font_large, status_color)
 
-        y += 60
+        y += 30
         # Show current file info
         progress = self.app.audio_player.get_progress()
         current_file = progress['current_file'] or "..."
         self.draw_text(current_file, y, self.font_small)
 
-        y += 30
+        y += 22
         file_count_text = f"File {progress['current_index'] + 1} of {progress['total_files']}"
         self.draw_text(file_count_text, y, self.font_medium)
 
-        y += 40
         # Draw progress bar
         if progress['total_files'] > 0:
-            self.draw_progress_bar(y, progress['current_index'], progress['total_files'])
-            y += 40
+            self.draw_progress_bar(self.progress_bar_y, self.get_progress_fill(progress))
 
-        if self.app.state.record_video:
-            self.draw_text("Camera Recording Active", y, self.font_small, settings.COLOR_HIGHLIGHT)
+        self.screen.set_clip(None)
 
-        # Show playback controls
-        pause_label = "Resume" if self.app.state.is_paused else "Pause"
-        self.draw_buttons([pause_label, "Reset", "Stop"])
-
-    def draw_progress_bar(self, y, current, total):
-        """Draw a visual progress bar"""
-        bar_width = 400
+    def get_progress_bar_rect(self, y):
+        """Outline of the progress bar"""
+        bar_width = settings.DISPLAY_WIDTH - 2 * self.progress_bar_margin
         bar_height = 20
         bar_x = (settings.DISPLAY_WIDTH - bar_width) // 2
+        return pygame.Rect(bar_x, y, bar_width, bar_height)
 
-        # Draw background
-        bg_rect = pygame.Rect(bar_x, y, bar_width, bar_height)
+    def draw_progress_bar_background(self, y):
+        """Draw the empty progress bar"""
+        bg_rect = self.get_progress_bar_rect(y)
         pygame.draw.rect(self.screen, (40, 40, 50), bg_rect)
         pygame.draw.rect(self.screen, settings.COLOR_TEXT, bg_rect, 1)
 
-        # Draw progress
+    def get_progress_fill(self, progress):
+        """Width in pixels of the filled part for a get_progress() result"""
+        total = progress['playlist_duration_frames']
         if total > 0:
-            progress_width = int((current / total) * bar_width)
-            progress_rect = pygame.Rect(bar_x, y, progress_width, bar_height)
+            fraction = progress['playlist_position_frames'] / total
+        elif progress['total_files'] > 0:
+            # No durations known, fall back to whole files
+            fraction = progress['current_index'] / progress['total_files']
+        else:
+            fraction = 0.0
+        return int(fraction * self.get_progress_bar_rect(self.progress_bar_y).width)
+
+    def draw_progress_bar(self, y, progress_width):
+        """Draw the filled part of the progress bar"""
+        if progress_width > 0:
+            bg_rect = self.get_progress_bar_rect(y)
+            progress_rect = pygame.Rect(bg_rect.x, y, progress_width, bg_rect.height)
             pygame.draw.rect(self.screen, settings.COLOR_HIGHLIGHT, progress_rect)
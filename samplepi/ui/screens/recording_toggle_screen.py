@@ -10,29 +10,37 @@ class RecordingToggleScreen(Screen):
 
     def __init__(self, app):
         super().__init__(app)
+        # Toggle switch and ON/OFF label
+        self.toggle_rect = pygame.Rect(0, 165, settings.DISPLAY_WIDTH, 80)
 
-    def handle_scroll(self, direction):
+    def handle_scroll(self, direction, velocity=None):
         """Handle scroll input - toggle the setting"""
         self.app.state.record_video = not self.app.state.record_video
+        self.mark_dirty(self.toggle_rect)
 
     def handle_select(self):
         """Handle select input - toggle recording"""
         self.app.state.record_video = not self.app.state.record_video
+        self.mark_dirty(self.toggle_rect)
 
     def handle_button(self, button):
         """Handle button press"""
         if button == "left":  # Home
             from .start_screen import StartScreen
             self.app.state.go_home()
-            self.app.state.goto_screen(StartScreen(self.app))
+            self.app.state.goto_screen(self.app.screens.get(StartScreen))
         elif button == "middle":  # Back
             self.app.state.go_back()
         elif button == "right":  # Next - go to confirm screen
             from .confirm_screen import ConfirmScreen
-            self.app.state.goto_screen(ConfirmScreen(self.app))
+            self.app.state.goto_screen(self.app.screens.get(ConfirmScreen))
 
-    def render(self):
-        """Render the screen"""
+    def static_key(self):
+        """Selection counts shown in the summary"""
+        return (len(self.app.state.selected_test_wavs), len(self.app.state.selected_samples))
+
+    def draw_static(self):
+        """Draw background, title, selection summary, label and buttons"""
         self.screen.fill(settings.COLOR_BACKGROUND)
         self.draw_title("Video Recording")
 
@@ -46,12 +54,17 @@ class RecordingToggleScreen(Screen):
         # Draw "Record Video" label
         self.draw_text("Record Video", y, self.font_medium)
 
-        # Draw toggle switch
-        y += 40
-        self.draw_toggle_switch(y)
-
         self.draw_buttons(["Home", "Back", "Next"])
 
+    def render(self):
+        """Render the screen"""
+        self.draw_static_layer()
+
+        # Draw toggle switch (kept off the buttons in the static layer)
+        self.screen.set_clip(self.get_content_rect())
+        self.draw_toggle_switch(170)
+        self.screen.set_clip(None)
+
     def draw_toggle_switch(self, y):
         """Draw a toggle switch"""
         # Toggle switch dimensions
@@ -13,9 +13,15 @@ class StartScreen(Screen):
         super().__init__(app)
         self.menu = MenuList(["Start New Session"])
 
-    def handle_scroll(self, direction):
+    def on_enter(self):
+        """Start a new visit with the first item selected"""
+        super().on_enter()
+        self.menu.selected_index = 0
+
+    def handle_scroll(self, direction, velocity=None):
         """Handle scroll input"""
-        self.menu.scroll(direction)
+        self.menu.scroll(direction, velocity)
+        self.mark_dirty(self.menu.get_rect())
 
     def handle_select(self):
         """Handle select input"""
@@ -25,7 +31,7 @@ class StartScreen(Screen):
             self.app.state.reset_selections()
             from .file_selection_screen import FileSelectionScreen
             self.app.state.goto_screen(
-                FileSelectionScreen(self.app, "test_wavs", "Select Test WAV Files")
+                self.app.screens.get(FileSelectionScreen, "test_wavs", "Select Test WAV Files")
             )
 
     def handle_button(self, button):
@@ -37,9 +43,15 @@ class StartScreen(Screen):
         elif button == "right":  # Next - start new session
             self.handle_select()
 
-    def render(self):
-        """Render the screen"""
+    def draw_static(self):
+        """Draw background, title and buttons"""
         self.screen.fill(settings.COLOR_BACKGROUND)
         self.draw_title("SamplePi")
-        self.menu.render(self.screen, self.font_medium)
         self.draw_buttons(["Home", None, "Start"])
+
+    def render(self):
+        """Render the screen"""
+        self.draw_static_layer()
+        self.screen.set_clip(self.get_content_rect())
+        self.menu.render(self.screen, self.font_medium, self._static_layer, self.static_version)
+        self.screen.set_clip(None)
@@ -0,0 +1,61 @@
+"""Shared LRU cache of rendered text surfaces"""
+
+from collections import OrderedDict
+from samplepi.config import settings
+
+
+class TextCache:
+    """Size-bounded cache of font.render results
+
+    Keyed by (font, text, color, antialias). The least recently used
+    surface is evicted once max_entries is reached.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or settings.TEXT_CACHE_SIZE
+        self._surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, antialias, color):
+        """Same signature as pygame.font.Font.render, but cached"""
+        key = (font, text, tuple(color), antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        """Drop all cached surfaces"""
+        self._surfaces.clear()
+
+    def get_stats(self):
+        """Get hit/miss statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._surfaces),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Shared by every screen and component
+text_cache = TextCache()
+
+
+def render_text(font, text, antialias, color):
+    """Render text through the shared cache"""
+    return text_cache.render(font, text, antialias, color)